@@ -1,6 +1,8 @@
 # agent-api/agents/support_n1_agent.py
+from typing import Optional
+
 from agno.agent import Agent
-from agno.models.google import Gemini
+from core.agent_factory import get_shared_model
 from knowledge.registry import KNOWLEDGE_REGISTRY
 from shared_rules import (
     GENERAL_BEGIN_INSTRUCTIONS,
@@ -8,8 +10,8 @@ from shared_rules import (
     GENERAL_END_INSTRUCTIONS
 )
 
-# Pega a instância da KB correta
-sisateg_kb = KNOWLEDGE_REGISTRY.get_kb("sisateg_kb")
+# Pega a KB correta (proxy lazy: o LanceDB só é aberto na primeira busca)
+sisateg_kb = KNOWLEDGE_REGISTRY.get_lazy_kb("sisateg_kb")
 
 # Instruções Específicas
 n1_mission = "Buscar soluções na base de conhecimento `sisateg_kb` (RAG) para o problema descrito no histórico."
@@ -43,13 +45,24 @@ n1_full_instructions = (
 )
 
 # Criar o Agente
-n1_agent = Agent(
-    name="N1_SupportAgent",
-    description="Busca soluções na base de conhecimento via RAG.",
-    role="Especialista em Busca Histórica",
-    instructions=n1_full_instructions,
-    model=Gemini(id="gemini-2.0-flash"),
-    knowledge=[sisateg_kb],
-    tools=False,
-    debug_mode=True,
-)
+def get_n1_agent(session_id: Optional[str] = None, user_id: Optional[str] = None, async_tools: bool = False) -> Agent:
+    """
+    Cria um N1 isolado para a sessão. Modelo e KB (proxy lazy) são compartilhados.
+    Sem ferramentas: `async_tools` só mantém a assinatura comum das fábricas.
+    """
+    return Agent(
+        name="N1_SupportAgent",
+        description="Busca soluções na base de conhecimento via RAG.",
+        role="Especialista em Busca Histórica",
+        instructions=n1_full_instructions,
+        model=get_shared_model(),
+        knowledge=sisateg_kb,
+        tools=False,
+        debug_mode=True,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+# Instância padrão (workflows, scripts e o playground)
+n1_agent = get_n1_agent()
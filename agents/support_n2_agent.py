@@ -1,17 +1,25 @@
 # agent-api/agents/support_n2_agent.py
+from typing import Optional
+
 from agno.agent import Agent
-from agno.models.google import Gemini
+from core.agent_factory import copy_tools, get_shared_model
+from core.metrics import create_tool_metrics_hook
 from knowledge.registry import KNOWLEDGE_REGISTRY
-from toolkits.support_toolkit import get_ticket_dossier, search_knowledge_by_keyword
+from toolkits.support_toolkit import (
+    get_ticket_dossier,
+    get_ticket_dossier_async,
+    search_knowledge_by_keyword,
+    search_knowledge_by_keyword_async,
+)
 from shared_rules import (
     GENERAL_BEGIN_INSTRUCTIONS,
     SECURITY_RULES,
     GENERAL_END_INSTRUCTIONS
 )
 
-# Pega as KBs
-sisateg_kb = KNOWLEDGE_REGISTRY.get_kb("sisateg_kb")
-# (Futuro: docs_kb = KNOWLEDGE_REGISTRY.get_kb("docs_kb"))
+# Pega as KBs (proxies lazy: o LanceDB só é aberto na primeira busca)
+sisateg_kb = KNOWLEDGE_REGISTRY.get_lazy_kb("sisateg_kb")
+# (Futuro: docs_kb = KNOWLEDGE_REGISTRY.get_lazy_kb("docs_kb"))
 
 # Instruções Específicas
 n2_mission = "Diagnosticar a causa raiz de problemas complexos usando RAG, ferramentas de busca e o histórico da conversa."
@@ -49,18 +57,35 @@ n2_full_instructions = (
     GENERAL_END_INSTRUCTIONS
 )
 
+# Tempo e falhas de cada chamada de ferramenta (GET /metrics)
+_tool_metrics_hook = create_tool_metrics_hook("N2_DiagnosticAgent")
+
 # Criar o Agente
-n2_agent = Agent(
-    name="N2_DiagnosticAgent",
-    description="Diagnostica problemas complexos usando RAG e ferramentas.",
-    role="Analista de Diagnóstico",
-    instructions=n2_full_instructions,
-    model=Gemini(id="gemini-2.0-flash"),
-    knowledge=[sisateg_kb],
-    # (Futuro: knowledge=[sisateg_kb, docs_kb])
-    tools=[
-        get_ticket_dossier,
-        search_knowledge_by_keyword
-    ],
-    debug_mode=True,
-)
+def get_n2_agent(session_id: Optional[str] = None, user_id: Optional[str] = None, async_tools: bool = False) -> Agent:
+    """
+    Cria um N2 isolado para a sessão, com cópias próprias das ferramentas
+    (as versões assíncronas com `async_tools`, para execução via arun()).
+    """
+    return Agent(
+        name="N2_DiagnosticAgent",
+        description="Diagnostica problemas complexos usando RAG e ferramentas.",
+        role="Analista de Diagnóstico",
+        instructions=n2_full_instructions,
+        model=get_shared_model(),
+        knowledge=sisateg_kb,
+        # (Futuro: docs_kb via KnowledgeRegistry)
+        tools=copy_tools(
+            [get_ticket_dossier_async, search_knowledge_by_keyword_async]
+            if async_tools
+            else [get_ticket_dossier, search_knowledge_by_keyword]
+        ),
+        # Hooks async: o Agno os ignora (com aviso) no agent.run() síncrono
+        tool_hooks=[_tool_metrics_hook] if async_tools else None,
+        debug_mode=True,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+# Instância padrão (workflows, scripts e o playground)
+n2_agent = get_n2_agent()
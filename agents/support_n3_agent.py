@@ -1,9 +1,10 @@
 # agent-api/agents/support_n3_agent.py
 from agno.agent import Agent
-from agno.models.google import Gemini
+from core.agent_factory import copy_tools, get_shared_model
+from core.metrics import create_tool_metrics_hook
 from pydantic import BaseModel, Field
 from typing import Optional
-from toolkits.support_toolkit import get_knowledge_record_by_uuid
+from toolkits.support_toolkit import get_knowledge_record_by_uuid, get_knowledge_record_by_uuid_async
 from shared_rules import (
     GENERAL_BEGIN_INSTRUCTIONS,
     SECURITY_RULES,
@@ -49,17 +50,30 @@ n3_full_instructions = (
     GENERAL_END_INSTRUCTIONS
 )
 
+# Mede get_knowledge_record_by_uuid (GET /metrics)
+_tool_metrics_hook = create_tool_metrics_hook("N3_ResolutionAgent")
+
 # Criar o Agente
-n3_agent = Agent(
-    name="N3_ResolutionAgent",
-    description="Formula planos de resolução técnicos.",
-    role="Engenheiro de Soluções",
-    instructions=n3_full_instructions,
-    model=Gemini(id="gemini-2.0-flash"),
-    knowledge=None,
-    tools=[
-        get_knowledge_record_by_uuid
-    ],
-    # output_model=ResolutionPlan, # Temporariamente removido para teste
-    debug_mode=True
-)
+def get_n3_agent(session_id: Optional[str] = None, user_id: Optional[str] = None, async_tools: bool = False) -> Agent:
+    """Cria um N3 isolado para a sessão (ferramentas assíncronas com `async_tools`)."""
+    return Agent(
+        name="N3_ResolutionAgent",
+        description="Formula planos de resolução técnicos.",
+        role="Engenheiro de Soluções",
+        instructions=n3_full_instructions,
+        model=get_shared_model(),
+        knowledge=None,
+        tools=copy_tools([
+            get_knowledge_record_by_uuid_async if async_tools else get_knowledge_record_by_uuid
+        ]),
+        # Hooks async: o Agno os ignora (com aviso) no agent.run() síncrono
+        tool_hooks=[_tool_metrics_hook] if async_tools else None,
+        # output_model=ResolutionPlan, # Temporariamente removido para teste
+        debug_mode=True,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+# Instância padrão (workflows, scripts e o playground)
+n3_agent = get_n3_agent()
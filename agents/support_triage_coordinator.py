@@ -1,12 +1,15 @@
 # agent-api/agents/support_triage_coordinator.py
+from typing import Optional
+
 from agno.agent import Agent
-from agno.models.google import Gemini
+from core.agent_factory import copy_tools, get_shared_model
+from core.metrics import create_tool_metrics_hook
 from shared_rules import ( # Importa as regras compartilhadas
     GENERAL_BEGIN_INSTRUCTIONS,
     SECURITY_RULES,
     GENERAL_END_INSTRUCTIONS
 )
-from toolkits.support_toolkit import get_ticket_details
+from toolkits.support_toolkit import get_ticket_details, get_ticket_details_async
 
 # Instruções Específicas
 triage_mission = """
@@ -84,12 +87,28 @@ triage_full_instructions = (
     GENERAL_END_INSTRUCTIONS
 )
 
+# Histograma por ferramenta do agente (exposto em GET /metrics)
+_tool_metrics_hook = create_tool_metrics_hook("TriageCoordinatorAgent")
+
 # Criar o Agente
-triage_agent = Agent(
-    name="TriageCoordinatorAgent",
-    description="Coleta informações ou analisa chamados existentes para decidir o fluxo.",
-    role="Analista de Suporte Sênior (Triagem e Análise de Dossiê).",
-    instructions=triage_full_instructions,
-    model=Gemini(id="gemini-2.0-flash"), # Usando Flash conforme solicitado
-    tools=[get_ticket_details]
-)
+def get_triage_agent(session_id: Optional[str] = None, user_id: Optional[str] = None, async_tools: bool = False) -> Agent:
+    """
+    Cria o agente de triagem de uma sessão de chat (uma instância por requisição).
+    `async_tools` troca as ferramentas pelas versões assíncronas (execução via arun()).
+    """
+    return Agent(
+        name="TriageCoordinatorAgent",
+        description="Coleta informações ou analisa chamados existentes para decidir o fluxo.",
+        role="Analista de Suporte Sênior (Triagem e Análise de Dossiê).",
+        instructions=triage_full_instructions,
+        model=get_shared_model(),
+        tools=copy_tools([get_ticket_details_async if async_tools else get_ticket_details]),
+        # Hooks async: o Agno os ignora (com aviso) no agent.run() síncrono
+        tool_hooks=[_tool_metrics_hook] if async_tools else None,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+# Instância padrão (workflows, scripts e o playground)
+triage_agent = get_triage_agent()
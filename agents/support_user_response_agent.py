@@ -1,6 +1,8 @@
 # agent-api/agents/user_response_agent.py
+from typing import Optional
+
 from agno.agent import Agent
-from agno.models.google import Gemini
+from core.agent_factory import get_shared_model
 from shared_rules import ( # Importa as regras compartilhadas
     GENERAL_BEGIN_INSTRUCTIONS,
     SECURITY_RULES,
@@ -53,11 +55,22 @@ response_full_instructions = (
 
 # Criar o Agente
 # Note: tools=None, pois ele não executa nenhuma ação, apenas formata texto.
-response_agent = Agent(
-    name="UserResponseAgent",
-    description="Formata respostas técnicas em linguagem amigável para o usuário.",
-    role="Especialista em Comunicação com o Cliente.",
-    instructions=response_full_instructions,
-    model=Gemini(id="gemini-2.0-flash"), # Modelo robusto para linguagem
-    tools=None
-)
+def get_response_agent(session_id: Optional[str] = None, user_id: Optional[str] = None, async_tools: bool = False) -> Agent:
+    """
+    Cria o agente de resposta de uma sessão; o modelo é o compartilhado.
+    Sem ferramentas: `async_tools` só mantém a assinatura comum das fábricas.
+    """
+    return Agent(
+        name="UserResponseAgent",
+        description="Formata respostas técnicas em linguagem amigável para o usuário.",
+        role="Especialista em Comunicação com o Cliente.",
+        instructions=response_full_instructions,
+        model=get_shared_model(),
+        tools=None,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+# Instância padrão (workflows, scripts e o playground)
+response_agent = get_response_agent()
@@ -1,8 +1,45 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from api.metrics import MetricsMiddleware, metrics_router
 from api.routes.v1_router import v1_router
 from api.settings import api_settings
+from core.agent_registry import AGENT_REGISTRY
+from db.engines import ENGINE_REGISTRY
+from knowledge.registry import KNOWLEDGE_REGISTRY
+from toolkits.tool_executor import TOOL_EXECUTOR
+
+
+def warm_up() -> None:
+    """Import the agent factories, then open and query the preloaded knowledge bases"""
+    try:
+        AGENT_REGISTRY.preload()
+    except Exception as e:
+        print(f"Warm-up: failed to import the agent factories: {e}")
+    KNOWLEDGE_REGISTRY.warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm up the agents and knowledge bases in the background after startup"""
+
+    warm_up_task: Optional[asyncio.Task] = None
+    if api_settings.warm_up_on_startup:
+        # Runs in a worker thread so the app starts serving (and /v1/health answers) immediately.
+        # Nothing heavy happens at import time: agents, Agno and LanceDB are only loaded here.
+        warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
+    yield
+
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+
+    TOOL_EXECUTOR.shutdown()
+    await ENGINE_REGISTRY.dispose_all()
 
 
 def create_app() -> FastAPI:
@@ -15,11 +52,15 @@ def create_app() -> FastAPI:
         docs_url="/docs" if api_settings.docs_enabled else None,
         redoc_url="/redoc" if api_settings.docs_enabled else None,
         openapi_url="/openapi.json" if api_settings.docs_enabled else None,
+        lifespan=lifespan,
     )
 
     # Add v1 router
     app.include_router(v1_router)
 
+    # Prometheus scrape endpoint (unversioned, outside the OpenAPI schema)
+    app.include_router(metrics_router)
+
     # Add Middlewares
     app.add_middleware(
         CORSMiddleware,
@@ -29,6 +70,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Request latency per route template and time to first byte of SSE streams
+    app.add_middleware(MetricsMiddleware)
+
     return app
 
 
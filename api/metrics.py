@@ -0,0 +1,153 @@
+import time
+from typing import Iterable, List
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from core.admission import ADMISSION_CONTROLLER
+from core.metrics import ERRORS_TOTAL, HTTP_REQUEST_SECONDS, HTTP_STREAM_FIRST_BYTE_SECONDS, METRICS, PROMETHEUS_CONTENT_TYPE
+from db.engines import ENGINE_REGISTRY
+from repositories.query_metrics import QUERY_METRICS
+from toolkits.tool_executor import TOOL_EXECUTOR
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """Prometheus text exposition of the API metrics"""
+    return Response(METRICS.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template (bounded
+    label cardinality) and, for text/event-stream responses, the time to the
+    first body chunk. Responses with status >= 500 also count as errors.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        state = {"status": 500, "streaming": False, "first_byte": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        state["streaming"] = True
+                        break
+            elif message["type"] == "http.response.body" and state["streaming"] and not state["first_byte"]:
+                if message.get("body"):
+                    state["first_byte"] = True
+                    HTTP_STREAM_FIRST_BYTE_SECONDS.observe(time.perf_counter() - started_at, route=_route_label(scope))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = _route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started_at, method=scope["method"], route=route, status=state["status"]
+            )
+            if state["status"] >= 500:
+                ERRORS_TOTAL.inc(source="http", name=route)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# --- Collectors for stats kept by other modules (converted at scrape time) ---
+
+def _collect_repository_queries() -> Iterable[str]:
+    name = "repository_query_duration_seconds"
+    lines: List[str] = [
+        f"# HELP {name} Repository query duration per query fingerprint (see /v1/health/db).",
+        f"# TYPE {name} histogram",
+    ]
+    for fingerprint_id, histogram in QUERY_METRICS.histograms().items():
+        lines.extend(histogram.render(name, ("fingerprint_id",), (fingerprint_id,), scale=1 / 1000))
+    lines += [
+        "# HELP repository_query_errors_total Failed repository queries per query fingerprint.",
+        "# TYPE repository_query_errors_total counter",
+    ]
+    for query in QUERY_METRICS.snapshot()["queries"]:
+        lines.append(f'repository_query_errors_total{{fingerprint_id="{query["fingerprint_id"]}"}} {query["errors"]}')
+    return lines
+
+
+def _collect_admission() -> Iterable[str]:
+    stats = ADMISSION_CONTROLLER.stats()
+    lines = [
+        "# HELP chat_admission_active Chat runs in progress per service.",
+        "# TYPE chat_admission_active gauge",
+        *[f'chat_admission_active{{service="{service}"}} {s["active"]}' for service, s in stats.items()],
+        "# HELP chat_admission_queue_depth Chat requests waiting for a slot per service.",
+        "# TYPE chat_admission_queue_depth gauge",
+        *[f'chat_admission_queue_depth{{service="{service}"}} {s["queue_depth"]}' for service, s in stats.items()],
+        "# HELP chat_admission_rejected_total Chat requests rejected with 429 per service and reason.",
+        "# TYPE chat_admission_rejected_total counter",
+    ]
+    for service, s in stats.items():
+        lines.append(f'chat_admission_rejected_total{{service="{service}",reason="queue_full"}} {s["rejected"]}')
+        lines.append(f'chat_admission_rejected_total{{service="{service}",reason="timeout"}} {s["timed_out"]}')
+    lines += [
+        "# HELP chat_admission_wait_seconds Queue wait before admission per service.",
+        "# TYPE chat_admission_wait_seconds histogram",
+    ]
+    for service, histogram in ADMISSION_CONTROLLER.wait_histograms().items():
+        lines.extend(histogram.render("chat_admission_wait_seconds", ("service",), (service,), scale=1 / 1000))
+    return lines
+
+
+def _collect_tool_executor() -> Iterable[str]:
+    stats = TOOL_EXECUTOR.stats()
+    lines = [
+        "# HELP tool_executor_running Tool tasks running on the tool executor.",
+        "# TYPE tool_executor_running gauge",
+        f"tool_executor_running {stats['running']}",
+        "# HELP tool_executor_queued Tool tasks waiting for a tool executor thread.",
+        "# TYPE tool_executor_queued gauge",
+        f"tool_executor_queued {stats['queued']}",
+        "# HELP tool_executor_rejected_total Tool tasks rejected because the executor queue was full.",
+        "# TYPE tool_executor_rejected_total counter",
+        f"tool_executor_rejected_total {stats['rejected']}",
+    ]
+    histograms = TOOL_EXECUTOR.histograms()
+    for kind, documentation in (
+        ("queue", "Time tool tasks waited for a tool executor thread, per tool."),
+        ("run", "Time tool tasks ran on the tool executor, per tool."),
+    ):
+        name = f"tool_executor_{kind}_seconds"
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} histogram"]
+        for tool, tool_histograms in histograms.items():
+            lines.extend(tool_histograms[kind].render(name, ("tool",), (tool,), scale=1 / 1000))
+    return lines
+
+
+def _collect_engines() -> Iterable[str]:
+    stats = ENGINE_REGISTRY.stats()
+    lines = [
+        "# HELP db_pool_checked_out Checked-out connections per engine.",
+        "# TYPE db_pool_checked_out gauge",
+        *[f'db_pool_checked_out{{engine="{engine}"}} {s["checked_out"]}' for engine, s in stats.items()],
+        "# HELP db_pool_overflow Overflow connections above pool_size per engine.",
+        "# TYPE db_pool_overflow gauge",
+        *[f'db_pool_overflow{{engine="{engine}"}} {s["overflow"]}' for engine, s in stats.items()],
+    ]
+    return lines
+
+
+METRICS.register_collector(_collect_repository_queries)
+METRICS.register_collector(_collect_admission)
+METRICS.register_collector(_collect_tool_executor)
+METRICS.register_collector(_collect_engines)
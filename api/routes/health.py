@@ -1,4 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from api.settings import api_settings
+from db.engines import ENGINE_REGISTRY
+from repositories.query_metrics import QUERY_METRICS
+from knowledge.registry import KNOWLEDGE_REGISTRY
 
 ######################################################
 ## Routes for the API Health
@@ -9,8 +15,37 @@ health_router = APIRouter(tags=["Health"])
 
 @health_router.get("/health")
 def get_health():
-    """Check the health of the Api"""
+    """Check the health of the Api. Reports ready only after the knowledge base warm-up completes."""
+
+    if not api_settings.warm_up_on_startup:
+        return {
+            "status": "success",
+            "ready": True,
+        }
+
+    warm_up = KNOWLEDGE_REGISTRY.warm_up_status()
+    if not KNOWLEDGE_REGISTRY.is_warmed_up():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "status": "warming_up",
+                "ready": False,
+                "warm_up": warm_up,
+            },
+        )
 
     return {
         "status": "success",
+        "ready": True,
+        "warm_up": warm_up,
     }
+
+
+@health_router.get("/health/db")
+def get_db_pool_stats():
+    """
+    Report the connection pool statistics of every live database engine and the
+    per-query latency histograms, slow-query log and captured EXPLAIN plans.
+    """
+
+    return {"engines": ENGINE_REGISTRY.stats(), "queries": QUERY_METRICS.snapshot()}
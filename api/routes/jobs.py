@@ -0,0 +1,207 @@
+# agent-api/api/routes/jobs.py
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from uuid import UUID
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from repositories.log_repository import LogRepository
+
+# Cria o roteador dos jobs de processamento em lote
+jobs_router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+log_repo = LogRepository()
+
+# Dashboards fazem polling: snapshots iguais dentro desta janela saem do cache, sem ir ao banco
+JOB_SNAPSHOT_TTL_S = 2.0
+# Intervalo entre comentários de keep-alive do SSE quando o progresso não muda
+SSE_HEARTBEAT_S = 15.0
+
+# Status do log que contam como falha (os demais, ex: PENDING e SKIPPED, só aparecem em by_status)
+FAILED_LOG_STATUSES = {"FAILURE", "BATCH_FAILURE"}
+
+_snapshot_cache: Dict[Tuple, Tuple[float, Any]] = {}
+
+
+# --- Funções auxiliares ---
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str, list, dict)):
+        return value
+    return str(value)
+
+
+def build_job_snapshot(job: Dict[str, Any], progress: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Monta o estado de um job: contagens por status (dos contadores incrementais),
+    itens por minuto e a estimativa de término.
+    """
+    by_status = {
+        job_status: {
+            "tickets": counters["tickets"],
+            "avg_duration_ms": round(counters["total_duration_ms"] / counters["tickets"], 1) if counters["tickets"] else None,
+            "last_logged_at": _to_json_value(counters["last_logged_at"]),
+        }
+        for job_status, counters in sorted(progress.items())
+    }
+    processed = sum(counters["tickets"] for counters in progress.values())
+    if not progress and job["status"] != "RUNNING":
+        # Jobs anteriores aos contadores: usa o resumo gravado ao final do job
+        processed = (job["tickets_succeeded"] or 0) + (job["tickets_failed"] or 0)
+
+    if progress:
+        succeeded = progress.get("SUCCESS", {}).get("tickets", 0)
+        failed = sum(counters["tickets"] for job_status, counters in progress.items() if job_status in FAILED_LOG_STATUSES)
+    else:
+        succeeded = job["tickets_succeeded"] or 0
+        failed = job["tickets_failed"] or 0
+
+    tickets_found = job["tickets_found"] or 0
+    elapsed_seconds = float(job["elapsed_seconds"] or 0)
+    items_per_minute = processed / elapsed_seconds * 60 if elapsed_seconds > 0 else 0.0
+    remaining = max(tickets_found - processed, 0)
+    eta_seconds = None
+    if job["status"] == "RUNNING" and items_per_minute > 0:
+        eta_seconds = round(remaining / items_per_minute * 60)
+
+    return {
+        "id": str(job["id"]),
+        "job_type": job["job_type"],
+        "status": job["status"],
+        "start_time": _to_json_value(job["start_time"]),
+        "end_time": _to_json_value(job["end_time"]),
+        "elapsed_seconds": round(elapsed_seconds, 1),
+        "tickets_found": tickets_found,
+        "processed": processed,
+        "succeeded": succeeded,
+        "failed": failed,
+        "remaining": remaining,
+        "percent": round(processed / tickets_found * 100, 1) if tickets_found else None,
+        "items_per_minute": round(items_per_minute, 2),
+        "eta_seconds": eta_seconds,
+        "by_status": by_status,
+        "error_summary": job["error_summary"],
+    }
+
+
+def _list_snapshots(limit: int, job_type: Optional[str], job_status: Optional[str]) -> List[Dict[str, Any]]:
+    jobs = log_repo.list_jobs(limit=limit, job_type=job_type, status=job_status)
+    progress = log_repo.get_jobs_progress([job["id"] for job in jobs])
+    return [build_job_snapshot(job, progress.get(str(job["id"]), {})) for job in jobs]
+
+
+def _job_snapshot(job_id: str) -> Optional[Dict[str, Any]]:
+    job = log_repo.get_job(job_id)
+    if job is None:
+        return None
+    progress = log_repo.get_jobs_progress([job["id"]])
+    return build_job_snapshot(job, progress.get(str(job["id"]), {}))
+
+
+async def _cached(key: Tuple, loader, *args) -> Any:
+    """Executa `loader` numa thread, reaproveitando o resultado por JOB_SNAPSHOT_TTL_S."""
+    cached = _snapshot_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < JOB_SNAPSHOT_TTL_S:
+        return cached[1]
+    value = await asyncio.to_thread(loader, *args)
+    _snapshot_cache[key] = (time.monotonic(), value)
+    if len(_snapshot_cache) > 1000:
+        # Descarta as entradas expiradas para o cache não crescer com ids antigos
+        now = time.monotonic()
+        for stale_key in [k for k, (stored_at, _) in _snapshot_cache.items() if now - stored_at >= JOB_SNAPSHOT_TTL_S]:
+            _snapshot_cache.pop(stale_key, None)
+    return value
+
+
+async def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    try:
+        UUID(job_id)
+    except ValueError:
+        snapshot = None
+    else:
+        snapshot = await _cached(("job", job_id), _job_snapshot, job_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job '{job_id}' não encontrado."
+        )
+    return snapshot
+
+
+# --- Endpoints da API ---
+
+@jobs_router.get("")
+async def list_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    job_type: Optional[str] = Query(None, description="knowledge ou vectorization"),
+    job_status: Optional[str] = Query(None, alias="status", description="RUNNING, COMPLETED ou FAILED"),
+) -> List[Dict[str, Any]]:
+    """
+    Lista os jobs mais recentes com o progresso de cada um (processados,
+    itens por minuto, ETA e contagem por status).
+    """
+    return await _cached(("list", limit, job_type, job_status), _list_snapshots, limit, job_type, job_status)
+
+
+@jobs_router.get("/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    Retorna o progresso de um job.
+    """
+    return await _get_job_or_404(job_id)
+
+
+async def job_progress_streamer(job_id: str, interval: float) -> AsyncGenerator[str, None]:
+    """
+    Envia um evento SSE a cada mudança no progresso do job, até ele terminar.
+    """
+    last_progress = None
+    last_sent_at = time.monotonic()
+    while True:
+        try:
+            snapshot = await _cached(("job", job_id), _job_snapshot, job_id)
+        except Exception as e:
+            print(f"Erro ao consultar o progresso do job {job_id}: {e}")
+            error_data = json.dumps({"error": "Falha ao consultar o progresso do job.", "details": str(e)})
+            yield f"data: {error_data}\n\n"
+            return
+
+        if snapshot is None:
+            return
+        # elapsed_seconds/ETA mudam a cada consulta: só o avanço do job gera um novo evento
+        current_progress = (snapshot["status"], snapshot["processed"], snapshot["by_status"])
+        if current_progress != last_progress:
+            yield f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+            last_progress = current_progress
+            last_sent_at = time.monotonic()
+        elif time.monotonic() - last_sent_at >= SSE_HEARTBEAT_S:
+            # Comentário SSE: mantém a conexão aberta em proxies sem gerar evento no cliente
+            yield ": keep-alive\n\n"
+            last_sent_at = time.monotonic()
+
+        if snapshot["status"] != "RUNNING":
+            return
+        await asyncio.sleep(interval)
+
+
+@jobs_router.get("/{job_id}/events")
+async def stream_job_progress(
+    job_id: str,
+    interval: float = Query(2.0, ge=0.5, le=60, description="Segundos entre verificações do progresso."),
+):
+    """
+    Acompanha um job via Server-Sent Events: um evento com o snapshot completo
+    a cada mudança, encerrando quando o job sai de RUNNING.
+    """
+    await _get_job_or_404(job_id)
+    return StreamingResponse(
+        job_progress_streamer(job_id, interval),
+        media_type="text/event-stream"
+    )
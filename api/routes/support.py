@@ -1,22 +1,36 @@
 # agent-api/api/routes/support.py
 
+import asyncio
 import json
 from fastapi import APIRouter, HTTPException, status, Body
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from typing import AsyncGenerator, List, Optional, Union, Dict, Any
+from typing import TYPE_CHECKING, AsyncGenerator, List, Optional, Union, Dict, Any
 
-# Importações do Agno
-from agno.agent import Agent
-from agno.team import Team
+# Importações do Agno (só para tipagem: o Agno é carregado pelo AGENT_REGISTRY no primeiro chat)
+if TYPE_CHECKING:
+    from agno.agent import Agent
+    from agno.team import Team
 # from agno.schema import AgentRun # Para tipagem da resposta não-stream - Temporariamente comentado
 
 # Importa nosso registro central de agentes e equipes
+from core.admission import ADMISSION_CONTROLLER, AdmissionLease, AdmissionRejected
 from core.agent_registry import AGENT_REGISTRY
+from core.metrics import ERRORS_TOTAL, record_run_output_tokens, record_run_tokens
+from api.sse import ChatEventEncoder, encode_sse, stream_chat_events
+from knowledge.batch_search import batch_vector_search
+from knowledge.registry import KNOWLEDGE_REGISTRY
+from knowledge.semantic_cache import N1_ANSWER_CACHE
+from repositories.knowledge_repository import KnowledgeRepository
+from repositories.dossier_cache import DOSSIER_CACHE
+from toolkits.tool_executor import TOOL_EXECUTOR
 
 # Cria o roteador específico para o suporte
 support_router = APIRouter(prefix="/support", tags=["Support Services"])
 
+knowledge_repo = KnowledgeRepository()
+
 # --- Modelos Pydantic para Request/Response ---
 
 class ChatRequest(BaseModel):
@@ -28,6 +42,15 @@ class ChatRequest(BaseModel):
     # Adicione outros campos de configuração se necessário (ex: metadata)
     config: Optional[Dict[str, Any]] = Field(None, description="Configurações adicionais para a execução.")
 
+class SearchRequest(BaseModel):
+    """Modelo para o corpo da busca em lote na base de conhecimento."""
+    queries: List[str] = Field(..., min_length=1, max_length=100, description="Descrições de problema a pesquisar.")
+    limit: int = Field(5, ge=1, le=20, description="Quantidade máxima de registros por query.")
+    filters: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Filtros de metadados (solution_type, ticket_level, tags, updated_at) aplicados a todas as queries.",
+    )
+
 # --- Funções auxiliares ---
 
 def clean_markdown_json(content: str) -> str:
@@ -56,67 +79,156 @@ async def list_support_services():
     return AGENT_REGISTRY.get_available_services()
 
 
+@support_router.get("/cache/stats")
+async def get_answer_cache_stats() -> Dict[str, Any]:
+    """
+    Retorna as métricas dos caches do suporte (hits, misses, invalidações,
+    tamanho atual e taxa de acerto): respostas do N1 e dossiês de chamados.
+    """
+    return {"n1_answers": N1_ANSWER_CACHE.metrics(), "dossiers": DOSSIER_CACHE.metrics()}
+
+
+@support_router.get("/admission/stats")
+async def get_admission_stats() -> Dict[str, Any]:
+    """
+    Retorna, por serviço, as execuções em andamento, a profundidade da fila,
+    as recusas (fila cheia/timeout) e o tempo de espera por uma vaga.
+    """
+    return ADMISSION_CONTROLLER.stats()
+
+
+@support_router.get("/tools/stats")
+async def get_tool_executor_stats() -> Dict[str, Any]:
+    """
+    Retorna a ocupação do executor das ferramentas (threads em uso, fila e
+    recusas) e, por ferramenta, os tempos de fila e de execução.
+    """
+    return TOOL_EXECUTOR.stats()
+
+
+@support_router.post("/search")
+async def search_knowledge_base(body: SearchRequest) -> Dict[str, Any]:
+    """
+    Busca várias descrições de problema na `sisateg_kb` de uma vez, sem LLM:
+    embeddings em uma chamada em lote, buscas vetoriais concorrentes e os
+    registros da `ybs_knowledge_base` ranqueados por query.
+    """
+    # Numa thread: sem o warm-up (desligado ou ainda em andamento) a primeira chamada
+    # abre o LanceDB e cria o embedder, o que não pode rodar no event loop
+    kb = await asyncio.to_thread(KNOWLEDGE_REGISTRY.get_kb, "sisateg_kb")
+    try:
+        # Busca o pool de candidatos da KB (o mesmo do agente) e corta em `limit` após agrupar por ticket
+        documents_per_query = await batch_vector_search(
+            kb, body.queries, limit=max(body.limit, kb.max_results), filters=body.filters
+        )
+    except ValueError as e:
+        # Filtro inválido (ex: operador de intervalo desconhecido)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Ranking por query: ticket_ids na ordem da busca, sem repetir chunks do mesmo registro
+    ranked_ticket_ids: List[List[int]] = []
+    for documents in documents_per_query:
+        ticket_ids: List[int] = []
+        for doc in documents:
+            ticket_id = (doc.meta_data or {}).get("ticket_id")
+            if ticket_id is not None and int(ticket_id) not in ticket_ids:
+                ticket_ids.append(int(ticket_id))
+        ranked_ticket_ids.append(ticket_ids[: body.limit])
+
+    # Uma única ida ao Postgres para todos os registros citados
+    all_ticket_ids = sorted({ticket_id for ticket_ids in ranked_ticket_ids for ticket_id in ticket_ids})
+    records = await asyncio.to_thread(knowledge_repo.find_by_ticket_ids, all_ticket_ids)
+
+    results = []
+    for query, documents, ticket_ids in zip(body.queries, documents_per_query, ranked_ticket_ids):
+        scores = {}
+        for doc in documents:
+            ticket_id = (doc.meta_data or {}).get("ticket_id")
+            if ticket_id is not None:
+                scores.setdefault(int(ticket_id), doc.reranking_score)
+        results.append({
+            "query": query,
+            "records": [
+                {"rank": rank, "score": scores.get(ticket_id), **records[ticket_id]}
+                for rank, ticket_id in enumerate((t for t in ticket_ids if t in records), start=1)
+            ],
+        })
+    return {"results": results}
+
+
+def parse_final_content(content: Any) -> Any:
+    """
+    Resposta final do stream: remove o markdown de JSON e devolve o objeto, se for
+    JSON válido (feito uma única vez, não a cada delta).
+    """
+    if not isinstance(content, str):
+        return content
+    content = clean_markdown_json(content)
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return content
+
+
 async def chat_response_streamer(
-    service: Union[Agent, Team],
+    service: Union["Agent", "Team"],
     message: str,
     config: Optional[Dict[str, Any]] = None
 ) -> AsyncGenerator[str, None]:
     """
     Função geradora assíncrona para processar e retornar a resposta em stream (SSE).
-    Itera sobre os eventos retornados por `service.arun(stream=True)`.
+    Repassa os eventos de `service.arun(stream=True)` como eventos SSE tipados
+    (delta, tool_call, member_switch, final, error), agrupando os deltas de texto.
     """
+    from agno.team import Team  # Já carregado pela fábrica do serviço
+
     stream_config = config or {} # Garante que config não seja None
+    final_events = {"TeamRunCompleted"} if isinstance(service, Team) else {"RunCompleted"}
+    encoder = ChatEventEncoder(
+        final_events,
+        finalize=parse_final_content,
+        # Tokens de cada execução (equipe e membros) e erros reportados pelo Agno, para o /metrics
+        on_completed=lambda event: record_run_tokens(
+            getattr(event, "agent_name", None) or getattr(event, "team_name", None), getattr(event, "metrics", None)
+        ),
+        on_error=lambda event: ERRORS_TOTAL.inc(
+            source="agent_run", name=getattr(event, "agent_name", None) or getattr(event, "team_name", None) or ""
+        ),
+    )
 
     try:
         # Usamos arun com stream=True, que retorna um AsyncIterator de eventos
-        async for event in service.arun(message, stream=True, config=stream_config):
-            # Debug: vamos ver que tipo de evento e atributos estão disponíveis
-            print(f"STREAM EVENT TYPE: {type(event)}")
-            print(f"STREAM EVENT ATTRS: {dir(event)}")
-
-            # Tenta acessar o conteúdo do evento de diferentes formas
-            if hasattr(event, 'content') and event.content:
-                content = event.content
-            elif hasattr(event, 'data') and event.data:
-                content = event.data
-            elif hasattr(event, 'message') and event.message:
-                content = event.message
-            else:
-                content = str(event)
-
-            # Limpa formatação markdown se necessário
-            content = clean_markdown_json(str(content))
-
-            # Tenta parsear como JSON se possível
-            try:
-                content_json = json.loads(content)
-                output_data = json.dumps(content_json, ensure_ascii=False)
-            except json.JSONDecodeError:
-                # Se não for JSON, retorna como texto
-                output_data = json.dumps({"content": content}, ensure_ascii=False)
-
-            # Formato Server-Sent Events (SSE)
-            yield f"data: {output_data}\n\n"
+        async for frame in stream_chat_events(service.arun(message, stream=True, config=stream_config), encoder):
+            yield frame
 
     except Exception as e:
         print(f"Erro durante o stream: {e}")
-        # Retorna um evento de erro no stream
-        error_data = json.dumps({"error": "Ocorreu um erro durante o processamento.", "details": str(e)})
-        yield f"data: {error_data}\n\n"
-        # Você pode querer logar o erro completo aqui
+        ERRORS_TOTAL.inc(source="agent_run", name=getattr(service, "name", None) or "")
+        # Retorna um evento de erro no stream (com o texto já recebido antes, se houver)
+        pending = encoder.flush()
+        if pending is not None:
+            yield pending
+        yield encode_sse("error", {"error": "Ocorreu um erro durante o processamento.", "details": str(e)})
         import traceback
         traceback.print_exc()
 
+async def release_after_stream(stream: AsyncGenerator[str, None], lease: AdmissionLease) -> AsyncGenerator[str, None]:
+    """Repassa o stream e libera a vaga do serviço quando ele termina (ou é interrompido)."""
+    try:
+        async for frame in stream:
+            yield frame
+    finally:
+        lease.release()
+
+
 @support_router.post("/chat/{service_id}")
 async def chat_with_service(service_id: str, body: ChatRequest):
     """
     Envia uma mensagem para um serviço de suporte (equipe ou agente) e
     retorna a resposta, em stream ou como um objeto único.
     """
-    # Obtém a instância do serviço (Agente ou Equipe) pelo nome
-    service = AGENT_REGISTRY.get_service(service_id)
-
-    if service is None:
+    # Só confere o nome aqui: a instância é criada depois da admissão
+    if not AGENT_REGISTRY.has_service(service_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Serviço '{service_id}' não encontrado."
@@ -125,7 +237,12 @@ async def chat_with_service(service_id: str, body: ChatRequest):
     # Prepara a configuração, incluindo session_id e user_id se fornecidos
     # O Agno/Langchain usa a chave 'configurable' para isso
     config = body.config or {}
-    configurable_config = config.get("configurable", {})
+    configurable_config = config.get("configurable") or {}
+    if not isinstance(configurable_config, dict):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'config.configurable' deve ser um objeto."
+        )
     if body.session_id:
         configurable_config["session_id"] = body.session_id
     if body.user_id:
@@ -133,17 +250,40 @@ async def chat_with_service(service_id: str, body: ChatRequest):
         configurable_config["user_id"] = body.user_id
     config["configurable"] = configurable_config
 
+    # Controle de admissão: espera uma vaga do serviço ou recusa na hora (429).
+    # As validações ficam acima daqui, para não prender a vaga; o que vem depois libera a vaga se falhar.
+    try:
+        lease = await ADMISSION_CONTROLLER.admit(service_id)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after_s)},
+        )
+
+    try:
+        # Cria uma instância própria do serviço (Agente ou Equipe) para esta requisição.
+        # Só com a vaga garantida: requisições recusadas com 429 não pagam a construção
+        # (a equipe completa monta seis agentes)
+        service = AGENT_REGISTRY.get_service(service_id, session_id=body.session_id, user_id=body.user_id)
+    except Exception:
+        lease.release()
+        raise
+
     if body.stream:
         # Retorna a resposta em stream usando Server-Sent Events (SSE)
+        # A vaga fica reservada até o fim do stream (o background cobre o cliente que desconecta antes)
         return StreamingResponse(
-            chat_response_streamer(service, body.message, config),
-            media_type="text/event-stream"
+            release_after_stream(chat_response_streamer(service, body.message, config), lease),
+            media_type="text/event-stream",
+            background=BackgroundTask(lease.release),
         )
     else:
         # Executa de forma síncrona (espera o resultado final)
         try:
             # Usamos arun com stream=False, que retorna o AgentRun final
             agent_run: Any = await service.arun(body.message, stream=False, config=config)
+            record_run_output_tokens(agent_run)
 
             # Para Team, pode ter estrutura diferente de Agent individual
             if hasattr(agent_run, 'run_output'):
@@ -178,9 +318,12 @@ async def chat_with_service(service_id: str, body: ChatRequest):
 
         except Exception as e:
             print(f"Erro durante a execução não-stream: {e}")
+            ERRORS_TOTAL.inc(source="agent_run", name=service_id)
             import traceback
             traceback.print_exc()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Ocorreu um erro durante o processamento: {str(e)}"
             )
+        finally:
+            lease.release()
@@ -9,6 +9,7 @@ from api.routes.health import health_router  # Para o endpoint /health
 
 # --- 2. ADICIONAR Importação do Nosso Roteador de Suporte ---
 from api.routes.support import support_router # Para os endpoints /support/...
+from api.routes.jobs import jobs_router # Para os endpoints /jobs/...
 
 # --- 3. Criação do Roteador Principal v1 ---
 v1_router = APIRouter(prefix="/v1")
@@ -21,5 +22,6 @@ v1_router.include_router(health_router)
 
 # ADICIONA o nosso roteador de suporte
 v1_router.include_router(support_router)
+v1_router.include_router(jobs_router)
 
-print("--- v1 Router Configurado com: health, agents, playground, support ---")
+print("--- v1 Router Configurado com: health, agents, playground, support, jobs ---")
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field, field_validator
 from pydantic_core.core_schema import FieldValidationInfo
@@ -14,6 +14,23 @@ class ApiSettings(BaseSettings):
     # Set to False to disable docs at /docs and /redoc
     docs_enabled: bool = True
 
+    # Warm up the knowledge bases (LanceDB tables, index pages and embedder
+    # connection) in the background after startup. /v1/health only reports
+    # ready once the warm-up completes.
+    warm_up_on_startup: bool = True
+
+    # Admission control for /v1/support/chat (core/admission.py): each service
+    # (support_team or an individual agent) runs at most chat_max_concurrency
+    # chats at once; up to chat_max_queue more wait for a slot for at most
+    # chat_queue_timeout_s, and anything beyond that gets a 429 with Retry-After.
+    # Per-service overrides, e.g. CHAT_SERVICE_CONCURRENCY='{"support_team": 4}'.
+    chat_max_concurrency: int = 8
+    chat_max_queue: int = 16
+    chat_queue_timeout_s: float = 10.0
+    chat_service_concurrency: Dict[str, int] = Field(default_factory=dict)
+    # Retry-After (seconds) used until a service has completed runs to estimate from
+    chat_retry_after_s: int = 2
+
     # Cors origin list to allow requests from.
     # This list is set using the set_cors_origin_list validator
     # which uses the runtime_env variable to set the
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, List, Optional
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Content deltas are buffered at most this long (or up to SSE_MAX_BUFFERED_CHARS) before being sent
+SSE_FLUSH_INTERVAL_S = 0.05
+SSE_MAX_BUFFERED_CHARS = 2048
+
+# Agno event names (RunEvent / TeamRunEvent values) mapped to the SSE event types we emit
+_CONTENT_EVENTS = {"RunContent", "TeamRunContent"}
+_TOOL_STARTED_EVENTS = {"ToolCallStarted", "TeamToolCallStarted"}
+_TOOL_COMPLETED_EVENTS = {"ToolCallCompleted", "TeamToolCallCompleted"}
+_ERROR_EVENTS = {"RunError", "TeamRunError"}
+_COMPLETED_EVENTS = {"RunCompleted", "TeamRunCompleted"}
+
+
+def dumps(data: Any) -> str:
+    """Compact JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode()
+    return json.dumps(data, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def encode_sse(event: str, data: Any) -> str:
+    """Encode one typed Server-Sent Event."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return value
+
+
+class ChatEventEncoder:
+    """
+    Turns the event stream of `agent.arun(stream=True)` / `team.arun(stream=True)`
+    into typed SSE events: delta, tool_call, member_switch, final and error.
+
+    Events are dispatched on their `event` name, without inspecting their attributes
+    otherwise, and text deltas are coalesced into one SSE event per flush interval.
+
+    Args:
+        final_events: Agno event names that carry the final answer of the run being
+            streamed (RunCompleted for an agent, TeamRunCompleted for a team; member
+            completions only mark the end of the member's turn).
+        finalize: Optional function applied to the final content (e.g. JSON parsing).
+        on_completed: Optional callback receiving every run completion event, the
+            team's and each member's (e.g. to record token usage).
+        on_error: Optional callback receiving every run error event.
+    """
+
+    def __init__(self, final_events: set, finalize=None, on_completed=None, on_error=None):
+        self.final_events = final_events
+        self.finalize = finalize
+        self.on_completed = on_completed
+        self.on_error = on_error
+        self._buffer: List[str] = []
+        self._buffered_chars = 0
+        self._speaker: Optional[str] = None
+        self.final_sent = False
+
+    @property
+    def has_buffer(self) -> bool:
+        return bool(self._buffer)
+
+    def flush(self) -> Optional[str]:
+        if not self._buffer:
+            return None
+        content = "".join(self._buffer)
+        self._buffer = []
+        self._buffered_chars = 0
+        return encode_sse("delta", {"content": content, "member": self._speaker})
+
+    def encode(self, event: Any) -> List[str]:
+        """Return the SSE frames produced by one Agno event (usually zero or one)."""
+        name = getattr(event, "event", None)
+        frames: List[str] = []
+
+        if name in _COMPLETED_EVENTS and self.on_completed is not None:
+            self.on_completed(event)
+        elif name in _ERROR_EVENTS and self.on_error is not None:
+            self.on_error(event)
+
+        speaker = getattr(event, "agent_name", None) or getattr(event, "team_name", None)
+        if speaker and speaker != self._speaker and (name in _CONTENT_EVENTS or name in _TOOL_STARTED_EVENTS):
+            self._append(frames, self.flush())
+            if self._speaker is not None:
+                frames.append(encode_sse("member_switch", {"from": self._speaker, "to": speaker}))
+            self._speaker = speaker
+
+        if name in _CONTENT_EVENTS:
+            content = event.content
+            if isinstance(content, str):
+                if content:
+                    self._buffer.append(content)
+                    self._buffered_chars += len(content)
+                    if self._buffered_chars >= SSE_MAX_BUFFERED_CHARS:
+                        self._append(frames, self.flush())
+            elif content is not None:
+                # Structured output (output_schema) arrives whole, not as text deltas
+                self._append(frames, self.flush())
+                frames.append(encode_sse("delta", {"content": _plain(content), "member": self._speaker}))
+        elif name in _TOOL_STARTED_EVENTS or name in _TOOL_COMPLETED_EVENTS:
+            self._append(frames, self.flush())
+            tool = event.tool
+            frames.append(encode_sse("tool_call", {
+                "status": "started" if name in _TOOL_STARTED_EVENTS else "completed",
+                "tool": tool.tool_name if tool else None,
+                "args": tool.tool_args if tool else None,
+                "error": bool(tool.tool_call_error) if tool else False,
+                "member": speaker,
+            }))
+        elif name in self.final_events:
+            self._append(frames, self.flush())
+            content = _plain(event.content)
+            if self.finalize is not None:
+                content = self.finalize(content)
+            frames.append(encode_sse("final", {"content": content}))
+            self.final_sent = True
+        elif name in _ERROR_EVENTS:
+            self._append(frames, self.flush())
+            frames.append(encode_sse("error", {"error": event.content, "type": getattr(event, "error_type", None)}))
+        return frames
+
+    @staticmethod
+    def _append(frames: List[str], frame: Optional[str]) -> None:
+        if frame is not None:
+            frames.append(frame)
+
+
+async def stream_chat_events(
+    events: AsyncIterator[Any],
+    encoder: ChatEventEncoder,
+    flush_interval: float = SSE_FLUSH_INTERVAL_S,
+) -> AsyncGenerator[str, None]:
+    """
+    Encode an Agno event stream as SSE, flushing buffered deltas every
+    `flush_interval` even while the model is silent (e.g. during a tool call).
+    """
+    iterator = events.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    flush_at = 0.0
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(flush_at - time.monotonic(), 0) if encoder.has_buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Keep waiting for the same event; just push the buffered text out
+                frame = encoder.flush()
+                if frame is not None:
+                    yield frame
+                continue
+
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            had_buffer = encoder.has_buffer
+            for frame in encoder.encode(event):
+                yield frame
+            if encoder.has_buffer and not had_buffer:
+                flush_at = time.monotonic() + flush_interval
+
+        frame = encoder.flush()
+        if frame is not None:
+            yield frame
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
@@ -0,0 +1,156 @@
+# agent-api/benchmarks/agent_concurrency_benchmark.py
+"""
+Benchmark e verificação de isolamento das instâncias por requisição do
+AGENT_REGISTRY: N sessões simultâneas (padrão 100), cada uma com o seu
+Agent/Team criado por `get_service(..., session_id=...)`, alternando entre os
+quatro agentes e a support_team.
+
+O LLM é trocado por um modelo de eco (latência aleatória, sem rede) que
+responde com a última mensagem do usuário; todos os agentes (e a equipe com
+os seus membros) dividem a MESMA instância dele, como dividem o Gemini em produção. Cada sessão confere se a
+resposta e o session_id da execução são os seus (sem vazamento entre chats) e
+o script mede o custo de criar as instâncias (agentes e a equipe completa).
+
+Importa os agentes reais: precisa das variáveis POSTGRES_* do .env, mas não
+faz nenhuma query.
+
+Uso:
+    python -m benchmarks.agent_concurrency_benchmark
+    python -m benchmarks.agent_concurrency_benchmark --sessions 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List
+
+# Sem telemetria do Agno: uma chamada HTTP por execução distorceria a medição
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+
+from core.agent_registry import AGENT_REGISTRY
+
+AGENT_SERVICES = ["TriageCoordinatorAgent", "N1_SupportAgent", "N2_DiagnosticAgent", "N3_ResolutionAgent"]
+TEAM_SERVICE = "support_team"
+# Serviços exercitados pelas sessões simultâneas (a equipe entra no rodízio)
+SESSION_SERVICES = AGENT_SERVICES + [TEAM_SERVICE]
+
+
+@dataclass
+class EchoModel(Model):
+    """Modelo falso: responde 'eco: <última mensagem do usuário>' após uma espera aleatória."""
+
+    id: str = "echo"
+    name: str = "EchoModel"
+    provider: str = "benchmark"
+    max_delay_s: float = 0.02
+
+    @staticmethod
+    def _reply(messages: List[Any]) -> ModelResponse:
+        last_user = next(message for message in reversed(messages) if message.role == "user")
+        return ModelResponse(role="assistant", content=f"eco: {last_user.get_content_string()}")
+
+    def invoke(self, messages: List[Any], **kwargs) -> ModelResponse:
+        time.sleep(random.uniform(0, self.max_delay_s))
+        return self._reply(messages)
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> ModelResponse:
+        await asyncio.sleep(random.uniform(0, self.max_delay_s))
+        return self._reply(messages)
+
+    def invoke_stream(self, messages: List[Any], **kwargs) -> Iterator[ModelResponse]:
+        yield self.invoke(messages)
+
+    async def ainvoke_stream(self, messages: List[Any], **kwargs) -> AsyncIterator[ModelResponse]:
+        yield await self.ainvoke(messages)
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
+
+
+async def run_session(index: int, model: EchoModel) -> List[str]:
+    """Executa uma sessão e devolve os problemas de isolamento encontrados."""
+    service_name = SESSION_SERVICES[index % len(SESSION_SERVICES)]
+    session_id = f"bench-session-{index}"
+    agent = AGENT_REGISTRY.get_service(service_name, session_id=session_id, user_id=f"bench-user-{index}")
+    # Na equipe, o "Gerente" e todos os membros usam o modelo de eco (nenhuma chamada ao Gemini)
+    for instance in [agent] + list(getattr(agent, "members", None) or []):
+        instance.model = model
+        instance.debug_mode = False
+
+    token = f"mensagem-{index}-{random.randrange(10**9)}"
+    output = await agent.arun(token)
+
+    problems = []
+    if output.content != f"eco: {token}":
+        problems.append(f"{session_id} ({service_name}): resposta de outra sessão: {output.content!r}")
+    if output.session_id != session_id or agent.session_id != session_id:
+        problems.append(f"{session_id} ({service_name}): session_id trocado ({output.session_id} / {agent.session_id})")
+    return problems
+
+
+def measure_factory(service_name: str, repetitions: int) -> float:
+    """Tempo médio (ms) de `get_service` para o serviço."""
+    started_at = time.perf_counter()
+    for i in range(repetitions):
+        AGENT_REGISTRY.get_service(service_name, session_id=f"factory-{i}")
+    return (time.perf_counter() - started_at) * 1000 / repetitions
+
+
+def check_team_isolation() -> List[str]:
+    first = AGENT_REGISTRY.get_service(TEAM_SERVICE, session_id="a")
+    second = AGENT_REGISTRY.get_service(TEAM_SERVICE, session_id="b")
+    problems = []
+    if first is second or any(a is b for a, b in zip(first.members, second.members)):
+        problems.append("support_team: instâncias de membros compartilhadas entre requisições")
+    if first.model is not second.model:
+        problems.append("support_team: o modelo deveria ser compartilhado entre as instâncias")
+    for a, b in zip(first.members, second.members):
+        if any(tool_a is tool_b for tool_a in (a.tools or []) for tool_b in (b.tools or [])):
+            problems.append(f"{a.name}: objetos Function compartilhados entre instâncias")
+    return problems
+
+
+async def main_async(sessions: int) -> int:
+    model = EchoModel()
+    problems = check_team_isolation()
+
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*[run_session(i, model) for i in range(sessions)])
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    problems += [problem for session_problems in results for problem in session_problems]
+
+    print(f"\n{sessions} sessões simultâneas em {elapsed_ms:.0f} ms")
+    factory_ms = {name: measure_factory(name, 50) for name in SESSION_SERVICES}
+    for name, ms in factory_ms.items():
+        print(f"   get_service({name!r}): {ms:.2f} ms/instância")
+    print(f"   mediana dos agentes: {statistics.median(factory_ms[name] for name in AGENT_SERVICES):.2f} ms")
+
+    if problems:
+        print(f"\nFALHOU: {len(problems)} problema(s) de isolamento")
+        for problem in problems[:20]:
+            print(f"   - {problem}")
+        return 1
+    print("\nOK: nenhuma resposta ou sessão misturada entre as requisições.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Isolamento e custo das instâncias por requisição dos agentes.")
+    parser.add_argument("--sessions", type=int, default=100)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args.sessions)))
+
+
+if __name__ == "__main__":
+    main()
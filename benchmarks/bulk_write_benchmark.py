@@ -0,0 +1,151 @@
+# agent-api/benchmarks/bulk_write_benchmark.py
+"""
+Benchmark do caminho de escrita em lote: executemany (caminho antigo do
+save_batch / log_batch_details) x BaseRepository.bulk_insert (INSERT ... SELECT
+sobre jsonb_populate_recordset), com 1k e 10k linhas.
+
+Usa o mesmo Postgres dos repositórios (POSTGRES_* do .env) e uma tabela de
+rascunho com o formato da ybs_knowledge_base, criada e removida pelo próprio
+script. Mede a inserção inicial e o upsert (todas as linhas em conflito) e
+confere se os IDs retornados batem com a ordem de entrada.
+
+Uso:
+    python -m benchmarks.bulk_write_benchmark
+    python -m benchmarks.bulk_write_benchmark --sizes 1000 10000 50000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+from repositories.base_repository import BaseRepository
+
+SCRATCH_TABLE = "public.bench_bulk_write"
+
+CREATE_SCRATCH_TABLE = f"""
+    CREATE TABLE {SCRATCH_TABLE} (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        ticket_id integer NOT NULL UNIQUE,
+        title text,
+        problem_summary text,
+        solution_type text,
+        sql_template jsonb,
+        tags text[],
+        ticket_level integer,
+        created_at timestamp,
+        updated_at timestamp
+    );
+"""
+
+# Mesmo formato da query antiga do save_batch (executemany)
+LEGACY_UPSERT = f"""
+    INSERT INTO {SCRATCH_TABLE} (
+        ticket_id, title, problem_summary, solution_type, sql_template, tags, ticket_level, created_at, updated_at
+    )
+    VALUES (
+        :ticket_id, :title, :problem_summary, :solution_type, CAST(:sql_template AS jsonb), :tags, :ticket_level,
+        CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (ticket_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        problem_summary = EXCLUDED.problem_summary,
+        tags = EXCLUDED.tags,
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING id;
+"""
+
+COLUMNS = [
+    "ticket_id", "title", "problem_summary", "solution_type", "sql_template", "tags", "ticket_level",
+    "created_at", "updated_at",
+]
+
+
+def make_rows(size: int, revision: int = 0) -> List[Dict[str, Any]]:
+    return [
+        {
+            "ticket_id": 900000 + i,
+            "title": f"Chamado sintético {i} (rev {revision})",
+            "problem_summary": "Relatório financeiro em branco no módulo de gestão " * 4,
+            "solution_type": "Correção de Banco" if i % 3 == 0 else "Orientação ao Usuário",
+            "sql_template": ["UPDATE tabela SET campo = 1 WHERE id = :id;"],
+            "tags": ["relatório", "permissão", f"tag-{i % 50}"],
+            "ticket_level": 1 + i % 3,
+        }
+        for i in range(size)
+    ]
+
+
+def legacy_write(repo: BaseRepository, rows: List[Dict[str, Any]]) -> List[Any]:
+    params = [dict(row, sql_template=json.dumps(row["sql_template"])) for row in rows]
+    return [row["id"] for row in repo.execute(LEGACY_UPSERT, params)]
+
+
+def bulk_write(repo: BaseRepository, rows: List[Dict[str, Any]]) -> List[Any]:
+    return repo.bulk_insert(
+        SCRATCH_TABLE,
+        rows,
+        columns=COLUMNS,
+        conflict_columns=["ticket_id"],
+        update_columns=["title", "problem_summary", "tags", "updated_at"],
+        column_expressions={"created_at": "CURRENT_TIMESTAMP", "updated_at": "CURRENT_TIMESTAMP"},
+        returning="id",
+    )
+
+
+def ids_in_input_order(repo: BaseRepository, rows: List[Dict[str, Any]], ids: List[Any]) -> bool:
+    stored = repo.execute(f"SELECT ticket_id, id FROM {SCRATCH_TABLE}")
+    id_by_ticket = {row["ticket_id"]: row["id"] for row in stored}
+    return ids == [id_by_ticket.get(row["ticket_id"]) for row in rows]
+
+
+def measure(repo: BaseRepository, writer, size: int) -> Dict[str, Any]:
+    repo.execute(f"TRUNCATE {SCRATCH_TABLE}")
+
+    rows = make_rows(size)
+    start_time = time.perf_counter()
+    ids = writer(repo, rows)
+    insert_ms = (time.perf_counter() - start_time) * 1000
+
+    rows = make_rows(size, revision=1)
+    start_time = time.perf_counter()
+    upsert_ids = writer(repo, rows)
+    upsert_ms = (time.perf_counter() - start_time) * 1000
+
+    return {
+        "insert_ms": round(insert_ms, 1),
+        "upsert_ms": round(upsert_ms, 1),
+        "insert_rows_s": int(size / (insert_ms / 1000)),
+        "upsert_rows_s": int(size / (upsert_ms / 1000)),
+        "ids_returned": len(ids) == size and len(upsert_ids) == size,
+        "ids_in_order": ids_in_input_order(repo, rows, upsert_ids),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark executemany x bulk_insert no Postgres.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    args = parser.parse_args()
+
+    repo = BaseRepository()
+    repo.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+    repo.execute(CREATE_SCRATCH_TABLE)
+    try:
+        print(f"\n{'linhas':>7} {'caminho':<12} {'insert ms':>10} {'upsert ms':>10} {'insert l/s':>11} {'upsert l/s':>11} {'ids ok':>7}")
+        for size in args.sizes:
+            results = {"executemany": measure(repo, legacy_write, size), "bulk_insert": measure(repo, bulk_write, size)}
+            for path, metrics in results.items():
+                print(
+                    f"{size:>7} {path:<12} {metrics['insert_ms']:>10.1f} {metrics['upsert_ms']:>10.1f} "
+                    f"{metrics['insert_rows_s']:>11} {metrics['upsert_rows_s']:>11} "
+                    f"{str(metrics['ids_returned'] and metrics['ids_in_order']):>7}"
+                )
+            speedup = results["executemany"]["upsert_ms"] / max(results["bulk_insert"]["upsert_ms"], 0.001)
+            print(f"{'':>7} → bulk_insert {speedup:.1f}x mais rápido no upsert")
+    finally:
+        repo.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        repo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# agent-api/benchmarks/retrieval_benchmark.py
+"""
+Benchmark offline de qualidade e latência da recuperação (RAG).
+
+Monta a mesma KB do KnowledgeRegistry (LanceDb/FilteredLanceDb + Knowledge +
+MMR) sobre um corpus fixo em benchmarks/fixtures, trocando apenas o embedder
+por um determinístico (hashing de tokens), e mede para cada modo de busca
+(vector, keyword, hybrid): recall@k, MRR, latência p50/p99 e tamanho do índice.
+
+Uso:
+    python -m benchmarks.retrieval_benchmark
+    python -m benchmarks.retrieval_benchmark --modes vector hybrid -k 3 --json resultado.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.base import Embedder
+
+from knowledge.registry import KnowledgeRegistry
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CORPUS_PATH = os.path.join(FIXTURES_DIR, "knowledge_corpus.json")
+QUERIES_PATH = os.path.join(FIXTURES_DIR, "labeled_queries.json")
+SEARCH_MODES = ["vector", "keyword", "hybrid"]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """
+    Embedder determinístico e offline: tokens (sem acento, minúsculos) e trigramas
+    de caracteres são espalhados em `dimensions` posições via hash. Textos que
+    compartilham termos ficam próximos, o suficiente para comparar configurações
+    de busca sem chamar o Gemini.
+    """
+
+    dimensions: Optional[int] = 256
+
+    def _features(self, text: str) -> List[str]:
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+        tokens = [token for token in _TOKEN_PATTERN.findall(normalized) if len(token) > 2]
+        trigrams = [token[i:i + 3] for token in tokens for i in range(len(token) - 2)]
+        return tokens + trigrams
+
+    def get_embedding(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.md5(feature.encode()).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] % 2 == 0 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm > 0 else vector).tolist()
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+class BenchmarkRegistry(KnowledgeRegistry):
+    """KnowledgeRegistry com uma KB por modo de busca, em um diretório temporário e com o HashingEmbedder."""
+
+    def __init__(self, base_definitions: Dict[str, Any], vector_db_path: str, modes: List[str], diversification: bool):
+        self._kbsDefinitions = {}
+        for mode in modes:
+            definitions = json.loads(json.dumps(base_definitions))
+            definitions.update({
+                "VectorDbPath": vector_db_path,
+                "VectorTableName": f"benchmark_{mode}",
+                "SearchType": mode,
+                "UseTantivy": False,  # FTS nativo do LanceDB: sem dependência extra do tantivy
+                "Preload": False,
+            })
+            if not diversification:
+                definitions["Diversification"] = {"Enabled": False}
+            self._kbsDefinitions[mode] = definitions
+        super().__init__()
+
+    def _create_embedder(self, definitions):
+        return HashingEmbedder()
+
+
+def _load_fixtures() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    return corpus, queries
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            total += os.path.getsize(os.path.join(root, file_name))
+    return total
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    return float(np.percentile(np.asarray(values), percentile)) if values else 0.0
+
+
+def load_corpus(kb, corpus: List[Dict[str, Any]]) -> float:
+    """Carrega o corpus pelo mesmo caminho do vector_knowledge_builder (add_content). Retorna a duração em ms."""
+    start_time = time.perf_counter()
+    for record in corpus:
+        kb.add_content(
+            name=str(record["ticket_id"]),
+            text_content=record["text"],
+            metadata={
+                "ticket_id": record["ticket_id"],
+                "solution_type": record["solution_type"],
+                "ticket_level": record["ticket_level"],
+                "tags": record["tags"],
+            },
+        )
+    return (time.perf_counter() - start_time) * 1000
+
+
+def evaluate(kb, queries: List[Dict[str, Any]], k: int, repeats: int) -> Dict[str, Any]:
+    """
+    Executa as queries rotuladas `repeats` vezes e calcula recall@k, MRR e latência.
+    A qualidade é medida na primeira rodada; as latências consideram todas.
+    """
+    recalls: List[float] = []
+    reciprocal_ranks: List[float] = []
+    latencies_ms: List[float] = []
+
+    # Query descartada: abre a tabela e cria o índice FTS fora da medição
+    kb.vector_db.search(query=queries[0]["query"], limit=k)
+
+    for repeat in range(repeats):
+        for labeled in queries:
+            start_time = time.perf_counter()
+            results = kb.vector_db.search(query=labeled["query"], limit=kb.max_results)
+            latencies_ms.append((time.perf_counter() - start_time) * 1000)
+            if repeat > 0:
+                continue
+
+            ranked_ids = [(doc.meta_data or {}).get("ticket_id") for doc in results][:k]
+            relevant = set(labeled["relevant_ticket_ids"])
+            recalls.append(len(relevant & set(ranked_ids)) / len(relevant))
+            reciprocal_rank = 0.0
+            for position, ticket_id in enumerate(ranked_ids, start=1):
+                if ticket_id in relevant:
+                    reciprocal_rank = 1.0 / position
+                    break
+            reciprocal_ranks.append(reciprocal_rank)
+
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "p50_ms": round(_percentile(latencies_ms, 50), 2),
+        "p99_ms": round(_percentile(latencies_ms, 99), 2),
+        "queries": len(queries),
+        "samples": len(latencies_ms),
+    }
+
+
+def run_benchmark(
+    modes: List[str], k: int = 5, repeats: int = 5, diversification: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Roda o benchmark para os modos informados e retorna modo -> métricas.
+    Usa a definição da sisateg_kb do KnowledgeRegistry como base.
+    """
+    corpus, queries = _load_fixtures()
+    base_definitions = KnowledgeRegistry._kbsDefinitions["sisateg_kb"]
+    vector_db_path = tempfile.mkdtemp(prefix="retrieval_benchmark_")
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        registry = BenchmarkRegistry(base_definitions, vector_db_path, modes, diversification)
+        for mode in modes:
+            print(f"\n--- Modo '{mode}' ---")
+            kb = registry.get_kb(mode)
+            ingest_ms = load_corpus(kb, corpus)
+            if hasattr(kb.vector_db, "ensure_scalar_indexes"):
+                kb.vector_db.ensure_scalar_indexes()
+            metrics = evaluate(kb, queries, k, repeats)
+            metrics["ingest_ms"] = round(ingest_ms, 1)
+            metrics["index_size_kb"] = round(
+                _directory_size(os.path.join(vector_db_path, f"benchmark_{mode}.lance")) / 1024, 1
+            )
+            results[mode] = metrics
+            print(f"   → {metrics}")
+    finally:
+        shutil.rmtree(vector_db_path, ignore_errors=True)
+    return results
+
+
+def print_report(results: Dict[str, Dict[str, Any]], k: int) -> None:
+    header = f"{'modo':<8} {'recall@' + str(k):>9} {'mrr':>7} {'p50 ms':>8} {'p99 ms':>8} {'índice KB':>10}"
+    print("\n" + "=" * len(header))
+    print(header)
+    print("=" * len(header))
+    for mode, metrics in results.items():
+        print(
+            f"{mode:<8} {metrics[f'recall@{k}']:>9.3f} {metrics['mrr']:>7.3f} "
+            f"{metrics['p50_ms']:>8.2f} {metrics['p99_ms']:>8.2f} {metrics['index_size_kb']:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de recuperação da base de conhecimento.")
+    parser.add_argument("--modes", nargs="+", choices=SEARCH_MODES, default=SEARCH_MODES)
+    parser.add_argument("-k", type=int, default=5, help="Corte do recall@k e do MRR.")
+    parser.add_argument("--repeats", type=int, default=5, help="Rodadas de queries para a latência.")
+    parser.add_argument("--no-diversification", action="store_true", help="Desativa o estágio MMR.")
+    parser.add_argument("--json", dest="json_path", help="Grava as métricas em um arquivo JSON.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.modes, k=args.k, repeats=args.repeats, diversification=not args.no_diversification)
+    print_report(results, args.k)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nMétricas gravadas em {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# agent-api/benchmarks/startup_benchmark.py
+"""
+Benchmark do tempo de import da API (cold start e cada recarga do `--reload`).
+
+Importa `api.main` em processos novos (N rodadas, padrão 5) e mede o tempo do
+import, sem as variáveis POSTGRES_* / GOOGLE_API_KEY no ambiente: o import não
+pode depender do banco. Em cada rodada também confere que nada pesado foi
+carregado ou criado (LanceDB, google-genai, agentes, toolkits, pools do
+ENGINE_REGISTRY), pois isso deve acontecer só no warm-up após o startup ou no
+primeiro uso.
+
+Falha (código de saída 1) se a mediana passar do orçamento ou se algum import
+tiver efeito colateral.
+
+Uso:
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --runs 10 --budget-ms 1000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+# Orçamento padrão (mediana): antes dos registries preguiçosos o import levava ~3 s
+DEFAULT_BUDGET_MS = 1500
+
+# Módulos que só podem ser carregados depois do startup (warm-up) ou no primeiro chat
+FORBIDDEN_MODULES = [
+    "numpy",
+    "lancedb",
+    "google.genai",
+    "agno.agent",
+    "agno.run.agent",
+    "agno.team",
+    "agno.vectordb.lancedb",
+    "teams.support_team",
+    "agents.support_triage_coordinator",
+    "agents.support_n1_agent",
+    "agents.support_n2_agent",
+    "agents.support_n3_agent",
+    "toolkits.support_toolkit",
+]
+
+# Variáveis removidas do ambiente do processo filho
+DATABASE_ENV_VARS = ["POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB", "POSTGRES_HOST", "POSTGRES_REPLICA_HOST", "GOOGLE_API_KEY"]
+
+# Executado em um processo novo: import medido + verificações de efeito colateral
+CHILD_SCRIPT = """
+import json, sys, time
+started_at = time.perf_counter()
+import api.main
+elapsed_ms = (time.perf_counter() - started_at) * 1000
+from db.engines import ENGINE_REGISTRY
+from knowledge.registry import KNOWLEDGE_REGISTRY
+print(json.dumps({
+    "elapsed_ms": elapsed_ms,
+    "loaded": [name for name in %r if name in sys.modules],
+    "engines": list(ENGINE_REGISTRY.stats()),
+    "kbs": list(KNOWLEDGE_REGISTRY.all_kbs()),
+}))
+""" % (FORBIDDEN_MODULES,)
+
+
+def run_import() -> Dict[str, Any]:
+    """Importa api.main em um processo novo e devolve as medições."""
+    env = {name: value for name, value in os.environ.items() if name not in DATABASE_ENV_VARS}
+    env["AGNO_TELEMETRY"] = "false"
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import api.main falhou:\n{result.stderr.strip()}")
+    # O JSON é a última linha; as anteriores são os prints dos registries
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo e efeitos colaterais do import de api.main.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    problems: List[str] = []
+    timings: List[float] = []
+    for i in range(args.runs):
+        try:
+            measurement = run_import()
+        except RuntimeError as e:
+            print(f"\nFALHOU: {e}")
+            sys.exit(1)
+        timings.append(measurement["elapsed_ms"])
+        print(f"   rodada {i + 1}: {measurement['elapsed_ms']:.0f} ms")
+        if i == 0:
+            if measurement["loaded"]:
+                problems.append(f"módulos carregados no import: {measurement['loaded']}")
+            if measurement["engines"]:
+                problems.append(f"engines criados no import: {measurement['engines']}")
+            if measurement["kbs"]:
+                problems.append(f"KBs criadas no import: {measurement['kbs']}")
+
+    median_ms = statistics.median(timings)
+    print(f"\nimport api.main: mediana {median_ms:.0f} ms, mín {min(timings):.0f} ms, máx {max(timings):.0f} ms "
+          f"(orçamento {args.budget_ms:.0f} ms)")
+    if median_ms > args.budget_ms:
+        problems.append(f"mediana de {median_ms:.0f} ms acima do orçamento de {args.budget_ms:.0f} ms")
+
+    if problems:
+        print(f"\nFALHOU: {len(problems)} problema(s)")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+    print("\nOK: import dentro do orçamento e sem efeitos colaterais.")
+
+
+if __name__ == "__main__":
+    main()
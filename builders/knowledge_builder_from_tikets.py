@@ -14,6 +14,7 @@ from agents.knowledge_builder import batch_analysis_agent
 from repositories.chamados_repository import ChamadosRepository
 from repositories.knowledge_repository import KnowledgeRepository
 from repositories.log_repository import LogRepository
+from repositories.log_writer import BufferedLogWriter
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -317,6 +318,8 @@ def main():
     chamados_repo = ChamadosRepository()
     knowledge_repo = KnowledgeRepository()
     log_repo = LogRepository()
+    # Os logs por chamado são gravados em segundo plano, fora do caminho do loop
+    log_writer = BufferedLogWriter(log_repo)
 
     # Parâmetros de execução
     BATCH_SIZE = 5  # Processa 20 chamados por vez
@@ -331,6 +334,9 @@ def main():
     total_failed = 0
     job_id = None
     tickets_found = 0
+    # Status final do job, gravado uma única vez no finally (depois de esvaziar o log_writer)
+    final_status = "COMPLETED"
+    error_summary = None
 
     try:
         # Verificação inicial de tickets
@@ -368,31 +374,27 @@ def main():
             total_failed += failed
             count_processed += len(ticket_ids_batch) # Incrementa baseado no tamanho do lote
 
-            # Registra os resultados do lote
-            with safe_db_operation():
-                if log_entries:
-                    log_repo.log_batch_details(job_id, log_entries)
+            # Registra os resultados do lote (enfileirado; o BufferedLogWriter grava em lote)
+            if log_entries:
+                log_writer.submit(job_id, log_entries)
 
     except KeyboardInterrupt:
         print("\n\n⚠️ Processamento interrompido pelo usuário")
+        # update_job_summary só aceita COMPLETED/FAILED
+        final_status = "FAILED"
         error_summary = "Processamento interrompido pelo usuário"
-        if job_id:
-            with safe_db_operation():
-                log_repo.update_job_summary(
-                    job_id, "INTERRUPTED", total_succeeded, total_failed, error_summary
-                )
 
     except Exception as e:
         error_summary = f"Erro fatal no worker: {e}"
         print(f"\n🚨 {error_summary} 🚨")
         traceback.print_exc()
-        if job_id:
-            with safe_db_operation():
-                log_repo.update_job_summary(
-                    job_id, "FAILED", total_succeeded, total_failed, error_summary
-                )
+        final_status = "FAILED"
 
     finally:
+        # Grava os logs ainda em buffer antes do sumário do job: o sumário e os
+        # contadores de progresso incluem o último lote também em caso de falha
+        log_writer.close()
+
         # Finalização e sumário
         end_time_total = time.time()
         total_time = end_time_total - start_time_total
@@ -402,10 +404,9 @@ def main():
         print("="*60)
 
         if job_id:
-            final_status = "COMPLETED" if 'e' not in locals() else "FAILED"
             with safe_db_operation():
                 log_repo.update_job_summary(
-                    job_id, final_status, total_succeeded, total_failed
+                    job_id, final_status, total_succeeded, total_failed, error_summary
                 )
 
             print(f"\n📊 Estatísticas:")
@@ -16,10 +16,12 @@ warnings.filterwarnings('ignore', message='Contents DB not found for knowledge b
 from agno.knowledge.knowledge import Knowledge
 from agno.vectordb.lancedb import LanceDb, SearchType
 from agno.knowledge.embedder.google import GeminiEmbedder # Usando Gemini Embedder
+from knowledge.filtered_lancedb import FilteredLanceDb
 
 # Importa os repositórios
 from repositories.knowledge_repository import KnowledgeRepository
 from repositories.log_repository import LogRepository, JOB_TYPE_VECTORIZATION # Reutilizando o LogRepository
+from repositories.log_writer import BufferedLogWriter
 
 # Importa o gerenciador de arquivos temporários
 from tempfiles import TempFileManager
@@ -92,6 +94,22 @@ def calculate_text_hash(text: str) -> str:
     """Calcula um hash do texto para identificação única."""
     return hashlib.md5(text.encode()).hexdigest()
 
+def build_item_metadata(item: Dict[str, Any], text_hash: str) -> Dict[str, Any]:
+    """
+    Monta o meta_data do documento. solution_type, ticket_level, tags e updated_at
+    também viram colunas tipadas no FilteredLanceDb (filtros empurrados para o LanceDB).
+    """
+    updated_at = item.get('updated_at')
+    return {
+        'postgres_id': str(item['knowledge_id']),
+        'ticket_id': item['ticket_id'],
+        'content_hash': text_hash,
+        'solution_type': item.get('solution_type'),
+        'ticket_level': item.get('ticket_level'),
+        'tags': item.get('tags'),
+        'updated_at': updated_at.isoformat() if updated_at else None
+    }
+
 async def process_content_chunk(chunk: List[Dict[str, Any]], knowledge_base_agno: Knowledge) -> List[Any]:
     """Processa um subconjunto do lote em paralelo."""
     tasks = []
@@ -110,11 +128,7 @@ async def process_content_chunk(chunk: List[Dict[str, Any]], knowledge_base_agno
                 knowledge_base_agno.add_content_async(
                     name=str(item['knowledge_id']),
                     text_content=text_content,
-                    metadata={
-                        'postgres_id': str(item['knowledge_id']),
-                        'ticket_id': item['ticket_id'],
-                        'content_hash': text_hash
-                    },
+                    metadata=build_item_metadata(item, text_hash),
                     embedding=cached_embedding
                 )
             )
@@ -124,11 +138,7 @@ async def process_content_chunk(chunk: List[Dict[str, Any]], knowledge_base_agno
                 knowledge_base_agno.add_content_async(
                     name=str(item['knowledge_id']),
                     text_content=text_content,
-                    metadata={
-                        'postgres_id': str(item['knowledge_id']),
-                        'ticket_id': item['ticket_id'],
-                        'content_hash': text_hash
-                    }
+                    metadata=build_item_metadata(item, text_hash)
                 )
             )
 
@@ -300,6 +310,8 @@ def main():
     # Instanciamos os repositórios
     knowledge_repo = KnowledgeRepository()
     log_repo = LogRepository()
+    # Os logs por registro são gravados em segundo plano, fora do caminho do loop
+    log_writer = BufferedLogWriter(log_repo)
 
     # Parâmetros ajustados para processamento completo
     MAX_RECORDS = None # Processa todos os registros
@@ -323,6 +335,8 @@ def main():
     job_id = None
     total_found = 0
     knowledge_base_agno = None # Para garantir que está definida no finally
+    # Erro que encerrou o job, gravado no sumário do finally (depois de esvaziar o log_writer)
+    error_summary = None
 
     try:
         # --- Inicialização ---
@@ -331,34 +345,12 @@ def main():
             raise ValueError("Erro: Variável de ambiente GOOGLE_API_KEY não definida.")
         embedder = GeminiEmbedder(id=EMBEDDER_MODEL_ID)
 
-        # Configuração mais detalhada do LanceDB
-        import lancedb
-
-        # Estabelece conexão com o LanceDB
-        connection = lancedb.connect(VECTOR_DB_PATH)
-
-        # Verifica se a tabela existe, se não, cria
-        table = None
-        try:
-            table = connection.open_table(VECTOR_TABLE_NAME)
-            print(f"   → Tabela '{VECTOR_TABLE_NAME}' encontrada.")
-        except Exception as e:
-            print(f"   → Criando nova tabela '{VECTOR_TABLE_NAME}'...")
-            # Schema mínimo para o LanceDB
-            schema = {
-                "vector": "vector",
-                "text": "string",
-                "metadata": "json"
-            }
-            table = connection.create_table(VECTOR_TABLE_NAME, schema=schema)
-
-        # Inicializa o LanceDB com a tabela pré-configurada e otimizações
-        vector_db = LanceDb(
+        # FilteredLanceDb cria a tabela com o schema tipado (ou adiciona as colunas de
+        # metadados em uma tabela antiga) e grava os metadados como colunas filtráveis
+        vector_db = FilteredLanceDb(
             uri=VECTOR_DB_PATH,
             table_name=VECTOR_TABLE_NAME,
             embedder=embedder,
-            table=table,
-            connection=connection,
             use_tantivy=True  # Habilita indexação de texto completo
         )
         knowledge_base_agno = Knowledge(vector_db=vector_db)
@@ -407,8 +399,8 @@ def main():
             # Registra os resultados do lote
             with safe_db_operation(log_repo):
                 if log_entries:
-                    # **Lembrete:** Adaptar log_batch_details para aceitar knowledge_base_id (UUID)
-                    log_repo.log_batch_details(job_id, log_entries)
+                    # Enfileirado; o BufferedLogWriter grava em lote
+                    log_writer.submit(job_id, log_entries)
 
             # Verifica se atingiu o limite (redundante com a lógica no início, mas seguro)
             if MAX_RECORDS and count_processed >= MAX_RECORDS:
@@ -417,21 +409,28 @@ def main():
 
         print("\n🏁 Processamento de lotes concluído.")
 
+        # Índices escalares (BITMAP/LABEL_LIST/BTREE) só depois da carga; replace=True
+        # reconstrói para cobrir as linhas inseridas nesta execução
+        print("\n🔧 Criando índices escalares das colunas de metadados...")
+        index_results = vector_db.ensure_scalar_indexes(replace=True)
+        for column, result in index_results.items():
+            print(f"   → {column}: {result}")
+
     except KeyboardInterrupt:
         print("\n\n⚠️ Vetorização interrompida pelo usuário")
-        if job_id:
-            with safe_db_operation(log_repo):
-                 log_repo.update_job_summary(job_id, "FAILED", total_succeeded, total_failed, "Processo interrompido.")
+        error_summary = "Processo interrompido."
 
     except Exception as e:
         error_summary = f"Erro fatal durante a vetorização: {e}"
         print(f"\n🚨 {error_summary} 🚨")
         traceback.print_exc()
-        if job_id:
-            with safe_db_operation(log_repo):
-                log_repo.update_job_summary(job_id, "FAILED", total_succeeded, total_failed, error_summary[:1000])
+        error_summary = error_summary[:1000]
 
     finally:
+        # Grava os logs ainda em buffer antes do sumário do job: o sumário e os
+        # contadores de progresso incluem o último lote também em caso de falha
+        log_writer.close()
+
         # --- Finalização e Sumário ---
         end_time_total = time.time()
         total_time = end_time_total - start_time_total
@@ -442,10 +441,8 @@ def main():
 
         final_status = "UNKNOWN"
         # Determina status final baseado nos resultados e se houve interrupção/erro
-        if 'KeyboardInterrupt' in locals():
+        if error_summary: # Interrupção ou erro fatal capturado
             final_status = "FAILED"  # Mudado de INTERRUPTED para FAILED
-        elif 'e' in locals() and isinstance(e, Exception) and job_id: # Erro fatal capturado
-            final_status = "FAILED"
         elif total_failed > 0 and total_succeeded > 0:
             final_status = "FAILED"  # Mudado de PARTIAL para FAILED (pode ser customizado)
         elif total_failed > 0 and total_succeeded == 0:
@@ -461,7 +458,7 @@ def main():
             try:
                 # Atualiza o job log apenas se foi criado
                 with safe_db_operation(log_repo):
-                    log_repo.update_job_summary(job_id, final_status, total_succeeded, total_failed)
+                    log_repo.update_job_summary(job_id, final_status, total_succeeded, total_failed, error_summary)
                 print(f"   → Job de Log atualizado (ID: {job_id}, Status: {final_status})")
             except Exception as log_update_err:
                 print(f"   ⚠️ Falha ao atualizar o status final do Job de Log: {log_update_err}")
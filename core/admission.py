@@ -0,0 +1,181 @@
+# agent-api/core/admission.py
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from api.settings import api_settings
+from core.metrics import BucketHistogram
+
+# Limites superiores (ms) das faixas do histograma de espera na fila
+ADMISSION_WAIT_BUCKETS_MS = [1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf")]
+
+
+class AdmissionRejected(Exception):
+    """A requisição não foi admitida: fila cheia ou tempo de espera esgotado."""
+
+    def __init__(self, service: str, reason: str, retry_after_s: int):
+        super().__init__(f"Serviço '{service}' sobrecarregado ({reason}).")
+        self.service = service
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionLease:
+    """Vaga de execução de um serviço. `release` pode ser chamado mais de uma vez."""
+
+    def __init__(self, limiter: "ServiceLimiter"):
+        self._limiter = limiter
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release(time.monotonic() - self._acquired_at)
+
+
+class ServiceLimiter:
+    """
+    Limite de execuções simultâneas de um serviço (equipe ou agente), com uma
+    fila de espera limitada.
+
+    Até `max_concurrency` requisições executam ao mesmo tempo; as seguintes
+    esperam na fila (FIFO) por até `queue_timeout_s`. Com a fila cheia, a
+    requisição é recusada na hora, em vez de somar mais uma chamada ao Gemini e
+    mais uma busca de dossiê a um sistema que já está saturado.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout_s: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0, "hold_s_total": 0.0, "completed": 0}
+        self.wait_histogram = BucketHistogram(ADMISSION_WAIT_BUCKETS_MS)  # ms na fila até a admissão
+
+    async def acquire(self) -> AdmissionLease:
+        """
+        Reserva uma vaga, esperando na fila se preciso.
+
+        Raises:
+            AdmissionRejected: Fila cheia ou espera maior que `queue_timeout_s`.
+        """
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._admitted(0.0)
+            return AdmissionLease(self)
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise AdmissionRejected(self.name, "fila cheia", self.retry_after_s())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga chegou junto com o timeout/cancelamento: devolve para o próximo
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._stats["timed_out"] += 1
+            raise AdmissionRejected(self.name, "tempo de espera esgotado", self.retry_after_s())
+
+        self._admitted((time.monotonic() - queued_at) * 1000)
+        return AdmissionLease(self)
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _admitted(self, wait_ms: float) -> None:
+        self._stats["admitted"] += 1
+        self.wait_histogram.observe(wait_ms)
+
+    def _release(self, held_s: float) -> None:
+        self._stats["completed"] += 1
+        self._stats["hold_s_total"] += held_s
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        # Passa a vaga direto para o primeiro da fila (o contador de ativos não muda)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def retry_after_s(self) -> int:
+        """Estimativa (s) de quando haverá vaga: duração média de uma execução x fila por vaga."""
+        completed = self._stats["completed"]
+        if not completed:
+            return api_settings.chat_retry_after_s
+        mean_hold_s = self._stats["hold_s_total"] / completed
+        estimate = mean_hold_s * (len(self._waiters) + 1) / self.max_concurrency
+        return max(1, min(int(math.ceil(estimate)), 60))
+
+    def stats(self) -> Dict[str, Any]:
+        admitted = self._stats["admitted"]
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "admitted": admitted,
+            "rejected": self._stats["rejected"],
+            "timed_out": self._stats["timed_out"],
+            "mean_wait_ms": round(self.wait_histogram.sum / admitted, 2) if admitted else 0.0,
+            "p95_wait_ms": self.wait_histogram.quantile(0.95),
+            "wait_histogram": self.wait_histogram.as_dict(),
+        }
+
+
+class AdmissionController:
+    """
+    Controle de admissão do chat: um ServiceLimiter por serviço, criado no
+    primeiro uso com os limites do ApiSettings (`chat_max_concurrency` e
+    `chat_max_queue`, com exceções por serviço em `chat_service_concurrency`).
+    """
+
+    def __init__(self):
+        self._limiters: Dict[str, ServiceLimiter] = {}
+
+    def limiter(self, service: str) -> ServiceLimiter:
+        limiter = self._limiters.get(service)
+        if limiter is None:
+            limiter = ServiceLimiter(
+                service,
+                max_concurrency=api_settings.chat_service_concurrency.get(service, api_settings.chat_max_concurrency),
+                max_queue=api_settings.chat_max_queue,
+                queue_timeout_s=api_settings.chat_queue_timeout_s,
+            )
+            self._limiters[service] = limiter
+        return limiter
+
+    async def admit(self, service: str) -> AdmissionLease:
+        """Reserva uma vaga para `service` (ver ServiceLimiter.acquire)."""
+        return await self.limiter(service).acquire()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+    def wait_histograms(self) -> Dict[str, BucketHistogram]:
+        """Cópias dos histogramas (ms) de espera na fila por serviço (para o /metrics)."""
+        return {name: limiter.wait_histogram.copy() for name, limiter in self._limiters.items()}
+
+
+# --- Instância Singleton ---
+ADMISSION_CONTROLLER = AdmissionController()
@@ -0,0 +1,45 @@
+# agent-api/core/agent_factory.py
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from agno.models.google import Gemini
+
+# Modelo padrão dos agentes e da equipe de suporte
+SUPPORT_MODEL_ID = "gemini-2.0-flash"
+
+_models: Dict[str, Gemini] = {}
+_models_lock = threading.Lock()
+
+
+def get_shared_model(model_id: str = SUPPORT_MODEL_ID) -> Gemini:
+    """
+    Retorna o modelo Gemini compartilhado para `model_id`.
+
+    O objeto do modelo não guarda estado de execução (só a configuração e o
+    cliente HTTP do google-genai, criado no primeiro uso), então todas as
+    instâncias de agentes por requisição usam o mesmo: um único pool de conexões
+    e nenhum custo de criação de cliente por chat.
+    """
+    model = _models.get(model_id)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_id)
+            if model is None:
+                model = Gemini(id=model_id)
+                _models[model_id] = model
+    return model
+
+
+def copy_tools(tools: Optional[List[Any]]) -> Optional[List[Any]]:
+    """
+    Cópias rasas das ferramentas (`Function` do Agno) para uma nova instância de agente.
+
+    O Agno grava o agente dono em cada `Function` ao preparar as ferramentas
+    (`function._agent`): com o mesmo objeto em instâncias simultâneas, uma execução
+    enxergaria o agente da outra. A cópia é rasa: a função Python e o schema
+    continuam compartilhados.
+    """
+    if not tools:
+        return tools
+    return [tool.model_copy() if hasattr(tool, "model_copy") else tool for tool in tools]
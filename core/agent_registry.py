@@ -1,62 +1,103 @@
 # agent-api/core/agent_registry.py
 
-from typing import Dict, List, Any, Union
-from agno.agent import Agent
-from agno.team import Team
+from importlib import import_module
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional, Union
 
-# --- 1. Importar as INSTÂNCIAS que já definimos ---
-# Importa os agentes individuais
-from agents.support_triage_coordinator import triage_agent
-from agents.support_n1_agent import n1_agent
-from agents.support_n2_agent import n2_agent
-from agents.support_n3_agent import n3_agent
+# Agentes e equipe só são importados no primeiro get_service: os módulos deles
+# carregam o Agno, o Gemini e os toolkits, o que deixaria o import da API lento
+if TYPE_CHECKING:
+    from agno.agent import Agent
+    from agno.team import Team
+
+# --- 1. FÁBRICAS registradas: nome do serviço -> "módulo:função" ---
+# (assinatura comum: session_id, user_id e async_tools)
+SERVICE_FACTORIES: Dict[str, str] = {
+    # Equipe principal (executa o workflow completo)
+    "support_team": "teams.support_team:get_support_team",
+    # Agentes individuais (úteis para teste direto ou playground)
+    "TriageCoordinatorAgent": "agents.support_triage_coordinator:get_triage_agent",
+    "N1_SupportAgent": "agents.support_n1_agent:get_n1_agent",
+    "N2_DiagnosticAgent": "agents.support_n2_agent:get_n2_agent",
+    "N3_ResolutionAgent": "agents.support_n3_agent:get_n3_agent",
+}
 
-# Importa a equipe completa (que contém os agentes e o workflow)
-from teams.support_team import support_team
 
 class AgentRegistry:
     """
-    Registry central para gerenciar instâncias de Agentes e Equipes (Teams) do Agno.
+    Registry central para gerenciar os Agentes e Equipes (Teams) do Agno.
     Permite buscar e listar todos os 'serviços' (agentes ou equipes) disponíveis na API.
     Segue o padrão do ToolRegistry.
+
+    Guarda fábricas, não instâncias: cada `get_service` devolve um Agent/Team
+    novo, isolado dos chats simultâneos (modelo, instruções e KBs continuam
+    compartilhados pelas fábricas). As fábricas são importadas no primeiro uso
+    (ou por `preload`, chamado pela API após o startup).
     """
 
-    _registry: Dict[str, Union[Agent, Team]] = {} # Cache para armazenar as instâncias
+    _registry: Dict[str, str] = {} # Nome do serviço -> "módulo:função" da fábrica
 
     def __init__(self):
         """
-        Inicializa o Registry e carrega as instâncias definidas.
+        Inicializa o Registry e carrega as definições das fábricas (sem importá-las).
         """
         print("--- AgentRegistry Inicializado ---")
+        self._factories: Dict[str, Callable[..., Union["Agent", "Team"]]] = {}
         self._load_services()
 
     def _load_services(self):
         """
-        Carrega as instâncias de Agentes e Equipes no registro.
-        Adicione novas instâncias aqui conforme necessário.
+        Carrega as fábricas de Agentes e Equipes no registro.
+        Adicione novas fábricas em SERVICE_FACTORIES.
         """
-        # Adiciona a Equipe principal (que executa o workflow completo)
-        self._registry[support_team.name] = support_team # Ex: "support_team" -> <Team object>
+        self._registry.update(SERVICE_FACTORIES)
+        print(f"AgentRegistry: {len(self._registry)} serviços registrados: {list(self._registry.keys())}")
 
-        # Adiciona os Agentes individuais (úteis para teste direto ou playground)
-        self._registry[triage_agent.name] = triage_agent # Ex: "TriageCoordinatorAgent" -> <Agent object>
-        self._registry[n1_agent.name] = n1_agent
-        self._registry[n2_agent.name] = n2_agent
-        self._registry[n3_agent.name] = n3_agent
+    def _get_factory(self, name: str) -> Optional[Callable[..., Union["Agent", "Team"]]]:
+        """Importa (na primeira vez) e devolve a fábrica do serviço."""
+        factory = self._factories.get(name)
+        if factory is None:
+            path = self._registry.get(name)
+            if path is None:
+                return None
+            module_name, function_name = path.split(":")
+            factory = getattr(import_module(module_name), function_name)
+            self._factories[name] = factory
+        return factory
 
-        print(f"AgentRegistry: {len(self._registry)} serviços carregados: {list(self._registry.keys())}")
+    def preload(self) -> None:
+        """
+        Importa todas as fábricas antecipadamente (agentes, equipe e toolkits), para
+        que o primeiro chat não pague esse custo. Chamado após o startup, fora do import.
+        """
+        for name in self._registry:
+            self._get_factory(name)
 
-    def get_service(self, name: str) -> Union[Agent, Team, None]:
+    def get_service(
+        self,
+        name: str,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> Union["Agent", "Team", None]:
         """
-        Obtém uma instância de Agente ou Equipe pelo nome registrado.
+        Cria uma nova instância de Agente ou Equipe pelo nome registrado, com as
+        ferramentas assíncronas: as instâncias da API executam via arun().
 
         Args:
             name (str): O nome do serviço (ex: "support_team", "N1_SupportAgent").
+            session_id (str, opcional): Sessão do chat, gravada na instância.
+            user_id (str, opcional): Usuário do chat, gravado na instância.
 
         Returns:
-            Union[Agent, Team, None]: A instância correspondente ou None se não encontrada.
+            Union[Agent, Team, None]: Uma instância exclusiva da requisição ou None se não encontrada.
         """
-        return self._registry.get(name)
+        factory = self._get_factory(name)
+        if factory is None:
+            return None
+        return factory(session_id=session_id, user_id=user_id, async_tools=True)
+
+    def has_service(self, name: str) -> bool:
+        """Indica se há um serviço registrado com esse nome (sem importar nem criar nada)."""
+        return name in self._registry
 
     def get_available_services(self) -> List[str]:
         """
@@ -0,0 +1,290 @@
+# agent-api/core/metrics.py
+
+import bisect
+import threading
+import time
+from inspect import isasyncgen
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Faixas (s) dos histogramas: do SQL de milissegundos até uma execução longa da equipe
+DEFAULT_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotônico com labels (formato de exposição do Prometheus)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class BucketHistogram:
+    """
+    Histograma de faixas fixas: contagem por faixa (limite superior inclusivo, com
+    a faixa +Inf no fim), soma e total. Base do Histogram abaixo e das estatísticas
+    do executor das ferramentas, da admissão e das queries dos repositórios.
+
+    Não tem lock próprio: quem o usa já sincroniza as suas estatísticas.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        # Aceita os limites com ou sem o +Inf final (ex: TOOL_LATENCY_BUCKETS_MS)
+        self.bounds = tuple(limit for limit in bounds if limit != float("inf"))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def copy(self) -> "BucketHistogram":
+        histogram = BucketHistogram(self.bounds)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        return histogram
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """Aproximação pelo limite superior da faixa; None sem observações ou na faixa +Inf."""
+        total = self.count
+        if not total:
+            return None
+        seen = 0
+        for limit, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= quantile * total:
+                return limit
+        return None
+
+    def as_dict(self) -> Dict[str, int]:
+        """Contagens por faixa (não acumuladas), chaveadas pelo limite ("+Inf" na última)."""
+        keys = [str(limit) for limit in self.bounds] + ["+Inf"]
+        return dict(zip(keys, self.counts))
+
+    def render(self, name: str, labelnames: Sequence[str] = (), labelvalues: Sequence[Any] = (), scale: float = 1) -> List[str]:
+        """
+        Linhas da série no formato do Prometheus (faixas acumuladas). `scale` converte
+        a unidade observada para a exportada (ex: 1/1000 de ms para segundos).
+        """
+        lines = []
+        cumulative = 0
+        for limit, count in zip(list(self.bounds) + [float("inf")], self.counts):
+            cumulative += count
+            le = f'le="{_format_value(round(float(limit) * scale, 9) if limit != float("inf") else limit)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+        label_text = _format_labels(labelnames, labelvalues)
+        lines.append(f"{name}_sum{label_text} {_format_value(float(self.sum) * scale)}")
+        lines.append(f"{name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Histogram:
+    """Histograma com labels (em segundos): um BucketHistogram por combinação de labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS_S,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, BucketHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = BucketHistogram(self.buckets)
+                self._series[key] = series
+            series.observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, histogram.copy()) for key, histogram in self._series.items()]
+        for key, histogram in series:
+            lines.extend(histogram.render(self.name, self.labelnames, key))
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Métricas da API no formato de exposição do Prometheus (GET /metrics).
+
+    Os contadores e histogramas daqui são atualizados no caminho da requisição
+    (custo: um lock e um bisect por observação). As estatísticas que outros
+    módulos já mantêm em BucketHistograms (queries, admissão, executor das
+    ferramentas) entram por `register_collector` e só são copiadas na hora da coleta.
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"Metrics: falha em um coletor ({getattr(collector, '__name__', collector)}): {e}")
+        return "\n".join(lines) + "\n"
+
+
+# --- Instância Singleton ---
+METRICS = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = METRICS.histogram(
+    "http_request_duration_seconds", "HTTP request duration per route template.", ["method", "route", "status"]
+)
+HTTP_STREAM_FIRST_BYTE_SECONDS = METRICS.histogram(
+    "http_stream_first_byte_seconds", "Time to the first body chunk of SSE streams per route template.", ["route"]
+)
+AGENT_MEMBER_RUN_SECONDS = METRICS.histogram(
+    "agent_member_run_seconds", "Run time of each team member delegation.", ["team", "member"]
+)
+AGENT_TOOL_CALL_SECONDS = METRICS.histogram(
+    "agent_tool_call_seconds", "Duration of each agent tool call.", ["agent", "tool"]
+)
+AGENT_TOKENS_TOTAL = METRICS.counter(
+    "agent_tokens_total", "Tokens used by agents and teams, by type (input/output).", ["agent", "type"]
+)
+ERRORS_TOTAL = METRICS.counter(
+    "errors_total", "Errors by source (http, tool, agent_run).", ["source", "name"]
+)
+
+
+# --- Hooks dos agentes ---
+
+def create_tool_metrics_hook(agent_name: str) -> Callable:
+    """
+    Cria um tool_hook (Agno) que mede cada chamada de ferramenta do agente e
+    conta as que falham. Assíncrono, como as ferramentas do support_toolkit.
+    """
+
+    async def tool_metrics_hook(function_name: str, function_call: Callable, arguments: Dict[str, Any]):
+        started_at = time.perf_counter()
+        try:
+            return await function_call(**arguments)
+        except Exception:
+            ERRORS_TOTAL.inc(source="tool", name=function_name)
+            raise
+        finally:
+            AGENT_TOOL_CALL_SECONDS.observe(time.perf_counter() - started_at, agent=agent_name, tool=function_name)
+
+    return tool_metrics_hook
+
+
+def create_member_metrics_hook(team_name: str) -> Callable:
+    """
+    Cria um tool_hook para o Team que mede `delegate_task_to_member` por membro,
+    incluindo o consumo do stream do membro quando a delegação devolve um gerador.
+    Deve ser o último da lista de tool_hooks (o mais interno): respostas servidas
+    por hooks externos, como o cache do N1, não contam como execução do membro.
+    """
+
+    async def member_metrics_hook(function_name: str, function_call: Callable, arguments: Dict[str, Any]):
+        if function_name != "delegate_task_to_member":
+            return await function_call(**arguments)
+
+        member = arguments.get("member_id", "")
+        started_at = time.perf_counter()
+        try:
+            result = await function_call(**arguments)
+        except Exception:
+            ERRORS_TOTAL.inc(source="agent_run", name=member)
+            AGENT_MEMBER_RUN_SECONDS.observe(time.perf_counter() - started_at, team=team_name, member=member)
+            raise
+
+        if isasyncgen(result):
+            async def timed_stream():
+                try:
+                    async for item in result:
+                        yield item
+                finally:
+                    AGENT_MEMBER_RUN_SECONDS.observe(time.perf_counter() - started_at, team=team_name, member=member)
+
+            return timed_stream()
+
+        AGENT_MEMBER_RUN_SECONDS.observe(time.perf_counter() - started_at, team=team_name, member=member)
+        return result
+
+    return member_metrics_hook
+
+
+def record_run_tokens(agent_name: Optional[str], metrics: Any) -> None:
+    """Soma os tokens de uma execução (RunOutput/evento de conclusão do Agno)."""
+    if metrics is None:
+        return
+    for token_type in ("input_tokens", "output_tokens"):
+        value = getattr(metrics, token_type, 0) or 0
+        if value:
+            AGENT_TOKENS_TOTAL.inc(value, agent=agent_name or "", type=token_type.replace("_tokens", ""))
+
+
+def record_run_output_tokens(output: Any) -> None:
+    """Tokens de uma execução não-stream: a do líder e, num Team, as dos membros."""
+    record_run_tokens(getattr(output, "agent_name", None) or getattr(output, "team_name", None), getattr(output, "metrics", None))
+    for member_output in getattr(output, "member_responses", None) or []:
+        record_run_output_tokens(member_output)
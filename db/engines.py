@@ -0,0 +1,158 @@
+import threading
+from os import getenv
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from db.url import get_db_url, get_directus_db_url, get_directus_replica_db_url, is_directus_replica_configured
+
+# Named databases: "app" is the Agno database (DB_* vars), "directus" holds the
+# sisateg_* / ybs_* tables used by the repositories (POSTGRES_* vars) and
+# "directus_replica" is its optional read replica (POSTGRES_REPLICA_* vars)
+DATABASES: Dict[str, Callable[[Optional[str]], str]] = {
+    "app": get_db_url,
+    "directus": get_directus_db_url,
+    "directus_replica": get_directus_replica_db_url,
+}
+
+# Databases that only exist when configured; the others are always available
+OPTIONAL_DATABASES: Dict[str, Callable[[], bool]] = {
+    "directus_replica": is_directus_replica_configured,
+}
+
+# Driver used for async engines, whatever the sync driver of the database is
+ASYNC_DRIVER = "postgresql+psycopg"
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+
+EngineKey = Tuple[str, bool]
+
+
+def _pool_setting(name: str, setting: str, default: int) -> int:
+    # DIRECTUS_DB_POOL_SIZE overrides DB_POOL_SIZE, which overrides the default
+    value = getenv(f"{name.upper()}_DB_{setting}", getenv(f"DB_{setting}"))
+    return int(value) if value else default
+
+
+def get_pool_options(name: str) -> Dict[str, Any]:
+    """Pool settings of a named database, read from the environment."""
+    return {
+        "pool_size": _pool_setting(name, "POOL_SIZE", DEFAULT_POOL_SIZE),
+        "max_overflow": _pool_setting(name, "MAX_OVERFLOW", DEFAULT_MAX_OVERFLOW),
+        "pool_timeout": _pool_setting(name, "POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT),
+        "pool_recycle": _pool_setting(name, "POOL_RECYCLE", DEFAULT_POOL_RECYCLE),
+        "pool_pre_ping": True,
+    }
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of pooled SQLAlchemy engines, one per (database, sync/async).
+
+    Engines are reference-counted: every `acquire` must be matched by a `release`
+    and the pool is only disposed when the last holder releases it, so closing one
+    repository no longer tears down the connections of every other one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines: Dict[EngineKey, Union[Engine, AsyncEngine]] = {}
+        self._refcounts: Dict[EngineKey, int] = {}
+
+    def is_configured(self, name: str) -> bool:
+        """Whether a named database can be acquired (optional ones depend on the environment)."""
+        if name not in DATABASES:
+            return False
+        return OPTIONAL_DATABASES.get(name, lambda: True)()
+
+    def acquire(self, name: str = "directus", is_async: bool = False) -> Union[Engine, AsyncEngine]:
+        """
+        Return the shared engine of a named database, creating it on first use.
+
+        Args:
+            name (str): Database name (a key of DATABASES).
+            is_async (bool): Return the AsyncEngine instead of the sync Engine.
+        """
+        if name not in DATABASES:
+            raise ValueError(f"Unknown database '{name}'. Available: {', '.join(DATABASES)}")
+
+        key = (name, is_async)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._create_engine(name, is_async)
+                self._engines[key] = engine
+            self._refcounts[key] = self._refcounts.get(key, 0) + 1
+            return engine
+
+    def release(self, name: str = "directus") -> None:
+        """Release a sync engine reference, disposing the pool when it was the last one."""
+        engine = self._release((name, False))
+        if engine is not None:
+            engine.dispose()
+            print(f"EngineRegistry: '{name}' pool disposed.")
+
+    async def release_async(self, name: str = "directus") -> None:
+        """Release an async engine reference, disposing the pool when it was the last one."""
+        engine = self._release((name, True))
+        if engine is not None:
+            await engine.dispose()
+            print(f"EngineRegistry: '{name}' async pool disposed.")
+
+    def _release(self, key: EngineKey) -> Optional[Union[Engine, AsyncEngine]]:
+        with self._lock:
+            count = self._refcounts.get(key, 0)
+            if count <= 0:
+                return None
+            if count > 1:
+                self._refcounts[key] = count - 1
+                return None
+            self._refcounts.pop(key)
+            return self._engines.pop(key, None)
+
+    async def dispose_all(self) -> None:
+        """Dispose every engine regardless of references (application shutdown)."""
+        with self._lock:
+            engines = list(self._engines.items())
+            self._engines.clear()
+            self._refcounts.clear()
+        for (name, is_async), engine in engines:
+            if is_async:
+                await engine.dispose()
+            else:
+                engine.dispose()
+        if engines:
+            print(f"EngineRegistry: {len(engines)} pool(s) disposed.")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Pool statistics of every live engine, keyed by 'name' or 'name:async'."""
+        with self._lock:
+            engines = list(self._engines.items())
+            refcounts = dict(self._refcounts)
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for key, engine in engines:
+            name, is_async = key
+            pool = engine.sync_engine.pool if is_async else engine.pool
+            stats[f"{name}:async" if is_async else name] = {
+                "references": refcounts.get(key, 0),
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        return stats
+
+    @staticmethod
+    def _create_engine(name: str, is_async: bool) -> Union[Engine, AsyncEngine]:
+        options = get_pool_options(name)
+        if is_async:
+            return create_async_engine(DATABASES[name](ASYNC_DRIVER), **options)
+        return create_engine(DATABASES[name](None), **options)
+
+
+ENGINE_REGISTRY = EngineRegistry()
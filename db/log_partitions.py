@@ -0,0 +1,223 @@
+"""
+Monthly range partitions of public.ybs_knowledge_processing_log (on created_at) and
+their retention: partitions older than the retention window are optionally archived
+to zstd-compressed Parquet and then detached and dropped.
+
+The table is converted to a partitioned table by migration 0002 (db/migrations.py).
+Rows outside every monthly partition (e.g. written before `maintain` created their
+month) land in the DEFAULT partition, which is never dropped: retention deletes its
+expired rows instead, archiving them first like a monthly partition.
+
+Usage:
+    python -m db.log_partitions maintain                       # create upcoming partitions
+    python -m db.log_partitions retention --keep-months 6 --archive-dir /data/log_archive
+    python -m db.log_partitions retention --dry-run
+"""
+
+import argparse
+import os
+from datetime import date
+from uuid import UUID
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from db.engines import ENGINE_REGISTRY
+
+LOG_TABLE = "ybs_knowledge_processing_log"
+LOG_PARTITION_COLUMN = "created_at"
+LOG_PARTITION_PREFIX = f"{LOG_TABLE}_p"
+LOG_DEFAULT_PARTITION = f"{LOG_TABLE}_default"
+LOG_PARTITIONS_AHEAD = 2
+LOG_RETENTION_MONTHS = int(os.getenv("LOG_RETENTION_MONTHS", "6"))
+ARCHIVE_BATCH_ROWS = 50000
+
+# Creates the partitions of the current month and the next LOG_PARTITIONS_AHEAD ones.
+# No-op while the table is not partitioned yet (before migration 0002).
+ENSURE_LOG_PARTITIONS_SQL = f"""
+DO $$
+DECLARE
+    month_start date := date_trunc('month', CURRENT_DATE)::date;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = '{LOG_TABLE}'
+    ) THEN
+        RETURN;
+    END IF;
+    FOR i IN 0..{LOG_PARTITIONS_AHEAD} LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.{LOG_TABLE} FOR VALUES FROM (%L) TO (%L)',
+            '{LOG_PARTITION_PREFIX}' || to_char(month_start + make_interval(months => i), 'YYYY_MM'),
+            month_start + make_interval(months => i),
+            month_start + make_interval(months => i + 1)
+        );
+    END LOOP;
+END $$;
+"""
+
+LIST_PARTITIONS_QUERY = f"""
+    SELECT c.relname AS name
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    WHERE parent.relname = '{LOG_TABLE}' AND c.relname LIKE '{LOG_PARTITION_PREFIX}%'
+    ORDER BY c.relname;
+"""
+
+
+def partition_month(name: str) -> date:
+    """Month start of a partition from its name (..._pYYYY_MM)."""
+    year, month = name[len(LOG_PARTITION_PREFIX):].split("_")
+    return date(int(year), int(month), 1)
+
+
+def ensure_partitions(connection: Connection) -> None:
+    connection.execute(text(ENSURE_LOG_PARTITIONS_SQL))
+
+
+def list_partitions(connection: Connection) -> List[Dict[str, Any]]:
+    rows = connection.execute(text(LIST_PARTITIONS_QUERY))
+    return [{"name": row.name, "month": partition_month(row.name)} for row in rows]
+
+
+def archive_partition(connection: Connection, name: str, archive_dir: Path, before: Optional[date] = None) -> Path:
+    """
+    Write every row of a partition to <archive_dir>/<partition>.parquet (zstd),
+    reading it with a server-side cursor in ARCHIVE_BATCH_ROWS row groups. With
+    `before`, only the rows older than that date are written, to
+    <archive_dir>/<partition>_before_<date>.parquet.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required to archive log partitions: pip install pyarrow")
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    target = archive_dir / (f"{name}_before_{before:%Y_%m_%d}.parquet" if before else f"{name}.parquet")
+    partial = target.with_suffix(".parquet.partial")
+
+    writer = None
+    rows_written = 0
+    # Server-side cursors need a transaction: read on a separate (non-autocommit) connection
+    with connection.engine.connect() as read_connection, read_connection.begin():
+        query, params = f"SELECT * FROM public.{name}", {}
+        if before is not None:
+            query, params = f"{query} WHERE {LOG_PARTITION_COLUMN} < :before", {"before": before}
+        result = read_connection.execution_options(stream_results=True).execute(text(query), params)
+        columns = list(result.keys())
+        try:
+            for partition in result.partitions(ARCHIVE_BATCH_ROWS):
+                table = pa.Table.from_pylist(
+                    [{column: _to_arrow_value(value) for column, value in zip(columns, row)} for row in partition]
+                )
+                if writer is None:
+                    # Columns that are all NULL in the first batch are written as strings
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in table.schema
+                    ])
+                    writer = pq.ParquetWriter(partial, schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+                rows_written += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+
+    if writer is None:
+        # Empty partition: nothing to archive
+        return target
+    # Only a complete file takes the final name, so a crash never looks like a finished archive
+    partial.replace(target)
+    print(f"   → {name}: {rows_written} rows archived to {target}")
+    return target
+
+
+def _to_arrow_value(value: Any) -> Any:
+    # UUIDs are not a native Arrow type
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def apply_retention(
+    connection: Connection,
+    keep_months: int = LOG_RETENTION_MONTHS,
+    archive_dir: Optional[Path] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Detach and drop the partitions entirely older than `keep_months` months,
+    archiving each one first when `archive_dir` is given, and delete the expired
+    rows of the DEFAULT partition the same way. Returns the dropped partitions.
+    """
+    today = date.today()
+    month_index = today.year * 12 + today.month - 1 - keep_months
+    cutoff = date(month_index // 12, month_index % 12 + 1, 1)
+
+    expired = [partition["name"] for partition in list_partitions(connection) if partition["month"] < cutoff]
+    print(f"Retention: keeping {keep_months} month(s) (from {cutoff}), {len(expired)} partition(s) expired.")
+    expired_default_rows = connection.execute(
+        text(f"SELECT count(*) FROM public.{LOG_DEFAULT_PARTITION} WHERE {LOG_PARTITION_COLUMN} < :cutoff"),
+        {"cutoff": cutoff},
+    ).scalar() if _has_default_partition(connection) else 0
+    if dry_run:
+        for name in expired:
+            print(f"   → would drop {name}")
+        if expired_default_rows:
+            print(f"   → would delete {expired_default_rows} row(s) from {LOG_DEFAULT_PARTITION}")
+        return []
+
+    for name in expired:
+        if archive_dir is not None:
+            archive_partition(connection, name, archive_dir)
+        connection.execute(text(f"ALTER TABLE public.{LOG_TABLE} DETACH PARTITION public.{name}"))
+        connection.execute(text(f"DROP TABLE public.{name}"))
+        print(f"   → {name} dropped")
+
+    if expired_default_rows:
+        if archive_dir is not None:
+            archive_partition(connection, LOG_DEFAULT_PARTITION, archive_dir, before=cutoff)
+        deleted = connection.execute(
+            text(f"DELETE FROM public.{LOG_DEFAULT_PARTITION} WHERE {LOG_PARTITION_COLUMN} < :cutoff"),
+            {"cutoff": cutoff},
+        ).rowcount
+        print(f"   → {deleted} expired row(s) deleted from {LOG_DEFAULT_PARTITION}")
+    return expired
+
+
+def _has_default_partition(connection: Connection) -> bool:
+    return connection.execute(text(f"SELECT to_regclass('public.{LOG_DEFAULT_PARTITION}') IS NOT NULL")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitions and retention of the processing log.")
+    parser.add_argument("command", choices=["maintain", "retention"])
+    parser.add_argument("--keep-months", type=int, default=LOG_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", type=Path, default=None, help="Archive expired partitions to Parquet here")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    # Same .env the repositories load (POSTGRES_* variables)
+    load_dotenv(Path(__file__).parent.parent.parent / ".env")
+    engine = ENGINE_REGISTRY.acquire("directus")
+    try:
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            ensure_partitions(connection)
+            if args.command == "retention":
+                apply_retention(connection, args.keep_months, args.archive_dir, args.dry_run)
+            for partition in list_partitions(connection):
+                print(f"   {partition['name']}")
+    finally:
+        ENGINE_REGISTRY.release("directus")
+
+
+if __name__ == "__main__":
+    main()
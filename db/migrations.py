@@ -0,0 +1,401 @@
+"""
+Schema migrations for the Directus database tables this project reads on hot paths.
+
+Usage:
+    python -m db.migrations check   # report missing/invalid indexes (exit code 1 if any)
+    python -m db.migrations apply   # apply pending migrations
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from db.engines import ENGINE_REGISTRY
+from db.log_partitions import LOG_DEFAULT_PARTITION, LOG_PARTITION_COLUMN, LOG_PARTITION_PREFIX, LOG_TABLE
+
+MIGRATIONS_TABLE = "public.ybs_schema_migrations"
+
+# Ordered list of migrations. Each migration runs its "statements" and then builds its
+# "indexes" (CONCURRENTLY where possible, outside a transaction, so the ticket
+# and knowledge tables are not blocked).
+MIGRATIONS: List[Dict[str, Any]] = [
+    {
+        "version": "0001_hot_path_indexes",
+        "description": "Indexes for the unprocessed-ticket scan, processing log, jobs and knowledge lookups",
+        "indexes": [
+            {
+                # Same predicate as ChamadosRepository.get_unprocessed_tickets, so the planner can use it
+                "name": "ix_sisateg_chamados_unprocessed",
+                "table": "sisateg_chamados",
+                "definition": """
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sisateg_chamados_unprocessed
+                    ON public.sisateg_chamados (dat_inclusao) INCLUDE (cod_chamado)
+                    WHERE cod_situacao_chamado = 5 AND (knowledge_processado IS NULL OR knowledge_processado = FALSE)
+                """,
+            },
+            {
+                "name": "ix_ybs_knowledge_processing_log_job",
+                "table": "ybs_knowledge_processing_log",
+                "definition": """
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ybs_knowledge_processing_log_job
+                    ON public.ybs_knowledge_processing_log (job_id) INCLUDE (ticket_id, knowledge_base_id)
+                """,
+            },
+            {
+                # Per-job aggregates (count by status, duration) answered from the index alone
+                "name": "ix_ybs_knowledge_processing_log_job_stats",
+                "table": "ybs_knowledge_processing_log",
+                "definition": """
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ybs_knowledge_processing_log_job_stats
+                    ON public.ybs_knowledge_processing_log (job_id, status) INCLUDE (duration_ms)
+                """,
+            },
+            {
+                "name": "ix_ybs_knowledge_batch_jobs_type_status",
+                "table": "ybs_knowledge_batch_jobs",
+                "definition": """
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ybs_knowledge_batch_jobs_type_status
+                    ON public.ybs_knowledge_batch_jobs (job_type, status)
+                    INCLUDE (tickets_found, tickets_succeeded, tickets_failed, end_time)
+                """,
+            },
+            {
+                # Index-only scans for get_knowledge_versions (ticket_id -> updated_at)
+                "name": "ix_ybs_knowledge_base_ticket_updated",
+                "table": "ybs_knowledge_base",
+                "definition": """
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ybs_knowledge_base_ticket_updated
+                    ON public.ybs_knowledge_base (ticket_id) INCLUDE (updated_at)
+                """,
+            },
+            {
+                "name": "ix_ybs_knowledge_base_updated_at",
+                "table": "ybs_knowledge_base",
+                "definition": """
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ybs_knowledge_base_updated_at
+                    ON public.ybs_knowledge_base (updated_at)
+                """,
+            },
+        ],
+    },
+    {
+        "version": "0002_partition_processing_log",
+        "description": "Monthly range partitions of ybs_knowledge_processing_log on created_at",
+        # A single DO block runs as one statement, so the swap is atomic even in AUTOCOMMIT.
+        # The old table is kept as <table>_legacy (drop it once the copy is verified).
+        # LIKE only copies columns, NOT NULL, defaults and CHECK constraints, so the rest is
+        # carried over explicitly:
+        #   - the primary key is recreated with the partition column appended (a unique
+        #     constraint on a partitioned table must include it);
+        #   - identity columns become a default on a new sequence owned by the new table
+        #     (identity is not supported on partitioned tables before PostgreSQL 17);
+        #   - serial sequences are re-owned by the new table, so dropping _legacy works;
+        #   - outgoing foreign keys are recreated;
+        #   - rows with a NULL partition column are copied with CURRENT_TIMESTAMP (it is part
+        #     of the primary key and the partition key); _legacy keeps the original value.
+        # Other UNIQUE/EXCLUDE constraints and foreign keys pointing at the log abort the
+        # migration: they cannot be carried over without a decision about the key.
+        "statements": [
+            f"""
+            DO $$
+            DECLARE
+                month_start date;
+                last_month date := (date_trunc('month', CURRENT_DATE) + interval '2 months')::date;
+                legacy regclass;
+                pk_name text;
+                pk_columns text;
+                col record;
+                seq_name text;
+                fk record;
+                insert_columns text;
+                select_columns text;
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM pg_partitioned_table p
+                    JOIN pg_class c ON c.oid = p.partrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public' AND c.relname = '{LOG_TABLE}'
+                ) THEN
+                    RETURN;
+                END IF;
+
+                legacy := 'public.{LOG_TABLE}'::regclass;
+                IF EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = legacy AND contype IN ('u', 'x')) THEN
+                    RAISE EXCEPTION '{LOG_TABLE} has UNIQUE/EXCLUDE constraints; partition it manually';
+                END IF;
+                IF EXISTS (SELECT 1 FROM pg_constraint WHERE confrelid = legacy AND contype = 'f') THEN
+                    RAISE EXCEPTION 'foreign keys reference {LOG_TABLE}; partition it manually';
+                END IF;
+
+                SELECT c.conname, string_agg(quote_ident(a.attname), ', ' ORDER BY k.ord)
+                INTO pk_name, pk_columns
+                FROM pg_constraint c
+                CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+                JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                WHERE c.conrelid = legacy AND c.contype = 'p'
+                GROUP BY c.conname;
+
+                ALTER TABLE public.{LOG_TABLE} RENAME TO {LOG_TABLE}_legacy;
+                IF pk_name IS NOT NULL THEN
+                    -- Frees the <table>_pkey index name for the new table
+                    EXECUTE format('ALTER TABLE public.{LOG_TABLE}_legacy RENAME CONSTRAINT %I TO %I', pk_name, pk_name || '_legacy');
+                END IF;
+                ALTER INDEX IF EXISTS public.ix_ybs_knowledge_processing_log_job
+                    RENAME TO ix_ybs_knowledge_processing_log_job_legacy;
+                ALTER INDEX IF EXISTS public.ix_ybs_knowledge_processing_log_job_stats
+                    RENAME TO ix_ybs_knowledge_processing_log_job_stats_legacy;
+
+                CREATE TABLE public.{LOG_TABLE} (LIKE public.{LOG_TABLE}_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+                    PARTITION BY RANGE ({LOG_PARTITION_COLUMN});
+                CREATE TABLE public.{LOG_DEFAULT_PARTITION} PARTITION OF public.{LOG_TABLE} DEFAULT;
+
+                IF pk_columns IS NOT NULL THEN
+                    IF NOT pk_columns ~ ('(^|, ){LOG_PARTITION_COLUMN}(,|$)') THEN
+                        pk_columns := pk_columns || ', {LOG_PARTITION_COLUMN}';
+                    END IF;
+                    EXECUTE format('ALTER TABLE public.{LOG_TABLE} ADD PRIMARY KEY (%s)', pk_columns);
+                END IF;
+
+                FOR col IN
+                    SELECT a.attname, a.attidentity, pg_get_serial_sequence('public.{LOG_TABLE}_legacy', a.attname) AS seq
+                    FROM pg_attribute a
+                    WHERE a.attrelid = legacy AND a.attnum > 0 AND NOT a.attisdropped
+                      AND pg_get_serial_sequence('public.{LOG_TABLE}_legacy', a.attname) IS NOT NULL
+                LOOP
+                    IF col.attidentity <> '' THEN
+                        seq_name := '{LOG_TABLE}_' || col.attname || '_partitioned_seq';
+                        EXECUTE format('CREATE SEQUENCE public.%I OWNED BY public.{LOG_TABLE}.%I', seq_name, col.attname);
+                        EXECUTE format(
+                            'ALTER TABLE public.{LOG_TABLE} ALTER COLUMN %I SET DEFAULT nextval(%L)',
+                            col.attname, 'public.' || quote_ident(seq_name)
+                        );
+                    ELSE
+                        EXECUTE format('ALTER SEQUENCE %s OWNED BY public.{LOG_TABLE}.%I', col.seq, col.attname);
+                    END IF;
+                END LOOP;
+
+                FOR fk IN SELECT conname, pg_get_constraintdef(oid) AS definition FROM pg_constraint WHERE conrelid = legacy AND contype = 'f' LOOP
+                    EXECUTE format('ALTER TABLE public.{LOG_TABLE} ADD CONSTRAINT %I %s', fk.conname, fk.definition);
+                END LOOP;
+
+                SELECT date_trunc('month', COALESCE(MIN({LOG_PARTITION_COLUMN}), CURRENT_DATE))::date
+                INTO month_start FROM public.{LOG_TABLE}_legacy;
+                WHILE month_start <= last_month LOOP
+                    EXECUTE format(
+                        'CREATE TABLE public.%I PARTITION OF public.{LOG_TABLE} FOR VALUES FROM (%L) TO (%L)',
+                        '{LOG_PARTITION_PREFIX}' || to_char(month_start, 'YYYY_MM'),
+                        month_start,
+                        (month_start + interval '1 month')::date
+                    );
+                    month_start := (month_start + interval '1 month')::date;
+                END LOOP;
+
+                SELECT
+                    string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum),
+                    string_agg(
+                        CASE WHEN a.attname = '{LOG_PARTITION_COLUMN}'
+                            THEN format('COALESCE(%I, CURRENT_TIMESTAMP)', a.attname)
+                            ELSE quote_ident(a.attname)
+                        END,
+                        ', ' ORDER BY a.attnum
+                    )
+                INTO insert_columns, select_columns
+                FROM pg_attribute a
+                WHERE a.attrelid = legacy AND a.attnum > 0 AND NOT a.attisdropped;
+                EXECUTE format(
+                    'INSERT INTO public.{LOG_TABLE} (%s) SELECT %s FROM public.{LOG_TABLE}_legacy',
+                    insert_columns, select_columns
+                );
+
+                -- New identity sequences continue after the copied ids
+                FOR col IN
+                    SELECT a.attname FROM pg_attribute a
+                    WHERE a.attrelid = legacy AND a.attnum > 0 AND NOT a.attisdropped AND a.attidentity <> ''
+                LOOP
+                    EXECUTE format(
+                        'SELECT setval(%L, COALESCE((SELECT MAX(%I) FROM public.{LOG_TABLE}), 0) + 1, false)',
+                        'public.' || quote_ident('{LOG_TABLE}_' || col.attname || '_partitioned_seq'), col.attname
+                    );
+                END LOOP;
+            END $$;
+            """,
+        ],
+        # Partitioned parents cannot be indexed CONCURRENTLY; the index cascades to every partition
+        "indexes": [
+            {
+                "name": "ix_ybs_knowledge_processing_log_job",
+                "table": LOG_TABLE,
+                "definition": f"""
+                    CREATE INDEX IF NOT EXISTS ix_ybs_knowledge_processing_log_job
+                    ON public.{LOG_TABLE} (job_id, {LOG_PARTITION_COLUMN}) INCLUDE (ticket_id, knowledge_base_id)
+                """,
+            },
+            {
+                "name": "ix_ybs_knowledge_processing_log_job_stats",
+                "table": LOG_TABLE,
+                "definition": f"""
+                    CREATE INDEX IF NOT EXISTS ix_ybs_knowledge_processing_log_job_stats
+                    ON public.{LOG_TABLE} (job_id, status) INCLUDE (duration_ms)
+                """,
+            },
+        ],
+    },
+    {
+        "version": "0003_job_progress",
+        "description": "Per-job, per-status counters maintained by LogRepository.log_batch_details",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS public.ybs_knowledge_job_progress (
+                job_id uuid NOT NULL,
+                status text NOT NULL,
+                tickets integer NOT NULL DEFAULT 0,
+                total_duration_ms bigint NOT NULL DEFAULT 0,
+                last_logged_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, status)
+            );
+            """,
+            f"""
+            INSERT INTO public.ybs_knowledge_job_progress (job_id, status, tickets, total_duration_ms, last_logged_at)
+            SELECT job_id, status, COUNT(*), COALESCE(SUM(duration_ms), 0)::bigint,
+                   COALESCE(MAX({LOG_PARTITION_COLUMN}), CURRENT_TIMESTAMP)
+            FROM public.{LOG_TABLE}
+            WHERE job_id IS NOT NULL AND status IS NOT NULL
+            GROUP BY job_id, status
+            ON CONFLICT (job_id, status) DO NOTHING;
+            """,
+        ],
+    },
+]
+
+CREATE_MIGRATIONS_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+        version text PRIMARY KEY,
+        description text,
+        applied_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+INDEX_STATE_QUERY = """
+    SELECT i.relname AS name, x.indisvalid AS is_valid
+    FROM pg_class i
+    JOIN pg_index x ON x.indexrelid = i.oid
+    JOIN pg_namespace n ON n.oid = i.relnamespace
+    WHERE n.nspname = 'public' AND i.relname = ANY(:names);
+"""
+
+TABLES_QUERY = """
+    SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename = ANY(:names);
+"""
+
+
+def get_index_report(connection: Connection) -> List[Dict[str, Any]]:
+    """
+    Return the state of every index declared in MIGRATIONS:
+    'ok', 'missing', 'invalid' (a failed concurrent build) or 'table_missing'.
+    """
+    # A later migration may redefine an index (same name): the last definition wins
+    indexes = list({index["name"]: index for migration in MIGRATIONS for index in migration["indexes"]}.values())
+    names = [index["name"] for index in indexes]
+    tables = [index["table"] for index in indexes]
+
+    states = {row.name: row.is_valid for row in connection.execute(text(INDEX_STATE_QUERY), {"names": names})}
+    existing_tables = {row.tablename for row in connection.execute(text(TABLES_QUERY), {"names": tables})}
+
+    report = []
+    for index in indexes:
+        if index["table"] not in existing_tables:
+            state = "table_missing"
+        elif index["name"] not in states:
+            state = "missing"
+        elif not states[index["name"]]:
+            state = "invalid"
+        else:
+            state = "ok"
+        report.append({"name": index["name"], "table": index["table"], "state": state})
+    return report
+
+
+def get_applied_versions(connection: Connection) -> List[str]:
+    # check must not write: without the control table nothing was applied yet
+    if connection.execute(text(f"SELECT to_regclass('{MIGRATIONS_TABLE}')")).scalar() is None:
+        return []
+    rows = connection.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE} ORDER BY version"))
+    return [row.version for row in rows]
+
+
+def apply_migrations(connection: Connection) -> List[str]:
+    """
+    Apply the pending migrations in order and return the versions applied.
+    The connection must be in AUTOCOMMIT (CREATE INDEX CONCURRENTLY cannot run in a transaction).
+    """
+    connection.execute(text(CREATE_MIGRATIONS_TABLE))
+    applied = set(get_applied_versions(connection))
+    newly_applied = []
+    for migration in MIGRATIONS:
+        if migration["version"] in applied:
+            continue
+
+        print(f"Applying migration {migration['version']}: {migration['description']}")
+        for statement in migration.get("statements", []):
+            connection.execute(text(statement))
+        invalid = {item["name"] for item in get_index_report(connection) if item["state"] == "invalid"}
+        for index in migration.get("indexes", []):
+            if index["name"] in invalid:
+                # IF NOT EXISTS would keep the broken index from an interrupted build
+                print(f"   → Dropping invalid index {index['name']}")
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS public.{index['name']}"))
+            print(f"   → {index['name']} on {index['table']}")
+            connection.execute(text(index["definition"]))
+
+        connection.execute(
+            text(f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (:version, :description)"),
+            {"version": migration["version"], "description": migration["description"]},
+        )
+        newly_applied.append(migration["version"])
+    return newly_applied
+
+
+def check(connection: Connection) -> bool:
+    """Print pending migrations and the state of every managed index. Returns True if all is in place."""
+    applied = set(get_applied_versions(connection))
+    pending = [migration["version"] for migration in MIGRATIONS if migration["version"] not in applied]
+    report = get_index_report(connection)
+
+    print(f"Migrations: {len(MIGRATIONS) - len(pending)} applied, {len(pending)} pending {pending if pending else ''}")
+    for item in report:
+        print(f"   {item['state']:<14} {item['name']} ({item['table']})")
+
+    problems = [item for item in report if item["state"] != "ok"]
+    if problems:
+        print(f"{len(problems)} index(es) missing or invalid. Run: python -m db.migrations apply")
+    return not pending and not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations for the Directus database.")
+    parser.add_argument("command", choices=["check", "apply"])
+    args = parser.parse_args()
+
+    # Same .env the repositories load (POSTGRES_* variables)
+    load_dotenv(Path(__file__).parent.parent.parent / ".env")
+    engine = ENGINE_REGISTRY.acquire("directus")
+    try:
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            if args.command == "apply":
+                versions = apply_migrations(connection)
+                print(f"Applied {len(versions)} migration(s).")
+            ok = check(connection)
+    finally:
+        ENGINE_REGISTRY.release("directus")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
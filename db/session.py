@@ -1,13 +1,14 @@
 from typing import Generator
 
-from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from db.engines import ENGINE_REGISTRY
 from db.url import get_db_url
 
-# Create SQLAlchemy Engine using a database URL
+# Shared pooled engine of the app database (held for the lifetime of the process)
 db_url: str = get_db_url()
-db_engine: Engine = create_engine(db_url, pool_pre_ping=True)
+db_engine: Engine = ENGINE_REGISTRY.acquire("app")
 
 # Create a SessionLocal class
 SessionLocal: sessionmaker[Session] = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
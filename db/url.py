@@ -1,8 +1,9 @@
 from os import getenv
+from typing import Optional
 
 
-def get_db_url() -> str:
-    db_driver = getenv("DB_DRIVER", "postgresql+psycopg")
+def get_db_url(driver: Optional[str] = None) -> str:
+    db_driver = driver or getenv("DB_DRIVER", "postgresql+psycopg")
     db_user = getenv("DB_USER")
     db_pass = getenv("DB_PASS")
     db_host = getenv("DB_HOST")
@@ -16,3 +17,43 @@ def get_db_url() -> str:
         db_port,
         db_database,
     )
+
+
+def get_directus_db_url(driver: Optional[str] = None, host: Optional[str] = None, port: Optional[str] = None) -> str:
+    """
+    Build the SQLAlchemy URL for the Directus database (sisateg_* and ybs_* tables)
+    from the POSTGRES_* variables. Host and port default to localhost:5432.
+    """
+    db_driver = driver or getenv("POSTGRES_DRIVER", "postgresql")
+    db_user = getenv("POSTGRES_USER")
+    db_password = getenv("POSTGRES_PASSWORD")
+    db_name = getenv("POSTGRES_DB")
+    db_host = host or getenv("POSTGRES_HOST", "localhost")
+    db_port = port or getenv("POSTGRES_PORT", "5432")
+
+    if not all([db_user, db_password, db_name]):
+        raise ConnectionError(
+            "As variáveis de ambiente para o banco de dados (POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_DB) não estão configuradas."
+        )
+
+    print(f"Directus DB: connecting to -> {db_driver}://{db_user}:****@{db_host}:{db_port}/{db_name}")
+    return f"{db_driver}://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+def is_directus_replica_configured() -> bool:
+    return bool(getenv("POSTGRES_REPLICA_HOST"))
+
+
+def get_directus_replica_db_url(driver: Optional[str] = None) -> str:
+    """
+    Build the URL of the Directus read replica (POSTGRES_REPLICA_HOST / POSTGRES_REPLICA_PORT,
+    same credentials and database name as the primary). A load balancer or pgbouncer in
+    front of several replicas can be used as the host.
+    """
+    if not is_directus_replica_configured():
+        raise ConnectionError("POSTGRES_REPLICA_HOST não está configurado.")
+    return get_directus_db_url(
+        driver,
+        host=getenv("POSTGRES_REPLICA_HOST"),
+        port=getenv("POSTGRES_REPLICA_PORT", getenv("POSTGRES_PORT", "5432")),
+    )
@@ -0,0 +1,69 @@
+# agent-api/knowledge/batch_search.py
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+# Só anotações: o agno.knowledge é carregado com a primeira KB (KNOWLEDGE_REGISTRY)
+if TYPE_CHECKING:
+    from agno.knowledge.document import Document
+    from agno.knowledge.knowledge import Knowledge
+
+# Buscas simultâneas no LanceDB por requisição (cada uma ocupa uma thread do pool)
+MAX_CONCURRENT_SEARCHES = 8
+
+
+async def embed_queries(embedder: Any, queries: List[str]) -> List[List[float]]:
+    """
+    Gera as embeddings de todas as queries. Usa a API em lote do embedder quando
+    disponível (GeminiEmbedder: uma chamada a cada `batch_size` textos); caso
+    contrário, dispara as chamadas individuais em paralelo.
+    """
+    if hasattr(embedder, "async_get_embeddings_batch_and_usage"):
+        embeddings, _ = await embedder.async_get_embeddings_batch_and_usage(queries)
+        return embeddings
+    return list(await asyncio.gather(*[embedder.async_get_embedding(query) for query in queries]))
+
+
+async def batch_vector_search(
+    kb: Knowledge,
+    queries: List[str],
+    limit: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[List[Document]]:
+    """
+    Executa várias buscas vetoriais na KB: embeddings em lote e buscas concorrentes.
+
+    Returns:
+        List[List[Document]]: Os documentos ranqueados de cada query, na ordem recebida.
+    """
+    vector_db = kb.vector_db
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+    if not hasattr(vector_db, "search_by_embedding"):
+        # Vector DB sem busca por embedding pronta: cada busca embute a própria query
+        async def search_one(query: str) -> List[Document]:
+            async with semaphore:
+                return await asyncio.to_thread(vector_db.search, query=query, limit=limit, filters=filters)
+
+        return list(await asyncio.gather(*[search_one(query) for query in queries]))
+
+    embeddings = await embed_queries(vector_db.embedder, queries)
+
+    async def search_with_embedding(query: str, embedding: List[float]) -> List[Document]:
+        if not embedding:
+            print(f"batch_vector_search: embedding vazia para a query: {query}")
+            return []
+        async with semaphore:
+            return await asyncio.to_thread(
+                vector_db.search_by_embedding,
+                query=query,
+                query_embedding=embedding,
+                limit=limit,
+                filters=filters,
+            )
+
+    return list(await asyncio.gather(*[
+        search_with_embedding(query, embedding) for query, embedding in zip(queries, embeddings)
+    ]))
@@ -0,0 +1,355 @@
+# agent-api/knowledge/filtered_lancedb.py
+
+import asyncio
+import json
+from datetime import date, datetime
+from hashlib import md5
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+from agno.knowledge.document import Document
+from agno.vectordb.lancedb import LanceDb, SearchType
+
+# Colunas tipadas gravadas ao lado do vetor. Filtros sobre elas são empurrados para
+# o `where` do LanceDB (pré-filtro com índice escalar) em vez de pós-filtrar o top-k.
+METADATA_COLUMNS: Dict[str, pa.DataType] = {
+    "solution_type": pa.string(),
+    "ticket_level": pa.int32(),
+    "tags": pa.list_(pa.string()),
+    "updated_at": pa.timestamp("us"),
+}
+
+# Tipo de índice escalar por coluna: BITMAP para baixa cardinalidade, LABEL_LIST
+# para listas (array_has_any) e BTREE para intervalos de data.
+SCALAR_INDEX_TYPES: Dict[str, str] = {
+    "solution_type": "BITMAP",
+    "ticket_level": "BITMAP",
+    "tags": "LABEL_LIST",
+    "updated_at": "BTREE",
+}
+
+# Operadores aceitos em filtros de intervalo, ex: {"updated_at": {"gte": "2024-01-01"}}
+RANGE_OPERATORS: Dict[str, str] = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+
+
+def _parse_tags(value: Any) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("["):
+            value = json.loads(value)
+        elif value.startswith("{") and value.endswith("}"):
+            # Literal de array do Postgres: {a,b,c}
+            value = [tag.strip().strip('"') for tag in value[1:-1].split(",")]
+        else:
+            value = value.split(",")
+    return [str(tag).strip() for tag in value if str(tag).strip()]
+
+
+def _parse_int(value: Any) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def extract_metadata_columns(meta_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Converte o meta_data de um documento nos valores tipados das colunas de metadados.
+    Chaves ausentes viram NULL.
+    """
+    meta_data = meta_data or {}
+    return {
+        "solution_type": meta_data.get("solution_type"),
+        "ticket_level": _parse_int(meta_data.get("ticket_level")),
+        "tags": _parse_tags(meta_data.get("tags")),
+        "updated_at": _parse_datetime(meta_data.get("updated_at")),
+    }
+
+
+def _sql_literal(column: str, value: Any) -> str:
+    if column == "updated_at":
+        parsed = _parse_datetime(value)
+        return f"CAST('{parsed.isoformat(sep=' ')}' AS TIMESTAMP)" if parsed else "NULL"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
+
+
+def _column_clause(column: str, value: Any) -> Optional[str]:
+    if column == "tags":
+        # Lista vazia (ou não interpretável): sem cláusula; `array_has_any(tags, [])`
+        # é inválido ou não casa nada, dependendo da versão do LanceDB
+        tags = _parse_tags(value)
+        if not tags:
+            return None
+        return f"array_has_any(tags, [{', '.join(_sql_literal(column, tag) for tag in tags)}])"
+    if isinstance(value, dict):
+        parts = []
+        for operator, operand in value.items():
+            if operator not in RANGE_OPERATORS:
+                raise ValueError(f"Operador de filtro inválido para '{column}': {operator}")
+            parts.append(f"{column} {RANGE_OPERATORS[operator]} {_sql_literal(column, operand)}")
+        return " AND ".join(parts)
+    if isinstance(value, (list, tuple, set)):
+        return f"{column} IN ({', '.join(_sql_literal(column, item) for item in value)})"
+    if value is None:
+        return f"{column} IS NULL"
+    return f"{column} = {_sql_literal(column, value)}"
+
+
+def build_where_clause(filters: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Separa os filtros em uma cláusula SQL sobre as colunas tipadas (empurrada para o
+    LanceDB) e os filtros restantes, que continuam sendo aplicados sobre o payload.
+
+    Aceita chaves simples ("solution_type") ou prefixadas ("meta_data.solution_type").
+    Valores: escalar (=), lista (IN), dict de intervalo ({"gte": ..., "lt": ...});
+    para `tags`, qualquer tag informada casa (array_has_any).
+    """
+    clauses: List[str] = []
+    remaining: Dict[str, Any] = {}
+    for key, value in (filters or {}).items():
+        column = key.split(".")[-1]
+        if column in METADATA_COLUMNS:
+            clause = _column_clause(column, value)
+            if clause:
+                clauses.append(f"({clause})")
+        else:
+            remaining[key] = value
+    return (" AND ".join(clauses) or None), remaining
+
+
+class FilteredLanceDb(LanceDb):
+    """
+    LanceDb que grava `solution_type`, `ticket_level`, `tags` e `updated_at` como
+    colunas tipadas e aplica filtros sobre elas como pré-filtro (`where`) da busca,
+    apoiado por índices escalares. Assim uma busca filtrada (ex: só 'Correção de
+    Banco') custa o mesmo que uma busca sem filtro, sem pós-filtrar um top-k grande.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._ensure_metadata_columns()
+
+    def _base_schema(self) -> pa.Schema:
+        schema = super()._base_schema()
+        for column, data_type in METADATA_COLUMNS.items():
+            schema = schema.append(pa.field(column, data_type, nullable=True))
+        return schema
+
+    def _ensure_metadata_columns(self) -> None:
+        """Adiciona (como NULL) as colunas tipadas que faltarem em tabelas criadas antes delas."""
+        if self.table is None:
+            return
+        existing = set(self.table.schema.names)
+        missing = [
+            pa.field(column, data_type, nullable=True)
+            for column, data_type in METADATA_COLUMNS.items()
+            if column not in existing
+        ]
+        if missing:
+            print(f"FilteredLanceDb: adicionando colunas {[f.name for f in missing]} em '{self.table_name}'")
+            self.table.add_columns(missing)
+
+    def ensure_scalar_indexes(self, replace: bool = False) -> Dict[str, str]:
+        """
+        Cria os índices escalares das colunas de metadados. Deve ser chamado após a
+        carga (ex: ao final do vector_knowledge_builder), pois índices sobre uma
+        tabela vazia não têm utilidade.
+
+        Returns:
+            Dict[str, str]: coluna -> "created", "exists" ou a mensagem de erro.
+        """
+        results: Dict[str, str] = {}
+        if self.table is None:
+            return results
+
+        indexed_columns = set()
+        for index in self.table.list_indices():
+            indexed_columns.update(index.columns)
+
+        for column, index_type in SCALAR_INDEX_TYPES.items():
+            if column in indexed_columns and not replace:
+                results[column] = "exists"
+                continue
+            try:
+                self.table.create_scalar_index(column, index_type=index_type, replace=True)
+                results[column] = "created"
+            except Exception as e:
+                print(f"FilteredLanceDb: ERRO ao criar índice {index_type} em '{column}': {e}")
+                results[column] = f"error: {e}"
+        return results
+
+    def _build_rows(
+        self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        rows = []
+        for document in documents:
+            if filters:
+                meta_data = document.meta_data.copy() if document.meta_data else {}
+                meta_data.update(filters)
+                document.meta_data = meta_data
+
+            cleaned_content = document.content.replace("\x00", "\ufffd")
+            payload = {
+                "name": document.name,
+                "meta_data": document.meta_data,
+                "content": cleaned_content,
+                "usage": document.usage,
+                "content_id": document.content_id,
+                "content_hash": content_hash,
+            }
+            row = {
+                "id": md5(cleaned_content.encode()).hexdigest(),
+                "vector": self._prepare_vector(document.embedding),
+                "payload": json.dumps(payload, default=str),
+            }
+            row.update(extract_metadata_columns(document.meta_data))
+            rows.append(row)
+        return rows
+
+    def _add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self.table is None:
+            self.table = self._init_table()
+        data = pa.Table.from_pylist(rows, schema=self._base_schema())
+        if self.on_bad_vectors is not None:
+            self.table.add(data, on_bad_vectors=self.on_bad_vectors, fill_value=self.fill_value)
+        else:
+            self.table.add(data)
+
+    def insert(self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        pending = [document for document in documents if not self.doc_exists(document)]
+        for document in pending:
+            document.embed(embedder=self.embedder)
+        self._add_rows(self._build_rows(content_hash, pending, filters))
+
+    async def async_insert(
+        self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        pending = [document for document in documents if not self.doc_exists(document)]
+        results = await asyncio.gather(
+            *[document.async_embed(embedder=self.embedder) for document in pending], return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        # Escrita pela tabela síncrona: mantém um único handle (e o schema tipado) para leitura e escrita
+        self._add_rows(self._build_rows(content_hash, pending, filters))
+
+    def _open_table(self):
+        # Reabre a tabela para enxergar escritas feitas por outros processos (ex: o vetorizador)
+        if self.connection:
+            self.table = self.connection.open_table(name=self.table_name)
+        return self.table
+
+    def _remember_query_embedding(self, query: str, query_embedding: List[float]) -> None:
+        # Repassa a embedding já calculada ao reranker (MMR), que senão embutiria a query de novo
+        if self.reranker is not None and hasattr(self.reranker, "remember_query_embedding"):
+            self.reranker.remember_query_embedding(query, query_embedding)
+
+    def _run_search(
+        self, builder, query: str, limit: int, where: Optional[str], remaining_filters: Dict[str, Any]
+    ) -> List[Document]:
+        if where:
+            builder = builder.where(where, prefilter=True)
+
+        search_results = self._build_search_results(builder.limit(limit).to_pandas())
+
+        if remaining_filters:
+            search_results = [
+                doc
+                for doc in search_results
+                if doc.meta_data is not None
+                and all(doc.meta_data.get(key) == value for key, value in remaining_filters.items())
+            ]
+
+        if self.reranker and search_results:
+            search_results = self.reranker.rerank(query=query, documents=search_results)
+        return search_results
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Busca com os filtros de colunas tipadas aplicados como pré-filtro no LanceDB.
+        Filtros sobre outras chaves do meta_data continuam sendo pós-filtrados.
+        """
+        where, remaining_filters = build_where_clause(filters)
+
+        table = self._open_table()
+        if table is None:
+            print("FilteredLanceDb: tabela não inicializada.")
+            return []
+
+        if self.search_type == SearchType.keyword:
+            if not self.fts_index_exists:
+                table.create_fts_index("payload", use_tantivy=self.use_tantivy, replace=True)
+                self.fts_index_exists = True
+            builder = table.search(query=query, query_type="fts")
+        else:
+            query_embedding = self.embedder.get_embedding(query)
+            if not query_embedding:
+                print(f"FilteredLanceDb: falha ao gerar embedding da query: {query}")
+                return []
+            self._remember_query_embedding(query, query_embedding)
+            if self.search_type == SearchType.hybrid:
+                if not self.fts_index_exists:
+                    table.create_fts_index("payload", use_tantivy=self.use_tantivy, replace=True)
+                    self.fts_index_exists = True
+                builder = (
+                    table.search(vector_column_name=self._vector_col, query_type="hybrid")
+                    .vector(query_embedding)
+                    .text(query)
+                )
+            else:
+                builder = table.search(query=query_embedding, vector_column_name=self._vector_col)
+            if self.nprobes:
+                builder = builder.nprobes(self.nprobes)
+
+        return self._run_search(builder, query, limit, where, remaining_filters)
+
+    def search_by_embedding(
+        self,
+        query: str,
+        query_embedding: List[float],
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """
+        Busca vetorial com a embedding da query já calculada (ex: em lote pelo
+        POST /support/search), sem nova chamada ao embedder. `query` só é usado
+        pelo reranker.
+        """
+        where, remaining_filters = build_where_clause(filters)
+
+        table = self._open_table()
+        if table is None:
+            print("FilteredLanceDb: tabela não inicializada.")
+            return []
+
+        self._remember_query_embedding(query, query_embedding)
+        builder = table.search(query=query_embedding, vector_column_name=self._vector_col)
+        if self.nprobes:
+            builder = builder.nprobes(self.nprobes)
+        return self._run_search(builder, query, limit, where, remaining_filters)
+
+    async def async_search(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        # O LanceDB ainda não expõe busca assíncrona: a busca síncrona (embedding via
+        # HTTP + query no LanceDB) roda numa thread para não travar os outros chats
+        return await asyncio.to_thread(self.search, query, limit, filters)
@@ -0,0 +1,150 @@
+# agent-api/knowledge/mmr.py
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, List, Optional, Set
+
+import numpy as np
+from agno.knowledge.document import Document
+from agno.knowledge.reranker.base import Reranker
+from pydantic import PrivateAttr
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> Set[str]:
+    """
+    Normaliza o texto (minúsculas, sem acentos) e retorna o conjunto de tokens
+    com mais de 2 caracteres, usado no re-score lexical.
+    """
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return {token for token in _TOKEN_PATTERN.findall(normalized) if len(token) > 2}
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class MMRReranker(Reranker):
+    """
+    Estágio pós-recuperação que aplica Maximal Marginal Relevance (MMR) sobre os
+    candidatos retornados pelo LanceDB, removendo quase-duplicatas da mesma solução
+    e devolvendo um conjunto menor e diverso para o contexto do agente.
+
+    A relevância de cada candidato é a similaridade de cosseno com a query (quando há
+    embedder) ou, na falta dele, a posição original no ranking. Opcionalmente, essa
+    relevância é combinada com um re-score lexical (sobreposição de termos).
+    """
+
+    embedder: Optional[Any] = None
+    top_k: int = 5
+    lambda_mult: float = 0.7
+    lexical_weight: float = 0.0
+    query_cache_size: int = 256
+
+    # Cache das embeddings de query (o LanceDB já embutiu a mesma query na busca
+    # vetorial e a repassa via remember_query_embedding; evita repetir a chamada ao Gemini).
+    # O reranker é compartilhado pelas buscas simultâneas (threads): todo acesso passa pelo lock.
+    _query_cache: "OrderedDict[str, np.ndarray]" = PrivateAttr(default_factory=OrderedDict)
+    _query_cache_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _cache_get(self, query: str) -> Optional[np.ndarray]:
+        with self._query_cache_lock:
+            cached = self._query_cache.get(query)
+            if cached is not None:
+                self._query_cache.move_to_end(query)
+            return cached
+
+    def _cache_put(self, query: str, embedding: np.ndarray) -> None:
+        with self._query_cache_lock:
+            self._query_cache[query] = embedding
+            self._query_cache.move_to_end(query)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def remember_query_embedding(self, query: str, embedding: List[float]) -> None:
+        """Guarda a embedding de uma query já calculada pela busca vetorial."""
+        if not embedding:
+            return
+        self._cache_put(query, np.asarray(embedding, dtype=np.float32))
+
+    def _query_embedding(self, query: str) -> Optional[np.ndarray]:
+        if self.embedder is None:
+            return None
+        cached = self._cache_get(query)
+        if cached is not None:
+            return cached
+        # Fora do lock: a chamada ao embedder não pode serializar as outras buscas
+        try:
+            embedding = np.asarray(self.embedder.get_embedding(query), dtype=np.float32)
+        except Exception as e:
+            print(f"MMRReranker: falha ao gerar embedding da query, usando ranking original: {e}")
+            return None
+        if embedding.size == 0:
+            return None
+        self._cache_put(query, embedding)
+        return embedding
+
+    def _relevance(self, query: str, doc_matrix: np.ndarray, documents: List[Document]) -> np.ndarray:
+        n_docs = len(documents)
+        query_embedding = self._query_embedding(query)
+        if query_embedding is not None and query_embedding.shape[0] == doc_matrix.shape[1]:
+            relevance = doc_matrix @ _l2_normalize(query_embedding)
+        else:
+            # Sem embedding da query: a ordem da busca vetorial já é a relevância
+            relevance = 1.0 - np.arange(n_docs, dtype=np.float32) / n_docs
+
+        if self.lexical_weight > 0:
+            query_tokens = _tokenize(query)
+            if query_tokens:
+                lexical = np.fromiter(
+                    (len(query_tokens & _tokenize(doc.content)) / len(query_tokens) for doc in documents),
+                    dtype=np.float32,
+                    count=n_docs,
+                )
+                relevance = (1.0 - self.lexical_weight) * relevance + self.lexical_weight * lexical
+        return relevance
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        """
+        Seleciona até `top_k` documentos maximizando
+        `lambda * relevancia - (1 - lambda) * max_similaridade_com_os_ja_escolhidos`.
+        """
+        if len(documents) <= 1:
+            return documents[: self.top_k]
+
+        if any(doc.embedding is None or len(doc.embedding) == 0 for doc in documents):
+            # Sem vetores não há como medir redundância; mantém a ordem original
+            return documents[: self.top_k]
+
+        doc_matrix = _l2_normalize(np.asarray([doc.embedding for doc in documents], dtype=np.float32))
+        relevance = self._relevance(query, doc_matrix, documents)
+        similarity = doc_matrix @ doc_matrix.T
+
+        n_docs = len(documents)
+        k = min(self.top_k, n_docs)
+        selected: List[int] = []
+        scores: List[float] = []
+        available = np.ones(n_docs, dtype=bool)
+        max_sim_to_selected = np.zeros(n_docs, dtype=np.float32)
+
+        for _ in range(k):
+            mmr_scores = self.lambda_mult * relevance - (1.0 - self.lambda_mult) * max_sim_to_selected
+            mmr_scores[~available] = -np.inf
+            best = int(np.argmax(mmr_scores))
+            selected.append(best)
+            scores.append(float(mmr_scores[best]))
+            available[best] = False
+            np.maximum(max_sim_to_selected, similarity[best], out=max_sim_to_selected)
+
+        reranked: List[Document] = []
+        for idx, score in zip(selected, scores):
+            doc = documents[idx]
+            doc.reranking_score = score
+            reranked.append(doc)
+        return reranked
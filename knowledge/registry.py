@@ -1,14 +1,22 @@
 # agent-api/knowledge/registry.py
 
 import os
-from agno.knowledge.knowledge import Knowledge
-from agno.vectordb.lancedb import LanceDb
-from agno.knowledge.embedder.google import GeminiEmbedder
-from typing import Dict, Any
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+
+# LanceDB, o embedder (google-genai) e o MMR só são importados ao criar a primeira KB:
+# juntos custam alguns segundos no import de quem só precisa do registry (api.main)
+if TYPE_CHECKING:
+    from agno.knowledge.knowledge import Knowledge
+    from knowledge.mmr import MMRReranker
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 VECTOR_DB_PATH = os.path.join(BASE_DIR, "lancedb_data")
 
+# Query fictícia usada pelo warm_up() para carregar o índice e a conexão do embedder
+WARM_UP_QUERY = "warm-up"
+
 class KnowledgeRegistry:
     """
     Registry central para gerenciar instâncias de Bases de Conhecimento (KB) do Agno.
@@ -21,42 +29,102 @@ class KnowledgeRegistry:
         "sisateg_kb": {
             "VectorDbPath": VECTOR_DB_PATH,
             "VectorTableName": "sisateg_knowledge_base",
-            "EmbedderModelId": "models/embedding-001"
+            "EmbedderModelId": "models/embedding-001",
+            "SearchType": "vector",  # "vector", "keyword" ou "hybrid" (ver benchmarks/retrieval_benchmark.py)
+            "Preload": True,  # Incluída no warm_up() chamado após o startup
+            # Grava solution_type, ticket_level, tags e updated_at como colunas tipadas
+            # e empurra filtros sobre elas para o `where` do LanceDB (FilteredLanceDb)
+            "MetadataColumns": True,
+            # Pós-recuperação: busca um pool maior e devolve um subconjunto diverso (MMR)
+            "Diversification": {
+                "Enabled": True,
+                "CandidatePoolSize": 20,  # top-k bruto buscado no LanceDB
+                "TopK": 5,  # Quantidade final entregue ao agente
+                "Lambda": 0.7,  # 1.0 = só relevância, 0.0 = só diversidade
+                "LexicalWeight": 0.2,  # Peso do re-score lexical (0 desativa)
+            },
         },
         "docs_kb": {
             "VectorDbPath": VECTOR_DB_PATH,
             "VectorTableName": "system_documentation", # Nome da futura tabela
-            "EmbedderModelId": "models/embedding-001"
+            "EmbedderModelId": "models/embedding-001",
+            "Preload": False,  # A tabela ainda não existe; só é criada se alguém pedir a KB
+            "MetadataColumns": False,
+            "Diversification": {
+                "Enabled": False,
+            },
         }
     }
 
-    _kbs: Dict[str, Knowledge] = {} # Cache para armazenar as instâncias de KB
-
     def __init__(self):
-        """Inicializa o Registry (vazio inicialmente)."""
-        print("--- KnowledgeRegistry Inicializado ---")
-
-        for kb_name in self._kbsDefinitions.keys():
-            print(f"KB registrada: {kb_name}")
-            if kb_name not in self._kbs:
-                self._kbs[kb_name] = self._create_kb(self._kbsDefinitions[kb_name])
+        """
+        Inicializa o Registry vazio. Nenhuma conexão com o LanceDB nem embedder é
+        criado aqui; cada KB é construída na primeira chamada a get_kb().
+        """
+        self._kbs: Dict[str, "Knowledge"] = {} # Cache para armazenar as instâncias de KB
+        # Um lock por KB: a criação de uma KB não bloqueia o acesso às demais
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self._kbsDefinitions}
+        self._warm_up_state: Dict[str, Any] = {"status": "pending", "kbs": {}, "duration_ms": None}
+        print(f"--- KnowledgeRegistry Inicializado (lazy): {list(self._kbsDefinitions.keys())} ---")
 
-    def _create_kb(self, definitions) -> Knowledge:
+    def _create_kb(self, definitions) -> "Knowledge":
         """
         Lógica interna para criar a instância da KB 'sisateg_kb'.
         Lê as configurações do ambiente e do vector_knowledge_builder.
         """
+        from agno.knowledge.knowledge import Knowledge
+        from agno.vectordb.lancedb import LanceDb, SearchType
+        from knowledge.filtered_lancedb import FilteredLanceDb, METADATA_COLUMNS
 
-        embedder = GeminiEmbedder(id=definitions["EmbedderModelId"])
-        vector_db = LanceDb(
+        embedder = self._create_embedder(definitions)
+        reranker = self._create_reranker(definitions, embedder)
+        vector_db_class = FilteredLanceDb if definitions.get("MetadataColumns", False) else LanceDb
+        vector_db = vector_db_class(
             uri=definitions["VectorDbPath"],
             table_name=definitions["VectorTableName"],
-            embedder=embedder
+            embedder=embedder,
+            reranker=reranker,
+            search_type=SearchType(definitions.get("SearchType", "vector")),
+            use_tantivy=definitions.get("UseTantivy", True),
         )
-        kb = Knowledge(vector_db=vector_db)
+        if reranker is not None:
+            # Busca mais candidatos do que o necessário para o MMR ter o que diversificar
+            kb = Knowledge(vector_db=vector_db, max_results=definitions["Diversification"]["CandidatePoolSize"])
+        else:
+            kb = Knowledge(vector_db=vector_db)
+
+        if isinstance(vector_db, FilteredLanceDb):
+            # Sem contents_db o Agno não conhece as chaves de filtro e descartaria os knowledge_filters
+            kb.valid_metadata_filters.update(METADATA_COLUMNS.keys())
         return kb
 
-    def get_kb(self, name: str) -> Knowledge:
+    def _create_embedder(self, definitions):
+        """
+        Cria o embedder da KB. Ponto de extensão: o benchmark de recuperação
+        sobrescreve este método para usar um embedder determinístico e offline.
+        """
+        from agno.knowledge.embedder.google import GeminiEmbedder
+
+        return GeminiEmbedder(id=definitions["EmbedderModelId"])
+
+    def _create_reranker(self, definitions, embedder) -> Optional["MMRReranker"]:
+        """
+        Cria o estágio de diversificação (MMR + re-score lexical opcional) a partir
+        da chave "Diversification" da definição da KB. Retorna None se desativado.
+        """
+        diversification = definitions.get("Diversification") or {}
+        if not diversification.get("Enabled", False):
+            return None
+        from knowledge.mmr import MMRReranker
+
+        return MMRReranker(
+            embedder=embedder,
+            top_k=diversification.get("TopK", 5),
+            lambda_mult=diversification.get("Lambda", 0.7),
+            lexical_weight=diversification.get("LexicalWeight", 0.0),
+        )
+
+    def get_kb(self, name: str) -> "Knowledge":
         """
         Obtém uma instância de base de conhecimento pelo nome, criando-a se
         ainda não existir (inicialização preguiçosa).
@@ -70,11 +138,88 @@ class KnowledgeRegistry:
         Raises:
             ValueError: Se o nome da KB não for reconhecido.
         """
-        if name not in self._kbs:
-            return None
-        return self._kbs[name]
+        kb = self._kbs.get(name)
+        if kb is not None:
+            return kb
+
+        if name not in self._kbsDefinitions:
+            raise ValueError(f"KB '{name}' não registrada. Disponíveis: {list(self._kbsDefinitions.keys())}")
 
-    def all_kbs(self) -> Dict[str, Knowledge]:
+        with self._locks[name]:
+            # Double-checked locking: outra thread pode ter criado a KB enquanto esperávamos
+            kb = self._kbs.get(name)
+            if kb is None:
+                print(f"KnowledgeRegistry: criando KB '{name}'...")
+                kb = self._create_kb(self._kbsDefinitions[name])
+                self._kbs[name] = kb
+        return kb
+
+    def get_lazy_kb(self, name: str) -> "LazyKnowledge":
+        """
+        Retorna um proxy para a KB que só a cria no primeiro uso real (ex: a primeira
+        busca feita pelo agente). Permite declarar agentes em nível de módulo sem
+        abrir o LanceDB durante o import.
+
+        Raises:
+            ValueError: Se o nome da KB não for reconhecido.
+        """
+        if name not in self._kbsDefinitions:
+            raise ValueError(f"KB '{name}' não registrada. Disponíveis: {list(self._kbsDefinitions.keys())}")
+        return LazyKnowledge(self, name)
+
+    def warm_up(self, names: Optional[List[str]] = None, run_search: bool = True) -> Dict[str, str]:
+        """
+        Aquece antecipadamente as KBs indicadas (ou todas com "Preload": True):
+        cria a instância, abre a tabela do LanceDB e, se `run_search`, executa uma
+        busca fictícia para carregar as páginas do índice e estabelecer a conexão
+        HTTP do embedder. Deve ser chamado pela aplicação após o startup, fora do
+        caminho do import. Falhas são reportadas por KB e não interrompem as demais.
+
+        Returns:
+            Dict[str, str]: nome_kb -> "ready" ou a mensagem de erro.
+        """
+        if names is None:
+            names = [name for name, definitions in self._kbsDefinitions.items() if definitions.get("Preload", True)]
+
+        self._warm_up_state = {"status": "running", "kbs": {}, "duration_ms": None}
+        start_time = time.time()
+        results: Dict[str, str] = {}
+        for name in names:
+            kb_start_time = time.time()
+            try:
+                kb = self.get_kb(name)
+                if run_search:
+                    # Direto no vector_db: Knowledge.search() engole exceções e mascararia falhas do warm-up
+                    kb.vector_db.search(query=WARM_UP_QUERY, limit=1)
+                results[name] = "ready"
+                print(f"KnowledgeRegistry: KB '{name}' aquecida em {(time.time() - kb_start_time) * 1000:.0f} ms")
+            except Exception as e:
+                print(f"KnowledgeRegistry: ERRO ao aquecer KB '{name}': {e}")
+                results[name] = f"error: {e}"
+
+        self._warm_up_state = {
+            "status": "completed",
+            "kbs": results,
+            "duration_ms": int((time.time() - start_time) * 1000),
+        }
+        return results
+
+    def warm_up_status(self) -> Dict[str, Any]:
+        """
+        Retorna o estado do último warm_up(): status ("pending", "running" ou
+        "completed"), o resultado por KB e a duração total em ms.
+        """
+        return dict(self._warm_up_state)
+
+    def is_warmed_up(self) -> bool:
+        """Indica se o warm_up() já terminou (com ou sem erros por KB)."""
+        return self._warm_up_state["status"] == "completed"
+
+    def registered_kbs(self) -> List[str]:
+        """Retorna os nomes de todas as KBs registradas (instanciadas ou não)."""
+        return list(self._kbsDefinitions.keys())
+
+    def all_kbs(self) -> Dict[str, "Knowledge"]:
         """
         Retorna um dicionário com todas as KBs já instanciadas.
         Nota: KBs não solicitadas via get_kb() não estarão aqui.
@@ -84,6 +229,34 @@ class KnowledgeRegistry:
         """
         return self._kbs.copy() # Retorna uma cópia para evitar modificação externa
 
+
+class LazyKnowledge:
+    """
+    Proxy para uma KB do KnowledgeRegistry. Qualquer acesso a atributo (search,
+    vector_db, max_results...) resolve a KB real via get_kb(), criando-a na
+    primeira vez de forma thread-safe.
+    """
+
+    def __init__(self, registry: KnowledgeRegistry, name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        # Atributos internos/dunder não disparam a criação da KB (copy, pickle, repr...)
+        if attr.startswith("__") or attr in ("_registry", "_name"):
+            raise AttributeError(attr)
+        return getattr(self._registry.get_kb(self._name), attr)
+
+    def __copy__(self) -> "LazyKnowledge":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyKnowledge":
+        # O proxy é só um handle para a KB compartilhada; copiar o registry (e seus locks) não faz sentido
+        return self
+
+    def __repr__(self) -> str:
+        return f"LazyKnowledge(name={self._name!r})"
+
 # --- Instância Singleton (como no seu registry.py) ---
 # Outros módulos importarão esta instância para acessar as KBs.
 KNOWLEDGE_REGISTRY = KnowledgeRegistry()
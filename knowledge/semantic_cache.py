@@ -0,0 +1,336 @@
+# agent-api/knowledge/semantic_cache.py
+
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from inspect import isasyncgen, isgenerator
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+# numpy e agno.run são importados no primeiro uso: este módulo é carregado pelas
+# rotas da API e não pode pesar no import de api.main
+if TYPE_CHECKING:
+    import numpy as np
+
+# Extrai o `problem` do gathered_info que o coordenador repassa na task do N1
+_PROBLEM_PATTERN = re.compile(r'"problem"\s*:\s*"((?:[^"\\]|\\.)*)"')
+# Tickets citados no internal_summary do N1 (ex: "Solução encontrada no ticket 12345")
+_TICKET_PATTERN = re.compile(r"(?:ticket|chamado)[^\d]{0,5}(\d{3,})", re.IGNORECASE)
+
+
+def extract_problem(task_description: str) -> str:
+    """
+    Retorna o `gathered_info.problem` contido na tarefa delegada ao N1 ou, se não
+    houver, a própria descrição da tarefa.
+    """
+    match = _PROBLEM_PATTERN.search(task_description or "")
+    if match:
+        try:
+            return json.loads(f'"{match.group(1)}"').strip()
+        except json.JSONDecodeError:
+            return match.group(1).strip()
+    return (task_description or "").strip()
+
+
+def parse_n1_answer(content: str) -> Optional[Dict[str, Any]]:
+    """Faz o parse do JSON do N1 (com ou sem bloco ```json). Retorna None se inválido."""
+    content = (content or "").strip()
+    if content.startswith("```"):
+        content = content.strip("`").strip()
+        if content.startswith("json"):
+            content = content[4:].strip()
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def cited_ticket_ids(answer: Dict[str, Any]) -> List[int]:
+    """Lista (sem repetição) os ticket_ids citados no internal_summary do N1."""
+    summary = str(answer.get("internal_summary", ""))
+    return sorted({int(ticket_id) for ticket_id in _TICKET_PATTERN.findall(summary)})
+
+
+class SemanticAnswerCache:
+    """
+    Cache semântico das respostas do N1. Uma nova pergunta reaproveita uma resposta
+    `answered` recente quando a similaridade de cosseno entre as embeddings dos
+    problemas atinge `similarity_threshold`, evitando a chamada ao LLM do N1.
+
+    Entradas expiram após `ttl_seconds`, o total é limitado a `max_entries` (sai a
+    usada há mais tempo) e uma entrada é invalidada quando o registro da base de
+    conhecimento citado na resposta muda de `updated_at` desde que foi armazenada.
+    """
+
+    def __init__(
+        self,
+        embedder_factory: Callable[[], Any],
+        version_loader: Optional[Callable[[List[int]], Dict[int, Any]]] = None,
+        similarity_threshold: float = 0.93,
+        ttl_seconds: int = 3600,
+        max_entries: int = 512,
+    ):
+        """
+        Args:
+            embedder_factory: Retorna o embedder usado nas perguntas (resolvido no primeiro uso).
+            version_loader: Recebe ticket_ids e retorna ticket_id -> updated_at do registro
+                de conhecimento. Sem ele, as entradas só expiram pelo TTL.
+        """
+        self._embedder_factory = embedder_factory
+        self._version_loader = version_loader
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._embedder = None
+        self._matrix: "Optional[np.ndarray]" = None  # Embeddings normalizadas, uma linha por entrada
+        self._entries: List[Dict[str, Any]] = []
+        # Embeddings calculadas no lookup() de um miss, reaproveitadas pelo store() seguinte
+        self._recent_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "errors": 0,
+        }
+
+    def _embed(self, text: str) -> "Optional[np.ndarray]":
+        import numpy as np
+
+        with self._lock:
+            cached = self._recent_embeddings.get(text)
+            if cached is not None:
+                return cached
+            if self._embedder is None:
+                self._embedder = self._embedder_factory()
+        embedding = np.asarray(self._embedder.get_embedding(text), dtype=np.float32)
+        if embedding.size == 0:
+            return None
+        norm = np.linalg.norm(embedding)
+        embedding = embedding / norm if norm > 0 else embedding
+        with self._lock:
+            self._recent_embeddings[text] = embedding
+            if len(self._recent_embeddings) > 64:
+                self._recent_embeddings.popitem(last=False)
+        return embedding
+
+    def _remove(self, indexes: List[int]) -> None:
+        if not indexes:
+            return
+        removed = set(indexes)
+        keep = [i for i in range(len(self._entries)) if i not in removed]
+        self._entries = [self._entries[i] for i in keep]
+        self._matrix = self._matrix[keep] if keep else None
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [i for i, entry in enumerate(self._entries) if now - entry["created_at"] > self.ttl_seconds]
+        self._stats["expirations"] += len(expired)
+        self._remove(expired)
+
+    def _is_current(self, entry: Dict[str, Any]) -> bool:
+        if self._version_loader is None or not entry["ticket_ids"]:
+            return True
+        current_versions = self._version_loader(entry["ticket_ids"])
+        return all(current_versions.get(ticket_id) == version for ticket_id, version in entry["versions"].items())
+
+    def lookup(self, problem: str) -> Optional[str]:
+        """
+        Procura uma resposta armazenada para um problema semanticamente equivalente.
+
+        Returns:
+            Optional[str]: O JSON da resposta do N1 em cache, ou None (miss).
+        """
+        if not problem:
+            return None
+        import numpy as np
+
+        try:
+            embedding = self._embed(problem)
+            with self._lock:
+                self._purge_expired(time.time())
+                if embedding is None or self._matrix is None:
+                    self._stats["misses"] += 1
+                    return None
+                similarities = self._matrix @ embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] < self.similarity_threshold:
+                    self._stats["misses"] += 1
+                    return None
+                entry = self._entries[best]
+
+            # Consulta ao Postgres fora do lock
+            if not self._is_current(entry):
+                with self._lock:
+                    if best < len(self._entries) and self._entries[best] is entry:
+                        self._remove([best])
+                    self._stats["invalidations"] += 1
+                    self._stats["misses"] += 1
+                print(f"SemanticAnswerCache: entrada invalidada (tickets {entry['ticket_ids']} atualizados)")
+                return None
+
+            with self._lock:
+                entry["last_used"] = time.time()
+                entry["hits"] += 1
+                self._stats["hits"] += 1
+            print(f"SemanticAnswerCache: HIT (similaridade {float(similarities[best]):.3f})")
+            return entry["answer"]
+        except Exception as e:
+            # O cache nunca pode derrubar o atendimento: falhas viram miss
+            print(f"SemanticAnswerCache: ERRO no lookup, seguindo sem cache: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["misses"] += 1
+            return None
+
+    def store(self, problem: str, content: str) -> bool:
+        """
+        Armazena a resposta do N1 se ela for um JSON com `status == "answered"`.
+
+        Returns:
+            bool: True se a resposta foi armazenada.
+        """
+        answer = parse_n1_answer(content)
+        if not problem or answer is None or answer.get("status") != "answered":
+            return False
+        import numpy as np
+
+        try:
+            embedding = self._embed(problem)
+            if embedding is None:
+                return False
+            ticket_ids = cited_ticket_ids(answer)
+            versions = self._version_loader(ticket_ids) if self._version_loader and ticket_ids else {}
+            now = time.time()
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._purge_expired(now)
+                if len(self._entries) >= self.max_entries:
+                    lru = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                    self._remove([lru])
+                    self._stats["evictions"] += 1
+                self._entries.append({
+                    "problem": problem,
+                    "answer": json.dumps(answer, ensure_ascii=False),
+                    "ticket_ids": ticket_ids,
+                    "versions": {ticket_id: versions.get(ticket_id) for ticket_id in ticket_ids},
+                    "created_at": now,
+                    "last_used": now,
+                    "hits": 0,
+                })
+                row = embedding[np.newaxis, :]
+                self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+                self._stats["stores"] += 1
+            return True
+        except Exception as e:
+            print(f"SemanticAnswerCache: ERRO ao armazenar resposta: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return False
+
+    def clear(self) -> None:
+        """Remove todas as entradas (as métricas são mantidas)."""
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Retorna os contadores do cache, o tamanho atual e a taxa de acerto."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def _output_text(item: Any) -> str:
+    # Eventos de conteúdo do membro (stream) ou a string final (sem stream)
+    from agno.run.agent import RunContentEvent
+
+    if isinstance(item, str):
+        return item
+    if isinstance(item, RunContentEvent) and isinstance(item.content, str):
+        return item.content
+    return ""
+
+
+def create_delegation_cache_hook(cache: SemanticAnswerCache, member_id: str) -> Callable:
+    """
+    Cria um tool_hook para o Team que intercepta `delegate_task_to_member` quando o
+    destino é `member_id`. Em um hit, devolve a resposta em cache sem executar o
+    membro; em um miss, repassa a saída do membro e armazena a resposta final.
+
+    O hook é assíncrono (o Team é executado via `arun` pela API); no `run` síncrono
+    o Agno ignora hooks assíncronos e o cache fica inativo.
+    """
+
+    async def delegation_cache_hook(function_name: str, function_call: Callable, arguments: Dict[str, Any]):
+        if function_name != "delegate_task_to_member" or arguments.get("member_id") != member_id:
+            return await function_call(**arguments)
+
+        problem = extract_problem(arguments.get("task_description", ""))
+        cached_answer = await asyncio.to_thread(cache.lookup, problem)
+        if cached_answer is not None:
+            return cached_answer
+
+        result = await function_call(**arguments)
+
+        if isasyncgen(result):
+            async def capture_async():
+                chunks: List[str] = []
+                async for item in result:
+                    chunks.append(_output_text(item))
+                    yield item
+                await asyncio.to_thread(cache.store, problem, "".join(chunks))
+
+            return capture_async()
+
+        if isgenerator(result):
+            def capture_sync():
+                chunks: List[str] = []
+                for item in result:
+                    chunks.append(_output_text(item))
+                    yield item
+                cache.store(problem, "".join(chunks))
+
+            return capture_sync()
+
+        if isinstance(result, str):
+            await asyncio.to_thread(cache.store, problem, result)
+        return result
+
+    return delegation_cache_hook
+
+
+def _default_embedder():
+    # Mesmo embedder da sisateg_kb: a similaridade é medida no mesmo espaço da busca do N1
+    from knowledge.registry import KNOWLEDGE_REGISTRY
+
+    return KNOWLEDGE_REGISTRY.get_kb("sisateg_kb").vector_db.embedder
+
+
+_knowledge_repo = None
+
+
+def _load_knowledge_versions(ticket_ids: List[int]) -> Dict[int, Any]:
+    global _knowledge_repo
+    if _knowledge_repo is None:
+        from repositories.knowledge_repository import KnowledgeRepository
+
+        _knowledge_repo = KnowledgeRepository()
+    return _knowledge_repo.get_knowledge_versions(ticket_ids)
+
+
+# --- Instância Singleton ---
+# Nada é criado aqui: embedder e repositório são resolvidos na primeira consulta.
+N1_ANSWER_CACHE = SemanticAnswerCache(
+    embedder_factory=_default_embedder,
+    version_loader=_load_knowledge_versions,
+)
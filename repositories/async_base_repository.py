@@ -0,0 +1,79 @@
+# agent-api/repositories/async_base_repository.py
+
+import time
+
+from sqlalchemy import text, exc
+from typing import List, Dict, Any, Optional
+
+from db.engines import ENGINE_REGISTRY
+from .query_metrics import QUERY_METRICS
+from .routing import REPLICA_ROUTER
+
+class AsyncBaseRepository:
+    """
+    Versão assíncrona do BaseRepository para o caminho da API (ferramentas dos
+    agentes executadas dentro do `arun`). Usa o engine assíncrono do SQLAlchemy
+    sobre o psycopg3, de modo que uma consulta lenta não bloqueia o event loop
+    dos demais chats. Os builders e scripts em lote continuam no BaseRepository.
+    """
+    database = "directus"
+    replica_database = "directus_replica"
+
+    def __init__(self):
+        # O engine vem do ENGINE_REGISTRY na primeira query (nada é criado no import)
+        self._engine = None
+        self._replica_engine = None
+        self._released = False
+
+    @property
+    def engine(self):
+        # Sem lock: o repositório assíncrono só é usado de dentro do event loop
+        if self._engine is None:
+            self._engine = ENGINE_REGISTRY.acquire(self.database, is_async=True)
+        return self._engine
+
+    def _engine_for_query(self):
+        # Mesmas regras do BaseRepository (métodos @read_only vão para a réplica)
+        if not REPLICA_ROUTER.wants_replica(self) or not ENGINE_REGISTRY.is_configured(self.replica_database):
+            return self.engine
+        if self._replica_engine is None:
+            self._replica_engine = ENGINE_REGISTRY.acquire(self.replica_database, is_async=True)
+        return self._replica_engine
+
+    async def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Executa uma query SQL e retorna os resultados como uma lista de dicionários.
+        """
+        engine = self._engine_for_query()
+        try:
+            return await self._execute_on(engine, query, params)
+        except exc.OperationalError as e:
+            if engine is self.engine:
+                raise
+            REPLICA_ROUTER.mark_replica_down(e)
+            return await self._execute_on(self.engine, query, params)
+
+    async def _execute_on(self, engine, query: str, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        start_time = time.perf_counter()
+        try:
+            async with engine.begin() as connection:
+                result = await connection.execute(text(query), params or {})
+                rows = [dict(row._mapping) for row in result] if result.returns_rows else []
+        except exc.SQLAlchemyError as e:
+            QUERY_METRICS.record(query, (time.perf_counter() - start_time) * 1000, params=params, error=True)
+            print(f"DATABASE ERROR executing async query: {e}")
+            raise
+        QUERY_METRICS.record(query, (time.perf_counter() - start_time) * 1000, rows=len(rows), params=params)
+        return rows
+
+    async def close(self):
+        """
+        Devolve a referência deste repositório ao engine assíncrono compartilhado.
+        """
+        if not self._released:
+            self._released = True
+            if self._engine is not None:
+                await ENGINE_REGISTRY.release_async(self.database)
+            if self._replica_engine is not None:
+                await ENGINE_REGISTRY.release_async(self.replica_database)
+                self._replica_engine = None
@@ -1,72 +1,314 @@
 # agent-api/repositories/base_repository.py
 
-import os
+import json
+import re
+import threading
+import time
 from pathlib import Path
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, exc
-from typing import List, Dict, Any, Optional
+from sqlalchemy import text, exc
+from sqlalchemy.engine import Row
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+
+from db.engines import ENGINE_REGISTRY
+from .query_metrics import QUERY_METRICS
+from .routing import REPLICA_ROUTER
 
 # Carrega o arquivo .env do diretório pai
 env_path = Path(__file__).parent.parent.parent / '.env'
 load_dotenv(env_path)
 
+# Linhas buscadas do cursor do servidor a cada ida ao banco no stream()
+STREAM_CHUNK_SIZE = 1000
+
+# Linhas por statement no bulk_insert (o lote inteiro vai como um único parâmetro jsonb)
+BULK_CHUNK_SIZE = 5000
+
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+def _check_identifier(name: str) -> str:
+    # Tabelas e colunas entram no SQL por interpolação: só aceitamos identificadores simples
+    if not _IDENTIFIER_PATTERN.match(name):
+        raise ValueError(f"Identificador SQL inválido: {name!r}")
+    return name
+
+
 class BaseRepository:
     """
     Classe base para todos os repositórios. Gerencia a conexão com o banco de dados
     e fornece um método de execução genérico.
 
-    Esta versão constrói a string de conexão dinamicamente para garantir que
-    se conecte ao banco de dados do Directus (directus_db), e não ao do Agno (agno_db).
+    O engine vem do ENGINE_REGISTRY (banco "directus", POSTGRES_*), com pool
+    configurável e compartilhado por todos os repositórios do processo. Métodos
+    marcados com `@read_only` (repositories.routing) leem da réplica quando
+    POSTGRES_REPLICA_HOST está configurado, com fallback para o primário.
     """
-    _engine = None
+    database = "directus"
+    replica_database = "directus_replica"
 
     def __init__(self):
-        if BaseRepository._engine is None:
-            # --- LÓGICA DE CONEXÃO CORRIGIDA ---
-            # Busca as credenciais e o nome do banco do Directus do ambiente
-            db_user = os.getenv("POSTGRES_USER")
-            db_password = os.getenv("POSTGRES_PASSWORD")
-            db_name = os.getenv("POSTGRES_DB")  # A variável que aponta para 'directus_db'
-
-            # O nome do host é o nome do serviço Docker, e a porta é a interna do contêiner
-            db_host = "localhost"
-            db_port = "5432"
-
-            # Validação para garantir que todas as variáveis necessárias estão presentes
-            if not all([db_user, db_password, db_name]):
-                raise ConnectionError(
-                    "As variáveis de ambiente para o banco de dados (POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_DB) não estão configuradas."
-                )
-
-            # Constrói a URL de conexão do SQLAlchemy para o banco de dados correto
-            sqlalchemy_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-
-            print(f"BaseRepository: Initializing connection to -> postgresql://{db_user}:****@{db_host}:{db_port}/{db_name}")
+        # O engine só é obtido na primeira query: repositórios criados em nível de
+        # módulo (rotas, toolkits) não leem o ambiente nem criam pools no import
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self._replica_engine = None
+        self._released = False
 
-            BaseRepository._engine = create_engine(sqlalchemy_url)
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._engine = ENGINE_REGISTRY.acquire(self.database)
+        return self._engine
 
-        self.engine = BaseRepository._engine
+    def _engine_for_query(self):
+        # Réplica só para leituras marcadas, fora de use_primary() e longe de uma escrita recente
+        if not REPLICA_ROUTER.wants_replica(self) or not ENGINE_REGISTRY.is_configured(self.replica_database):
+            return self.engine
+        if self._replica_engine is None:
+            with self._engine_lock:
+                if self._replica_engine is None:
+                    self._replica_engine = ENGINE_REGISTRY.acquire(self.replica_database)
+        return self._replica_engine
 
     def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Executa uma query SQL e retorna os resultados como uma lista de dicionários.
         """
+        engine = self._engine_for_query()
         try:
-            with self.engine.connect() as connection:
+            return self._execute_on(engine, query, params)
+        except exc.OperationalError as e:
+            if engine is self.engine:
+                raise
+            REPLICA_ROUTER.mark_replica_down(e)
+            return self._execute_on(self.engine, query, params)
+
+    def _execute_on(self, engine, query: str, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        start_time = time.perf_counter()
+        try:
+            with engine.connect() as connection:
                 with connection.begin() as transaction:
                     result = connection.execute(text(query), params or {})
-                    if result.returns_rows:
-                        return [dict(row._mapping) for row in result]
-                    return []
+                    rows = [dict(row._mapping) for row in result] if result.returns_rows else []
         except exc.SQLAlchemyError as e:
+            QUERY_METRICS.record(query, (time.perf_counter() - start_time) * 1000, params=params, error=True)
             print(f"DATABASE ERROR executing query: {e}")
             raise
+        QUERY_METRICS.record(query, (time.perf_counter() - start_time) * 1000, rows=len(rows), params=params)
+        return rows
+
+    def stream_chunks(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        as_tuples: bool = False,
+    ) -> Iterator[List[Union[Dict[str, Any], Row]]]:
+        """
+        Executa uma query de leitura com cursor do lado do servidor e entrega os
+        resultados em blocos de até `chunk_size` linhas, sem materializar o
+        resultado inteiro na memória.
+
+        Args:
+            query (str): Query SQL de leitura.
+            params (Dict, optional): Parâmetros da query.
+            chunk_size (int): Linhas por bloco (e por ida ao cursor do servidor).
+            as_tuples (bool): Entrega os `Row` do SQLAlchemy (tuplas nomeadas, com acesso
+                por `row.coluna` ou posição) em vez de convertê-los para dicionários.
+
+        A conexão e a transação ficam abertas até o gerador ser consumido até o fim
+        ou fechado: consuma o resultado logo, sem intercalar processamento demorado.
+        """
+        engine = self._engine_for_query()
+        yielded = False
+        try:
+            for chunk in self._stream_chunks_on(engine, query, params, chunk_size, as_tuples):
+                yielded = True
+                yield chunk
+        except exc.OperationalError as e:
+            # Só dá para trocar de banco se nada foi entregue ainda
+            if engine is self.engine or yielded:
+                raise
+            REPLICA_ROUTER.mark_replica_down(e)
+            yield from self._stream_chunks_on(self.engine, query, params, chunk_size, as_tuples)
+
+    def _stream_chunks_on(
+        self, engine, query: str, params: Optional[Dict[str, Any]], chunk_size: int, as_tuples: bool
+    ) -> Iterator[List[Union[Dict[str, Any], Row]]]:
+        # O tempo registrado nas métricas é só o de banco (sem o do consumidor entre os blocos)
+        db_ms = 0.0
+        row_count = 0
+        try:
+            with engine.connect() as connection:
+                connection = connection.execution_options(stream_results=True, max_row_buffer=chunk_size)
+                with connection.begin():
+                    start_time = time.perf_counter()
+                    result = connection.execute(text(query), params or {})
+                    for partition in result.partitions(chunk_size):
+                        db_ms += (time.perf_counter() - start_time) * 1000
+                        row_count += len(partition)
+                        if as_tuples:
+                            yield partition
+                        else:
+                            yield [dict(row._mapping) for row in partition]
+                        start_time = time.perf_counter()
+                    db_ms += (time.perf_counter() - start_time) * 1000
+        except exc.SQLAlchemyError as e:
+            QUERY_METRICS.record(query, db_ms, rows=row_count, params=params, error=True)
+            print(f"DATABASE ERROR streaming query: {e}")
+            raise
+        QUERY_METRICS.record(query, db_ms, rows=row_count, params=params)
+
+    def stream(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        as_tuples: bool = False,
+    ) -> Iterator[Union[Dict[str, Any], Row]]:
+        """
+        Mesma leitura do `stream_chunks`, entregando uma linha por vez.
+        """
+        for chunk in self.stream_chunks(query, params, chunk_size=chunk_size, as_tuples=as_tuples):
+            yield from chunk
+
+    def bulk_insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        columns: List[str],
+        conflict_columns: Optional[List[str]] = None,
+        update_columns: Optional[List[str]] = None,
+        column_expressions: Optional[Dict[str, str]] = None,
+        returning: Optional[str] = None,
+        extra_statements: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+    ) -> List[Any]:
+        """
+        Insere (ou faz upsert de) muitas linhas com um único INSERT ... SELECT por
+        bloco de BULK_CHUNK_SIZE linhas, em vez do executemany linha a linha.
+
+        As linhas vão como um único parâmetro jsonb, expandido no banco por
+        `jsonb_populate_recordset(NULL::<table>, ...) WITH ORDINALITY`: o Postgres
+        converte cada campo para o tipo da coluna de destino (inclusive arrays como
+        `tags` e colunas jsonb) e a ordinalidade preserva a ordem de entrada.
+
+        Args:
+            table (str): Tabela de destino (ex: "public.ybs_knowledge_base").
+            rows (List[Dict]): Linhas a gravar.
+            columns (List[str]): Colunas do INSERT.
+            conflict_columns (List[str], optional): Chave do ON CONFLICT. Linhas repetidas
+                na mesma chave são gravadas uma única vez (vale a última).
+            update_columns (List[str], optional): Colunas atualizadas no conflito
+                (EXCLUDED.<coluna> ou a expressão de `column_expressions`). Sem elas, DO NOTHING.
+            column_expressions (Dict[str, str], optional): Expressões SQL que substituem o
+                valor da linha (ex: {"updated_at": "CURRENT_TIMESTAMP"}).
+            returning (str, optional): Coluna retornada (ex: "id"). Exige `conflict_columns`.
+            extra_statements (List[Tuple[str, Dict]], optional): (query, params) executadas
+                depois dos INSERTs na mesma transação (ex: contadores derivados das linhas).
+
+        Returns:
+            List[Any]: Os valores de `returning` na mesma ordem de `rows` (ou [] sem returning).
+        """
+        if not rows:
+            return []
+        if returning and not conflict_columns:
+            raise ValueError("bulk_insert com returning exige conflict_columns para mapear a ordem de entrada.")
+
+        column_expressions = column_expressions or {}
+        table = _check_identifier(table)
+        for name in list(columns) + list(conflict_columns or []) + list(update_columns or []) + [returning or "id"]:
+            _check_identifier(name)
+
+        query = self._build_bulk_insert_query(
+            table, columns, conflict_columns, update_columns, column_expressions, returning
+        )
+
+        rows_to_write, keys = self._deduplicate_rows(rows, conflict_columns)
+
+        returned: Dict[Tuple[str, ...], Any] = {}
+        try:
+            with self.engine.connect() as connection:
+                with connection.begin():
+                    for start in range(0, len(rows_to_write), BULK_CHUNK_SIZE):
+                        chunk = rows_to_write[start:start + BULK_CHUNK_SIZE]
+                        payload = json.dumps(
+                            [{column: row.get(column) for column in columns} for row in chunk],
+                            default=str,
+                        )
+                        start_time = time.perf_counter()
+                        result = connection.execute(text(query), {"rows": payload})
+                        QUERY_METRICS.record(query, (time.perf_counter() - start_time) * 1000, rows=len(chunk))
+                        if returning:
+                            for record in result:
+                                mapping = record._mapping
+                                key = tuple(str(mapping[column]) for column in conflict_columns)
+                                returned[key] = mapping[returning]
+                    for extra_query, extra_params in extra_statements or []:
+                        start_time = time.perf_counter()
+                        connection.execute(text(extra_query), extra_params)
+                        QUERY_METRICS.record(extra_query, (time.perf_counter() - start_time) * 1000, params=extra_params)
+        except exc.SQLAlchemyError as e:
+            print(f"DATABASE ERROR executing bulk insert into {table}: {e}")
+            raise
+
+        if not returning:
+            return []
+        # Com DO NOTHING, chaves já existentes não retornam linha: ficam como None
+        return [returned.get(key) for key in keys]
+
+    @staticmethod
+    def _deduplicate_rows(
+        rows: List[Dict[str, Any]], conflict_columns: Optional[List[str]]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[str, ...]]]:
+        # O ON CONFLICT DO UPDATE não aceita a mesma chave duas vezes no mesmo statement
+        if not conflict_columns:
+            return rows, []
+        keys = [tuple(str(row.get(column)) for column in conflict_columns) for row in rows]
+        last_by_key: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        for key, row in zip(keys, rows):
+            last_by_key.pop(key, None)
+            last_by_key[key] = row
+        return list(last_by_key.values()), keys
+
+    @staticmethod
+    def _build_bulk_insert_query(
+        table: str,
+        columns: List[str],
+        conflict_columns: Optional[List[str]],
+        update_columns: Optional[List[str]],
+        column_expressions: Dict[str, str],
+        returning: Optional[str],
+    ) -> str:
+        select_list = ", ".join(column_expressions.get(column, f"input.{column}") for column in columns)
+        query = f"""
+            INSERT INTO {table} ({", ".join(columns)})
+            SELECT {select_list}
+            FROM jsonb_populate_recordset(NULL::{table}, CAST(:rows AS jsonb)) WITH ORDINALITY AS input
+            ORDER BY input.ordinality
+        """
+        if conflict_columns:
+            if update_columns:
+                assignments = ", ".join(
+                    f"{column} = {column_expressions.get(column, f'EXCLUDED.{column}')}" for column in update_columns
+                )
+                query += f"\n            ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {assignments}"
+            else:
+                query += f"\n            ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING"
+        if returning:
+            query += f"\n            RETURNING {', '.join(dict.fromkeys([returning] + list(conflict_columns)))}"
+        return query
 
     def close(self):
         """
-        Fecha a conexão com o banco de dados e limpa os recursos.
+        Devolve a referência deste repositório ao engine compartilhado. O pool só é
+        descartado quando o último repositório que o usa for fechado.
         """
-        if BaseRepository._engine:
-            BaseRepository._engine.dispose()
-            BaseRepository._engine = None
-            print("Connection closed and resources disposed.")
+        if not self._released:
+            self._released = True
+            if self._engine is not None:
+                ENGINE_REGISTRY.release(self.database)
+            if self._replica_engine is not None:
+                ENGINE_REGISTRY.release(self.replica_database)
+                self._replica_engine = None
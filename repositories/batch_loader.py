@@ -0,0 +1,100 @@
+# agent-api/repositories/batch_loader.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+# Janela em que as buscas pontuais são acumuladas antes de virar uma única query
+BATCH_LOADER_WINDOW_S = 0.005
+BATCH_LOADER_MAX_BATCH_SIZE = 100
+
+
+class BatchLoader:
+    """
+    Agrupa buscas pontuais (estilo DataLoader) feitas pelas ferramentas dos agentes.
+
+    As chaves pedidas com `load` dentro de BATCH_LOADER_WINDOW_S viram uma única
+    chamada a `batch_fn(keys)` (ex: `WHERE id = ANY(:ids)`), e pedidos simultâneos
+    da mesma chave compartilham a mesma busca em andamento (single-flight). Nada é
+    guardado depois que a busca termina: isso fica a cargo dos caches dos repositórios.
+
+    Args:
+        batch_fn: Coroutine que recebe a lista de chaves e devolve chave -> valor
+            (chaves ausentes resultam em None).
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        window_s: float = BATCH_LOADER_WINDOW_S,
+        max_batch_size: int = BATCH_LOADER_MAX_BATCH_SIZE,
+    ):
+        self.batch_fn = batch_fn
+        self.window_s = window_s
+        self.max_batch_size = max_batch_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._pending: List[Hashable] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"loads": 0, "coalesced": 0, "batches": 0}
+
+    async def load(self, key: Hashable) -> Any:
+        """Busca uma chave, agrupada com as demais pedidas na mesma janela."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures pertencem a um event loop: recomeça ao trocar de loop (ex: testes, scripts)
+            self._loop = loop
+            self._in_flight = {}
+            self._pending = []
+            self._timer = None
+
+        self.stats["loads"] += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+        else:
+            future = loop.create_future()
+            self._in_flight[key] = future
+            self._pending.append(key)
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window_s, self._dispatch)
+
+        # shield: o cancelamento de um dos chamadores não cancela a busca dos outros
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        keys, self._pending = self._pending, []
+        if keys:
+            self.stats["batches"] += 1
+            self._loop.create_task(self._run_batch(keys))
+
+    async def _run_batch(self, keys: List[Hashable]) -> None:
+        try:
+            try:
+                results = await self.batch_fn(keys)
+            except Exception as e:
+                for key in keys:
+                    future = self._in_flight.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                return
+
+            for key in keys:
+                future = self._in_flight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(results.get(key))
+        finally:
+            # Busca cancelada (shutdown, task do loop cancelada) ou falha fora do
+            # `except`: cancela os futures restantes para nenhum chamador ficar
+            # esperando para sempre; o CancelledError segue propagando
+            for key in keys:
+                future = self._in_flight.pop(key, None)
+                if future is not None and not future.done():
+                    future.cancel()
@@ -1,8 +1,44 @@
 # agent-api/repositories/chamados_repository.py
 
 from .base_repository import BaseRepository
+from .async_base_repository import AsyncBaseRepository
+from .batch_loader import BatchLoader
+from .routing import read_only, use_primary, writes
+from .dossier_cache import (
+    CREATE_DOSSIER_CACHE_TABLE,
+    DOSSIER_CACHE,
+    SELECT_CACHED_DOSSIERS_QUERY,
+    TICKET_VERSIONS_QUERY,
+    UPSERT_CACHED_DOSSIERS_QUERY,
+    build_upsert_params,
+)
 from typing import List, Dict, Any, Optional
 
+# Compartilhada pelas versões síncrona e assíncrona do repositório
+GENERATE_DOSSIERS_QUERY = "SELECT cod_chamado, dossie_markdown_completo as dossie FROM fn_gera_dossie_chamado(ARRAY[:ticket_ids])"
+
+TICKET_DETAILS_SELECT = """
+    SELECT
+        cod_chamado,
+        dsc_titulo,
+        dsc_mensagem,
+        dat_inclusao,
+        cod_situacao_chamado
+        -- Adicione outros campos se forem úteis
+    FROM public.sisateg_chamados
+"""
+
+def format_dossiers(ticket_ids: List[int], dossiers: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    Devolve os dossiês no formato usado pelas ferramentas e builders, na ordem
+    dos chamados pedidos (chamados sem dossiê ficam de fora).
+    """
+    return [
+        {"ticket_id": ticket_id, "dossier_text": dossiers[ticket_id]}
+        for ticket_id in dict.fromkeys(ticket_ids)
+        if ticket_id in dossiers
+    ]
+
 class ChamadosRepository(BaseRepository):
     """
     Repositório para gerenciar todas as operações relacionadas à tabela sisateg_chamados.
@@ -10,6 +46,7 @@ class ChamadosRepository(BaseRepository):
     def get_unprocessed_tickets(self, limit: int = 100) -> List[int]:
         """
         Busca os códigos de chamados encerrados que ainda não foram processados.
+        Fica no primário: lê logo após o mark_tickets_as_processed do lote anterior.
         """
         query = """
             SELECT cod_chamado FROM sisateg_chamados
@@ -20,14 +57,52 @@ class ChamadosRepository(BaseRepository):
         results = self.execute(query, {"limit": limit})
         return [row['cod_chamado'] for row in results]
 
-    def generate_dossiers_for_tickets(self, ticket_ids: List[int]) -> List[Dict[str, Any]]:
+    @read_only
+    def generate_dossiers_for_tickets(self, ticket_ids: List[int], use_cache: bool = True) -> List[Dict[str, Any]]:
         """
         Gera os dossiês para uma lista de chamados usando a função do banco.
+
+        Com `use_cache` (e o cache habilitado por DOSSIER_CACHE_MODIFIED_COLUMN),
+        consulta antes o DOSSIER_CACHE (memória e, se habilitada, a tabela
+        materializada) e só chama `fn_gera_dossie_chamado` para os chamados sem
+        dossiê ou alterados desde a última geração.
         """
-        query = "SELECT cod_chamado, dossie_markdown_completo as dossie FROM fn_gera_dossie_chamado(ARRAY[:ticket_ids])"
-        results = self.execute(query, {"ticket_ids": ticket_ids})
-        return [{"ticket_id": row['cod_chamado'], "dossier_text": row['dossie']} for row in results]
+        if not ticket_ids:
+            return []
+        if not use_cache or not DOSSIER_CACHE.enabled():
+            return format_dossiers(ticket_ids, self._generate_dossiers(ticket_ids))
+
+        results = self.execute(TICKET_VERSIONS_QUERY, {"ticket_ids": list(ticket_ids)})
+        versions = {row['cod_chamado']: row['modified_at'] for row in results}
+        dossiers, missing = DOSSIER_CACHE.lookup(ticket_ids, versions)
+
+        if missing and DOSSIER_CACHE.table_enabled():
+            if not DOSSIER_CACHE.table_ready():
+                with use_primary():
+                    self.execute(CREATE_DOSSIER_CACHE_TABLE)
+                DOSSIER_CACHE.mark_table_ready()
+            rows = self.execute(SELECT_CACHED_DOSSIERS_QUERY, {"ticket_ids": missing})
+            dossiers.update(DOSSIER_CACHE.accept_table_rows(rows, versions))
+            missing = [ticket_id for ticket_id in missing if ticket_id not in dossiers]
 
+        if missing:
+            DOSSIER_CACHE.record_misses(len(missing))
+            generated = self._generate_dossiers(missing)
+            DOSSIER_CACHE.store(generated, versions)
+            if generated and DOSSIER_CACHE.table_enabled():
+                # Escrita dentro de um método de leitura: vai explicitamente para o primário
+                with use_primary():
+                    self.execute(UPSERT_CACHED_DOSSIERS_QUERY, build_upsert_params(generated, versions))
+            dossiers.update(generated)
+
+        return format_dossiers(ticket_ids, dossiers)
+
+    def _generate_dossiers(self, ticket_ids: List[int]) -> Dict[int, str]:
+        # Os dossiês são textos grandes: lidos do cursor do servidor sem a cópia em dicionários
+        results = self.stream(GENERATE_DOSSIERS_QUERY, {"ticket_ids": ticket_ids}, as_tuples=True)
+        return {row.cod_chamado: row.dossie for row in results}
+
+    @writes
     def mark_tickets_as_processed(self, ticket_ids: List[int]) -> None:
         """
         Marca uma lista de chamados como processados na base de dados.
@@ -41,22 +116,89 @@ class ChamadosRepository(BaseRepository):
         """
         self.execute(query, {"ticket_ids": ticket_ids})
 
+    @read_only
     def get_ticket_details_by_id(self, ticket_id: int) -> Optional[Dict[str, Any]]:
         """
         Busca detalhes básicos de um chamado específico pelo seu cod_chamado.
         """
-        query = """
-            SELECT
-                cod_chamado,
-                dsc_titulo,
-                dsc_mensagem,
-                dat_inclusao,
-                cod_situacao_chamado
-                -- Adicione outros campos se forem úteis
-            FROM public.sisateg_chamados
-            WHERE cod_chamado = :ticket_id
-            LIMIT 1;
-        """
+        query = TICKET_DETAILS_SELECT + " WHERE cod_chamado = :ticket_id LIMIT 1;"
         params = {"ticket_id": ticket_id}
         results = self.execute(query, params)
         return results[0] if results else None
+
+
+class AsyncChamadosRepository(AsyncBaseRepository):
+    """
+    Versão assíncrona do ChamadosRepository, usada pelas ferramentas dos agentes
+    quando executadas dentro do event loop da API.
+    """
+    def __init__(self):
+        super().__init__()
+        # Buscas pontuais simultâneas (triagem, N2...) viram uma única query por janela
+        self._dossier_loader = BatchLoader(self._load_dossiers)
+        self._details_loader = BatchLoader(self._find_ticket_details)
+
+    @read_only
+    async def get_ticket_details_by_id(self, ticket_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Busca detalhes básicos de um chamado específico pelo seu cod_chamado.
+        """
+        return await self._details_loader.load(int(ticket_id))
+
+    @read_only
+    async def _find_ticket_details(self, ticket_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        query = TICKET_DETAILS_SELECT + " WHERE cod_chamado = ANY(:ticket_ids);"
+        results = await self.execute(query, {"ticket_ids": ticket_ids})
+        return {row['cod_chamado']: row for row in results}
+
+    @read_only
+    async def generate_dossiers_for_tickets(self, ticket_ids: List[int], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Gera os dossiês para uma lista de chamados usando a função do banco,
+        passando pelo mesmo DOSSIER_CACHE da versão síncrona. Pedidos simultâneos
+        são agrupados pelo BatchLoader (um mesmo chamado é gerado uma única vez).
+        """
+        if not ticket_ids:
+            return []
+        if not use_cache:
+            return format_dossiers(ticket_ids, await self._generate_dossiers(ticket_ids))
+
+        ticket_ids = [int(ticket_id) for ticket_id in ticket_ids]
+        dossiers = await self._dossier_loader.load_many(ticket_ids)
+        return format_dossiers(
+            ticket_ids,
+            {ticket_id: dossier for ticket_id, dossier in zip(ticket_ids, dossiers) if dossier is not None},
+        )
+
+    @read_only
+    async def _load_dossiers(self, ticket_ids: List[int]) -> Dict[int, str]:
+        if not DOSSIER_CACHE.enabled():
+            # Sem coluna de versão: só o agrupamento do BatchLoader, sem cache
+            return await self._generate_dossiers(ticket_ids)
+        results = await self.execute(TICKET_VERSIONS_QUERY, {"ticket_ids": list(ticket_ids)})
+        versions = {row['cod_chamado']: row['modified_at'] for row in results}
+        dossiers, missing = DOSSIER_CACHE.lookup(ticket_ids, versions)
+
+        if missing and DOSSIER_CACHE.table_enabled():
+            if not DOSSIER_CACHE.table_ready():
+                with use_primary():
+                    await self.execute(CREATE_DOSSIER_CACHE_TABLE)
+                DOSSIER_CACHE.mark_table_ready()
+            rows = await self.execute(SELECT_CACHED_DOSSIERS_QUERY, {"ticket_ids": missing})
+            dossiers.update(DOSSIER_CACHE.accept_table_rows(rows, versions))
+            missing = [ticket_id for ticket_id in missing if ticket_id not in dossiers]
+
+        if missing:
+            DOSSIER_CACHE.record_misses(len(missing))
+            generated = await self._generate_dossiers(missing)
+            DOSSIER_CACHE.store(generated, versions)
+            if generated and DOSSIER_CACHE.table_enabled():
+                with use_primary():
+                    await self.execute(UPSERT_CACHED_DOSSIERS_QUERY, build_upsert_params(generated, versions))
+            dossiers.update(generated)
+
+        return dossiers
+
+    async def _generate_dossiers(self, ticket_ids: List[int]) -> Dict[int, str]:
+        results = await self.execute(GENERATE_DOSSIERS_QUERY, {"ticket_ids": ticket_ids})
+        return {row['cod_chamado']: row['dossie'] for row in results}
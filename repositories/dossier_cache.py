@@ -0,0 +1,189 @@
+# agent-api/repositories/dossier_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Coluna de sisateg_chamados que muda a cada alteração do chamado (e portanto do dossiê).
+# Não há padrão: o schema não tem uma coluna de alteração garantida, então o cache só é
+# ligado quando ela é configurada; sem ela os dossiês são sempre gerados (sem versão).
+TICKET_LAST_MODIFIED_COLUMN = os.getenv("DOSSIER_CACHE_MODIFIED_COLUMN", "").strip()
+DOSSIER_CACHE_ENABLED = bool(TICKET_LAST_MODIFIED_COLUMN)
+# Tabela opcional no Postgres com os dossiês já gerados (compartilhada entre API e builders)
+DOSSIER_CACHE_TABLE = "public.ybs_ticket_dossier_cache"
+DOSSIER_CACHE_TABLE_ENABLED = os.getenv("DOSSIER_CACHE_TABLE_ENABLED", "false").lower() in ("1", "true", "yes")
+DOSSIER_CACHE_MAX_ENTRIES = int(os.getenv("DOSSIER_CACHE_MAX_ENTRIES", "512"))
+
+TICKET_VERSIONS_QUERY = f"""
+    SELECT cod_chamado, {TICKET_LAST_MODIFIED_COLUMN} AS modified_at
+    FROM public.sisateg_chamados
+    WHERE cod_chamado = ANY(:ticket_ids);
+"""
+
+CREATE_DOSSIER_CACHE_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {DOSSIER_CACHE_TABLE} (
+        cod_chamado integer PRIMARY KEY,
+        dossier_text text NOT NULL,
+        ticket_modified_at timestamptz,
+        generated_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# A comparação de versão é feita no próprio banco: só voltam dossiês gerados
+# a partir da versão atual do chamado
+SELECT_CACHED_DOSSIERS_QUERY = f"""
+    SELECT d.cod_chamado, d.dossier_text
+    FROM {DOSSIER_CACHE_TABLE} d
+    JOIN public.sisateg_chamados c ON c.cod_chamado = d.cod_chamado
+    WHERE d.cod_chamado = ANY(:ticket_ids)
+      AND d.ticket_modified_at IS NOT DISTINCT FROM c.{TICKET_LAST_MODIFIED_COLUMN};
+"""
+
+# Grava a versão lida antes da geração (e não a atual), para que uma alteração
+# concorrente invalide o dossiê em vez de ser mascarada por ele
+UPSERT_CACHED_DOSSIERS_QUERY = f"""
+    INSERT INTO {DOSSIER_CACHE_TABLE} (cod_chamado, dossier_text, ticket_modified_at, generated_at)
+    SELECT input.cod_chamado, input.dossier_text, input.ticket_modified_at, CURRENT_TIMESTAMP
+    FROM unnest(
+        CAST(:ticket_ids AS integer[]),
+        CAST(:dossier_texts AS text[]),
+        CAST(:modified_ats AS timestamptz[])
+    ) AS input(cod_chamado, dossier_text, ticket_modified_at)
+    ON CONFLICT (cod_chamado) DO UPDATE SET
+        dossier_text = EXCLUDED.dossier_text,
+        ticket_modified_at = EXCLUDED.ticket_modified_at,
+        generated_at = EXCLUDED.generated_at;
+"""
+
+
+def build_upsert_params(dossiers: Dict[int, str], versions: Dict[int, Any]) -> Dict[str, Any]:
+    """Monta os arrays paralelos usados pelo UPSERT_CACHED_DOSSIERS_QUERY."""
+    ticket_ids = list(dossiers)
+    return {
+        "ticket_ids": ticket_ids,
+        "dossier_texts": [dossiers[ticket_id] for ticket_id in ticket_ids],
+        "modified_ats": [versions.get(ticket_id) for ticket_id in ticket_ids],
+    }
+
+
+class DossierCache:
+    """
+    Cache em memória (LRU) dos dossiês gerados por `fn_gera_dossie_chamado`,
+    chaveado por cod_chamado. Cada entrada guarda o timestamp de última alteração
+    do chamado no momento da geração; se o chamado mudou desde então, a entrada é
+    descartada e o dossiê é gerado de novo.
+
+    Compartilhado pelo ChamadosRepository e pelo AsyncChamadosRepository, que fazem
+    as consultas (versões, tabela materializada e geração) e usam este objeto só
+    para decidir o que já está pronto.
+    """
+
+    def __init__(self, max_entries: int = DOSSIER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # cod_chamado -> (modified_at, dossier_text)
+        self._entries: "OrderedDict[int, Tuple[Any, str]]" = OrderedDict()
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "table_hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0,
+        }
+        self._table_ready = False
+
+    def lookup(self, ticket_ids: List[int], versions: Dict[int, Any]) -> Tuple[Dict[int, str], List[int]]:
+        """
+        Separa os chamados entre os que estão no cache com a versão atual e os que faltam.
+
+        Returns:
+            Tuple[Dict[int, str], List[int]]: (cod_chamado -> dossiê, chamados faltantes)
+        """
+        found: Dict[int, str] = {}
+        missing: List[int] = []
+        with self._lock:
+            for ticket_id in ticket_ids:
+                entry = self._entries.get(ticket_id)
+                version = versions.get(ticket_id)
+                # Sem versão (chamado inexistente ou coluna NULL) não há como validar: é miss
+                if entry is not None and version is not None and entry[0] == version:
+                    self._entries.move_to_end(ticket_id)
+                    found[ticket_id] = entry[1]
+                    self._stats["hits"] += 1
+                    continue
+                if entry is not None:
+                    # O chamado foi alterado desde a geração do dossiê
+                    del self._entries[ticket_id]
+                    self._stats["stale"] += 1
+                missing.append(ticket_id)
+        return found, missing
+
+    def accept_table_rows(self, rows: List[Dict[str, Any]], versions: Dict[int, Any]) -> Dict[int, str]:
+        """
+        Registra os dossiês encontrados na tabela materializada (já filtrados pela
+        versão atual no SQL), guardando-os também na memória.
+        """
+        found = {row["cod_chamado"]: row["dossier_text"] for row in rows}
+        with self._lock:
+            self._stats["table_hits"] += len(found)
+        self.store(found, versions)
+        return found
+
+    def store(self, dossiers: Dict[int, str], versions: Dict[int, Any]) -> None:
+        """
+        Guarda os dossiês gerados, com a versão do chamado usada na geração. Chamados
+        sem versão não são guardados: a entrada nunca poderia ser invalidada.
+        """
+        with self._lock:
+            for ticket_id, dossier_text in dossiers.items():
+                version = versions.get(ticket_id)
+                if version is None:
+                    continue
+                self._entries[ticket_id] = (version, dossier_text)
+                self._entries.move_to_end(ticket_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def record_misses(self, count: int) -> None:
+        with self._lock:
+            self._stats["misses"] += count
+
+    def enabled(self) -> bool:
+        # As queries de versão (TICKET_VERSIONS_QUERY...) só são válidas com a coluna configurada
+        return DOSSIER_CACHE_ENABLED
+
+    def table_enabled(self) -> bool:
+        return DOSSIER_CACHE_ENABLED and DOSSIER_CACHE_TABLE_ENABLED
+
+    def table_ready(self) -> bool:
+        return self._table_ready
+
+    def mark_table_ready(self) -> None:
+        self._table_ready = True
+
+    def invalidate(self, ticket_ids: Optional[List[int]] = None) -> None:
+        """Remove da memória os chamados informados (ou todos)."""
+        with self._lock:
+            if ticket_ids is None:
+                self._entries.clear()
+                return
+            for ticket_id in ticket_ids:
+                self._entries.pop(ticket_id, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Retorna os contadores do cache, o tamanho atual e a taxa de acerto."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["table_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["table_hits"]) / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled()
+        stats["table_enabled"] = self.table_enabled()
+        return stats
+
+
+# --- Instância Singleton ---
+# Compartilhada por todos os ChamadosRepository do processo.
+DOSSIER_CACHE = DossierCache()
@@ -1,13 +1,58 @@
 # agent-api/repositories/knowledge_repository.py
 
 from .base_repository import BaseRepository
+from .async_base_repository import AsyncBaseRepository
+from .batch_loader import BatchLoader
+from .routing import read_only, writes
 from typing import List, Dict, Any, Optional
 from uuid import UUID
+
+# Queries compartilhadas pelas versões síncrona e assíncrona do repositório
+FIND_BY_ID_QUERY = """
+    SELECT * FROM public.ybs_knowledge_base
+    WHERE id = :record_id
+    LIMIT 1;
+"""
+
+FIND_BY_IDS_QUERY = """
+    SELECT * FROM public.ybs_knowledge_base
+    WHERE id = ANY(:record_ids);
+"""
+
+SEARCH_BY_KEYWORD_QUERY = """
+    SELECT
+        id,
+        ticket_id,
+        title,
+        problem_summary,
+        solution_applied,
+        solution_type,
+        ts_rank_cd(
+            to_tsvector('portuguese', title || ' ' || problem_summary || ' ' || solution_applied),
+            to_tsquery('portuguese', :terms)
+        ) AS rank
+    FROM
+        public.ybs_knowledge_base
+    WHERE
+        to_tsvector('portuguese', title || ' ' || problem_summary || ' ' || solution_applied) @@ to_tsquery('portuguese', :terms)
+    ORDER BY
+        rank DESC
+    LIMIT :limit;
+"""
+
+def format_search_terms(search_terms: str) -> str:
+    """
+    Converte "relatorio sincronizacao" para "relatorio & sincronizacao",
+    que é o formato que to_tsquery espera para "E" (AND).
+    """
+    return " & ".join(search_terms.split())
+
 class KnowledgeRepository(BaseRepository):
     """
     Repository for managing all operations related to the ybs_knowledge_base table.
     """
 
+    @read_only
     def get_all_knowledge_ids(self) -> List[UUID]:
         """
         Retorna todos os IDs da knowledge base ordenados por ticket_id.
@@ -17,54 +62,39 @@ class KnowledgeRepository(BaseRepository):
             FROM public.ybs_knowledge_base
             ORDER BY ticket_id;
         """
-        results = self.execute(query)
-        return [row['id'] for row in results]
+        # Lido do cursor do servidor direto para a lista, sem a cópia em dicionários
+        return [row.id for row in self.stream(query, as_tuples=True)]
 
-    def close(self):
-        """
-        Fecha a conexão com o banco de dados.
-        """
-        if hasattr(self, '_session'):
-            self._session.close()
+    @writes
     def save_batch(self, knowledge_batch: List[Dict[str, Any]]) -> List[str]:
         """
         Inserts or updates a batch of knowledge records into the database.
         Uses ON CONFLICT to handle records that might already exist.
-        Returns the list of UUIDs for the inserted/updated records.
+        Returns the list of UUIDs for the inserted/updated records, in input order.
         """
         if not knowledge_batch:
             return []
 
-        # The query uses the new English column names.
-        query = """
-            INSERT INTO public.ybs_knowledge_base (
-                ticket_id, tfs_work_item_id, title, problem_summary, root_cause_analysis,
-                solution_applied, solution_type, sql_template, tags, ticket_level,
-                llm_model, processing_version, created_at, updated_at
-            )
-            VALUES (
-                :ticket_id, :tfs_work_item_id, :title, :problem_summary, :root_cause_analysis,
-                :solution_applied, :solution_type, :sql_template, :tags, :ticket_level,
-                :llm_model, :processing_version, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
-            )
-            ON CONFLICT (ticket_id) DO UPDATE SET
-                title = EXCLUDED.title,
-                problem_summary = EXCLUDED.problem_summary,
-                root_cause_analysis = EXCLUDED.root_cause_analysis,
-                solution_applied = EXCLUDED.solution_applied,
-                solution_type = EXCLUDED.solution_type,
-                tags = EXCLUDED.tags,
-                llm_model = EXCLUDED.llm_model,
-                processing_version = EXCLUDED.processing_version,
-                updated_at = CURRENT_TIMESTAMP
-            RETURNING id;
-        """
-
-        # The base 'execute' method handles passing the list of dictionaries
-        # which SQLAlchemy interprets as a batch insert (executemany).
-        results = self.execute(query, knowledge_batch)
-        return [row['id'] for row in results]
+        # Single set-based upsert per chunk (see BaseRepository.bulk_insert). Unlike the
+        # previous executemany, RETURNING comes back mapped to the input order.
+        return self.bulk_insert(
+            "public.ybs_knowledge_base",
+            knowledge_batch,
+            columns=[
+                "ticket_id", "tfs_work_item_id", "title", "problem_summary", "root_cause_analysis",
+                "solution_applied", "solution_type", "sql_template", "tags", "ticket_level",
+                "llm_model", "processing_version", "created_at", "updated_at",
+            ],
+            conflict_columns=["ticket_id"],
+            update_columns=[
+                "title", "problem_summary", "root_cause_analysis", "solution_applied", "solution_type",
+                "tags", "llm_model", "processing_version", "updated_at",
+            ],
+            column_expressions={"created_at": "CURRENT_TIMESTAMP", "updated_at": "CURRENT_TIMESTAMP"},
+            returning="id",
+        )
 
+    @read_only
     def get_formatted_knowledge_for_vectorization(self, knowledge_ids: List[UUID]) -> List[Dict[str, Any]]:
         """
         Busca o texto formatado para vetorização para uma lista de IDs de conhecimento
@@ -75,72 +105,123 @@ class KnowledgeRepository(BaseRepository):
 
         # Converte UUIDs para strings se a biblioteca de DB preferir,
         # mas passar como lista de UUIDs para :knowledge_ids deve funcionar com psycopg3/sqlalchemy
+        # O JOIN traz os campos gravados como colunas tipadas no LanceDB (filtros de busca)
         query = """
             SELECT
-                knowledge_id,
-                ticket_id,
-                knowledge_text
+                f.knowledge_id,
+                f.ticket_id,
+                f.knowledge_text,
+                kb.solution_type,
+                kb.ticket_level,
+                kb.tags,
+                kb.updated_at
             FROM
-                public.fn_gera_texto_conhecimento_para_vetorizacao(ARRAY[:knowledge_ids])
+                public.fn_gera_texto_conhecimento_para_vetorizacao(ARRAY[:knowledge_ids]) f
+            LEFT JOIN public.ybs_knowledge_base kb ON kb.id = f.knowledge_id
         """
 
         # Passa a lista de UUIDs como parâmetro
-        results = self.execute(query, {"knowledge_ids": knowledge_ids})
+        results = self.stream(query, {"knowledge_ids": knowledge_ids}, as_tuples=True)
 
         # Retorna uma lista de dicionários prontos para o processo de embedding
         return [
             {
-                "knowledge_id": row['knowledge_id'], # UUID
-                "ticket_id": row['ticket_id'],     # int
-                "text_to_embed": row['knowledge_text'] # str
+                "knowledge_id": row.knowledge_id, # UUID
+                "ticket_id": row.ticket_id,     # int
+                "text_to_embed": row.knowledge_text, # str
+                "solution_type": row.solution_type, # str
+                "ticket_level": row.ticket_level, # int | None
+                "tags": row.tags, # List[str]
+                "updated_at": row.updated_at # datetime
             }
             for row in results
         ]
 
+    @read_only
+    def get_knowledge_versions(self, ticket_ids: List[int]) -> Dict[int, Any]:
+        """
+        Retorna ticket_id -> updated_at dos registros de conhecimento informados.
+        Usado pelo cache semântico do N1 para invalidar respostas cujo registro citado mudou.
+        """
+        if not ticket_ids:
+            return {}
+
+        query = """
+            SELECT ticket_id, updated_at
+            FROM public.ybs_knowledge_base
+            WHERE ticket_id = ANY(:ticket_ids);
+        """
+        results = self.execute(query, {"ticket_ids": list(ticket_ids)})
+        return {row['ticket_id']: row['updated_at'] for row in results}
+
+    @read_only
+    def find_by_ticket_ids(self, ticket_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Busca os registros de conhecimento de vários tickets em uma única query.
+        Retorna ticket_id -> registro (tickets sem registro ficam de fora).
+        """
+        if not ticket_ids:
+            return {}
+
+        query = """
+            SELECT
+                id, ticket_id, title, problem_summary, root_cause_analysis,
+                solution_applied, solution_type, sql_template, tags, ticket_level, updated_at
+            FROM public.ybs_knowledge_base
+            WHERE ticket_id = ANY(:ticket_ids);
+        """
+        results = self.execute(query, {"ticket_ids": list(ticket_ids)})
+        return {row['ticket_id']: row for row in results}
+
     # --- NOVO MÉTODO (para Ferramenta N3) ---
+    @read_only
     def find_by_id(self, record_id: UUID) -> Optional[Dict[str, Any]]:
         """
         Busca um único registro de conhecimento pelo seu ID (UUID).
         """
-        query = """
-            SELECT * FROM public.ybs_knowledge_base
-            WHERE id = :record_id
-            LIMIT 1;
-        """
         params = {"record_id": record_id}
-        results = self.execute(query, params)
+        results = self.execute(FIND_BY_ID_QUERY, params)
         return results[0] if results else None
 
     # --- NOVO MÉTODO (para Ferramenta N2) ---
+    @read_only
     def search_by_keyword(self, search_terms: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Busca na base de conhecimento usando Full-Text Search do Postgres.
         'search_terms' deve ser uma string com palavras-chave, ex: "relatorio sincronizacao"
         """
-        # Converte "relatorio sincronizacao" para "relatorio & sincronizacao"
-        # que é o formato que to_tsquery espera para "E" (AND)
-        formatted_terms = " & ".join(search_terms.split())
-
-        query = """
-            SELECT
-                id,
-                ticket_id,
-                title,
-                problem_summary,
-                solution_applied,
-                solution_type,
-                ts_rank_cd(
-                    to_tsvector('portuguese', title || ' ' || problem_summary || ' ' || solution_applied),
-                    to_tsquery('portuguese', :terms)
-                ) AS rank
-            FROM
-                public.ybs_knowledge_base
-            WHERE
-                to_tsvector('portuguese', title || ' ' || problem_summary || ' ' || solution_applied) @@ to_tsquery('portuguese', :terms)
-            ORDER BY
-                rank DESC
-            LIMIT :limit;
-        """
-        params = {"terms": formatted_terms, "limit": limit}
-        results = self.execute(query, params)
+        params = {"terms": format_search_terms(search_terms), "limit": limit}
+        results = self.execute(SEARCH_BY_KEYWORD_QUERY, params)
         return results
+
+
+class AsyncKnowledgeRepository(AsyncBaseRepository):
+    """
+    Versão assíncrona do KnowledgeRepository, usada pelas ferramentas dos agentes
+    quando executadas dentro do event loop da API.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Buscas por ID simultâneas (vários agentes do time) viram uma única query
+        self._id_loader = BatchLoader(self._find_by_ids)
+
+    @read_only
+    async def find_by_id(self, record_id: UUID) -> Optional[Dict[str, Any]]:
+        """
+        Busca um único registro de conhecimento pelo seu ID (UUID).
+        """
+        return await self._id_loader.load(UUID(str(record_id)))
+
+    @read_only
+    async def _find_by_ids(self, record_ids: List[UUID]) -> Dict[UUID, Dict[str, Any]]:
+        results = await self.execute(FIND_BY_IDS_QUERY, {"record_ids": record_ids})
+        return {UUID(str(row['id'])): row for row in results}
+
+    @read_only
+    async def search_by_keyword(self, search_terms: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Busca na base de conhecimento usando Full-Text Search do Postgres.
+        """
+        params = {"terms": format_search_terms(search_terms), "limit": limit}
+        return await self.execute(SEARCH_BY_KEYWORD_QUERY, params)
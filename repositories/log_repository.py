@@ -1,16 +1,93 @@
 # agent-api/repositories/log_repository.py
 
 from .base_repository import BaseRepository
+from .routing import read_only, writes
+from db.log_partitions import ENSURE_LOG_PARTITIONS_SQL
 from typing import List, Dict, Any, Optional
 import json
+import time
+from datetime import timedelta
 
 JOB_TYPE_VECTORIZATION = 'vectorization'
 JOB_TYPE_KNOWLEDGE = 'knowledge'
 
+REQUIRED_LOG_FIELDS = {'ticket_id', 'status', 'duration_ms'}
+
+# The log is range-partitioned on created_at (db/log_partitions.py): bounding created_at
+# by the job's time window lets Postgres prune every partition outside it
+JOB_WINDOW_QUERY = """
+    SELECT start_time, COALESCE(end_time, CURRENT_TIMESTAMP) AS end_time
+    FROM public.ybs_knowledge_batch_jobs
+    WHERE id = :job_id;
+"""
+
+# How often a process that did not find the job progress table looks for it again
+JOB_PROGRESS_RECHECK_S = 60
+
+# Counters maintained by log_batch_details (migration 0003): job progress without scanning the log
+UPSERT_JOB_PROGRESS_QUERY = """
+    INSERT INTO public.ybs_knowledge_job_progress AS progress
+        (job_id, status, tickets, total_duration_ms, last_logged_at)
+    SELECT CAST(:job_id AS uuid), input.status, input.tickets, input.total_duration_ms, CURRENT_TIMESTAMP
+    FROM unnest(
+        CAST(:statuses AS text[]),
+        CAST(:tickets AS integer[]),
+        CAST(:durations AS bigint[])
+    ) AS input(status, tickets, total_duration_ms)
+    ON CONFLICT (job_id, status) DO UPDATE SET
+        tickets = progress.tickets + EXCLUDED.tickets,
+        total_duration_ms = progress.total_duration_ms + EXCLUDED.total_duration_ms,
+        last_logged_at = EXCLUDED.last_logged_at;
+"""
+
+JOB_PROGRESS_QUERY = """
+    SELECT job_id, status, tickets, total_duration_ms, last_logged_at
+    FROM public.ybs_knowledge_job_progress
+    WHERE job_id = ANY(CAST(:job_ids AS uuid[]));
+"""
+
+JOB_COLUMNS = """
+    id, job_type, status, tickets_found, tickets_succeeded, tickets_failed, parameters,
+    error_summary, start_time, end_time,
+    EXTRACT(EPOCH FROM (COALESCE(end_time, CURRENT_TIMESTAMP) - start_time)) AS elapsed_seconds
+"""
+
+JOB_LOG_SUMMARY_QUERY = """
+    SELECT
+        status,
+        COUNT(*) AS tickets,
+        AVG(duration_ms) AS avg_duration_ms,
+        MAX(duration_ms) AS max_duration_ms
+    FROM public.ybs_knowledge_processing_log
+    WHERE job_id = :job_id
+      AND created_at >= :window_start
+      AND created_at <= :window_end
+    GROUP BY status
+    ORDER BY status;
+"""
+
+def validate_log_entries(job_id: str, log_entries: List[Dict[str, Any]]) -> None:
+    """
+    Validates the job_id and the structure of processing log entries.
+    Raises ValueError on the first invalid entry.
+    """
+    if not job_id:
+        raise ValueError("job_id must be provided")
+
+    for entry in log_entries:
+        missing_fields = REQUIRED_LOG_FIELDS - set(entry.keys())
+        if missing_fields:
+            raise ValueError(f"Log entry missing required fields: {missing_fields}")
+
 class LogRepository(BaseRepository):
     """
     Repository for managing knowledge processing jobs and detailed logs.
     """
+    # Whether ybs_knowledge_job_progress exists, and when that was last checked
+    _job_progress_table: Optional[bool] = None
+    _job_progress_checked_at: float = 0.0
+
+    @writes
     def create_job(self, tickets_found: int, batch_size: int, job_type: str = JOB_TYPE_KNOWLEDGE) -> str:
         """
         Creates a new entry in the ybs_knowledge_batch_jobs table.
@@ -38,11 +115,84 @@ class LogRepository(BaseRepository):
             "parameters": json.dumps({"batch_size": batch_size}),
             "job_type": job_type
         }
+        try:
+            # Keeps the current and upcoming monthly log partitions in place (no-op if not partitioned)
+            self.execute(ENSURE_LOG_PARTITIONS_SQL)
+        except Exception as e:
+            print(f"WARNING: could not ensure processing log partitions (rows fall into the default partition): {e}")
+
         result = self.execute(query, params)
         job_id = result[0]['id']
         print(f"Created batch job with ID: {job_id}")
         return job_id
 
+    @read_only
+    def list_jobs(self, limit: int = 20, job_type: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the most recent jobs, optionally filtered by job_type and status.
+        """
+        query = f"""
+            SELECT {JOB_COLUMNS}
+            FROM public.ybs_knowledge_batch_jobs
+            WHERE (CAST(:job_type AS text) IS NULL OR job_type = :job_type)
+              AND (CAST(:status AS text) IS NULL OR status = :status)
+            ORDER BY start_time DESC
+            LIMIT :limit;
+        """
+        return self.execute(query, {"job_type": job_type, "status": status, "limit": limit})
+
+    @read_only
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a single job by its UUID.
+        """
+        query = f"SELECT {JOB_COLUMNS} FROM public.ybs_knowledge_batch_jobs WHERE id = CAST(:job_id AS uuid);"
+        results = self.execute(query, {"job_id": job_id})
+        return results[0] if results else None
+
+    @read_only
+    def get_jobs_progress(self, job_ids: List[Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Returns job_id -> status -> {tickets, total_duration_ms, last_logged_at} for the given jobs.
+        Reads the incrementally maintained counters; falls back to the (partition-pruned)
+        log summary when the counters table does not exist yet.
+        """
+        if not job_ids:
+            return {}
+
+        progress: Dict[str, Dict[str, Dict[str, Any]]] = {str(job_id): {} for job_id in job_ids}
+        if self._job_progress_available():
+            for row in self.execute(JOB_PROGRESS_QUERY, {"job_ids": [str(job_id) for job_id in job_ids]}):
+                progress[str(row['job_id'])][row['status']] = {
+                    "tickets": row['tickets'],
+                    "total_duration_ms": row['total_duration_ms'],
+                    "last_logged_at": row['last_logged_at'],
+                }
+            return progress
+
+        for job_id in job_ids:
+            for row in self.get_job_log_summary(str(job_id)):
+                progress[str(job_id)][row['status']] = {
+                    "tickets": row['tickets'],
+                    "total_duration_ms": (row['avg_duration_ms'] or 0) * row['tickets'],
+                    "last_logged_at": None,
+                }
+        return progress
+
+    def _job_progress_available(self) -> bool:
+        # The table only exists after migration 0003. Once found it is cached for good;
+        # a missing table is re-checked every JOB_PROGRESS_RECHECK_S, so a running
+        # process picks up the migration without a restart
+        if LogRepository._job_progress_table:
+            return True
+        now = time.monotonic()
+        if LogRepository._job_progress_table is None or now - LogRepository._job_progress_checked_at >= JOB_PROGRESS_RECHECK_S:
+            result = self.execute("SELECT to_regclass('public.ybs_knowledge_job_progress') IS NOT NULL AS available")
+            LogRepository._job_progress_table = bool(result[0]['available'])
+            LogRepository._job_progress_checked_at = now
+        return LogRepository._job_progress_table
+
+    @writes
     def update_job_summary(self, job_id: str, status: str, succeeded: int, failed: int, error_summary: Optional[str] = None):
         """
         Updates a job with its final status and statistics upon completion.
@@ -82,38 +232,72 @@ class LogRepository(BaseRepository):
         self.execute(query, params)
         print(f"Updated batch job {job_id} with status: {status}")
 
-    def log_batch_details(self, job_id: str, log_entries: List[Dict[str, Any]]):
+    @writes
+    def log_batch_details(self, job_id: str, log_entries: List[Dict[str, Any]], verbose: bool = True):
         """
         Performs a bulk insert of detailed processing logs for a batch of tickets.
 
         Args:
             job_id (str): UUID of the job
             log_entries (List[Dict]): List of log entries to insert
+            verbose (bool): Print a line per call (the BufferedLogWriter reports a summary instead)
         """
         if not log_entries:
             return
 
-        # Validação básica
-        if not job_id:
-            raise ValueError("job_id must be provided")
+        validate_log_entries(job_id, log_entries)
 
-        # Validação de estrutura dos log entries
-        required_fields = {'ticket_id', 'status', 'duration_ms'}
+        # Add the job_id to each log entry before executing the batch insert
         for entry in log_entries:
-            missing_fields = required_fields - set(entry.keys())
-            if missing_fields:
-                raise ValueError(f"Log entry missing required fields: {missing_fields}")
+            entry['job_id'] = job_id
 
-        query = """
-            INSERT INTO public.ybs_knowledge_processing_log
-                (job_id, ticket_id, knowledge_base_id, status, duration_ms, error_message)
-            VALUES
-                (:job_id, :ticket_id, :knowledge_base_id, :status, :duration_ms, :error_message);
-        """
+        # One multi-row INSERT per chunk instead of a per-row executemany. The progress
+        # counters are bumped in the same transaction: a retried batch (BufferedLogWriter)
+        # must neither duplicate log rows nor count them twice or not at all
+        extra_statements = []
+        if self._job_progress_available():
+            extra_statements.append((UPSERT_JOB_PROGRESS_QUERY, self._job_progress_params(job_id, log_entries)))
+        self.bulk_insert(
+            "public.ybs_knowledge_processing_log",
+            log_entries,
+            columns=["job_id", "ticket_id", "knowledge_base_id", "status", "duration_ms", "error_message"],
+            extra_statements=extra_statements,
+        )
+        if verbose:
+            print(f"Logged details for {len(log_entries)} tickets under job {job_id}.")
 
-        # Add the job_id to each log entry before executing the batch insert
+    @staticmethod
+    def _job_progress_params(job_id: str, log_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        totals: Dict[str, List[int]] = {}
         for entry in log_entries:
-            entry['job_id'] = job_id
+            counters = totals.setdefault(entry['status'], [0, 0])
+            counters[0] += 1
+            counters[1] += int(entry.get('duration_ms') or 0)
+        statuses = list(totals)
+        return {
+            "job_id": str(job_id),
+            "statuses": statuses,
+            "tickets": [totals[status][0] for status in statuses],
+            "durations": [totals[status][1] for status in statuses],
+        }
+
+    @read_only
+    def get_job_log_summary(self, job_id: str) -> List[Dict[str, Any]]:
+        """
+        Returns per-status ticket counts and durations of a job's processing log.
+        Only the partitions covering the job's time window are scanned.
 
-        self.execute(query, log_entries)
-        print(f"Logged details for {len(log_entries)} tickets under job {job_id}.")
+        Args:
+            job_id (str): UUID of the job
+        """
+        window = self.execute(JOB_WINDOW_QUERY, {"job_id": job_id})
+        if not window:
+            return []
+
+        # Small margin: log rows are written by the BufferedLogWriter a bit after the job ends
+        params = {
+            "job_id": job_id,
+            "window_start": window[0]['start_time'] - timedelta(minutes=5),
+            "window_end": window[0]['end_time'] + timedelta(minutes=5),
+        }
+        return self.execute(JOB_LOG_SUMMARY_QUERY, params)
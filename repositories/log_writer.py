@@ -0,0 +1,129 @@
+# agent-api/repositories/log_writer.py
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .log_repository import LogRepository, validate_log_entries
+
+# Entries written per bulk insert, maximum age of a buffered entry and queue bound
+LOG_WRITER_BATCH_SIZE = 500
+LOG_WRITER_FLUSH_INTERVAL_S = 2.0
+LOG_WRITER_MAX_QUEUE_SIZE = 10000
+LOG_WRITER_WRITE_ATTEMPTS = 3
+
+_STOP = object()
+
+
+class BufferedLogWriter:
+    """
+    Background sink for ybs_knowledge_processing_log entries.
+
+    `submit` only enqueues the entries; a worker thread buffers them and writes them
+    with LogRepository.log_batch_details when LOG_WRITER_BATCH_SIZE entries are
+    pending or the oldest one is LOG_WRITER_FLUSH_INTERVAL_S old. The queue is
+    bounded, so a slow database blocks `submit` (backpressure) instead of growing
+    memory. `close` (also registered with atexit) drains everything before returning.
+    """
+
+    def __init__(
+        self,
+        log_repo: Optional[LogRepository] = None,
+        batch_size: int = LOG_WRITER_BATCH_SIZE,
+        flush_interval_s: float = LOG_WRITER_FLUSH_INTERVAL_S,
+        max_queue_size: int = LOG_WRITER_MAX_QUEUE_SIZE,
+    ):
+        self.log_repo = log_repo or LogRepository()
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._written = 0
+        self._failed = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        # Normal interpreter exit still flushes whatever is buffered
+        atexit.register(self.close)
+
+    def submit(self, job_id: str, log_entries: List[Dict[str, Any]]) -> None:
+        """
+        Enqueues log entries for a job. Validation happens here, in the caller,
+        so a malformed entry fails fast instead of inside the worker thread.
+        Blocks while the queue is full.
+        """
+        if self._closed:
+            raise RuntimeError("BufferedLogWriter is closed")
+        if not log_entries:
+            return
+        validate_log_entries(job_id, log_entries)
+        for entry in log_entries:
+            self._queue.put((job_id, entry))
+
+    def flush(self) -> None:
+        """Blocks until every entry submitted so far has been written (or given up on)."""
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flushes the buffer, stops the worker thread and prints a summary."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+        print(f"BufferedLogWriter: {self._written} log entries written, {self._failed} failed.")
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self._written, "failed": self._failed}
+
+    def __enter__(self) -> "BufferedLogWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        deadline = 0.0
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+                self._queue.task_done()
+            elif item is not None:
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval_s
+                pending.append(item)
+
+            if pending and (stopping or len(pending) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(pending)
+                for _ in pending:
+                    self._queue.task_done()
+                pending = []
+
+    def _write(self, pending: List[Tuple[str, Dict[str, Any]]]) -> None:
+        # One bulk insert per job, keeping the submission order
+        entries_by_job: Dict[str, List[Dict[str, Any]]] = {}
+        for job_id, entry in pending:
+            entries_by_job.setdefault(job_id, []).append(entry)
+
+        for job_id, entries in entries_by_job.items():
+            for attempt in range(1, LOG_WRITER_WRITE_ATTEMPTS + 1):
+                try:
+                    self.log_repo.log_batch_details(job_id, entries, verbose=False)
+                    self._written += len(entries)
+                    break
+                except Exception as e:
+                    if attempt == LOG_WRITER_WRITE_ATTEMPTS:
+                        self._failed += len(entries)
+                        print(f"BufferedLogWriter: dropping {len(entries)} log entries of job {job_id}: {e}")
+                    else:
+                        time.sleep(attempt)
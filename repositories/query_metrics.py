@@ -0,0 +1,206 @@
+# agent-api/repositories/query_metrics.py
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import text
+
+from core.metrics import BucketHistogram
+
+# Acima deste tempo a query entra no log de queries lentas
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+# Fração das queries lentas (só SELECT/WITH) que recebem um EXPLAIN (ANALYZE, BUFFERS); 0 desliga
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+# Intervalo mínimo entre dois EXPLAIN da mesma query (o ANALYZE executa a query de novo)
+SLOW_QUERY_EXPLAIN_INTERVAL_S = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_S", "600"))
+SLOW_QUERY_LOG_SIZE = 50
+
+# Limites superiores (ms) das faixas do histograma de latência
+LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+
+_COMMENT_PATTERN = re.compile(r"--[^\n]*")
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_PATTERN = re.compile(r"(?<![\w:])\d+(?:\.\d+)?\b")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_READ_ONLY_PATTERN = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r"\b(insert|update|delete|merge|truncate|create|drop|alter)\b", re.IGNORECASE)
+
+
+def fingerprint_query(query: str) -> str:
+    """
+    Normaliza a query para agrupar as execuções do mesmo statement: sem comentários,
+    com literais trocados por `?` e espaços colapsados. Os parâmetros (`:ticket_ids`)
+    já ficam fora do texto.
+    """
+    normalized = _COMMENT_PATTERN.sub(" ", query)
+    normalized = _STRING_PATTERN.sub("?", normalized)
+    normalized = _NUMBER_PATTERN.sub("?", normalized)
+    return _WHITESPACE_PATTERN.sub(" ", normalized).strip().rstrip(";").strip()
+
+
+def _fingerprint_id(fingerprint: str) -> str:
+    return hashlib.md5(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+
+class QueryMetrics:
+    """
+    Métricas das queries executadas pelos repositórios (síncronos e assíncronos):
+    histograma de latência, contagem de linhas e erros por fingerprint, log das
+    queries lentas e, opcionalmente, o plano (`EXPLAIN (ANALYZE, BUFFERS)`) de uma
+    amostra delas, capturado em segundo plano.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries: Dict[str, Dict[str, Any]] = {}
+        self._slow_log: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._last_explain: Dict[str, float] = {}
+        # Referência de longa duração ao engine do EXPLAIN: obtida na primeira captura e
+        # nunca liberada, para que cada EXPLAIN não crie e descarte um pool quando os
+        # repositórios ainda não tiverem pegado o "directus"
+        self._explain_engine = None
+
+    def record(
+        self,
+        query: str,
+        duration_ms: float,
+        rows: int = 0,
+        params: Optional[Dict[str, Any]] = None,
+        error: bool = False,
+    ) -> None:
+        """Registra uma execução; se for lenta, entra no log (e talvez no EXPLAIN)."""
+        fingerprint = fingerprint_query(query)
+        fingerprint_id = _fingerprint_id(fingerprint)
+
+        with self._lock:
+            stats = self._queries.get(fingerprint_id)
+            if stats is None:
+                stats = {
+                    "fingerprint": fingerprint,
+                    "calls": 0,
+                    "errors": 0,
+                    "rows": 0,
+                    "max_ms": 0.0,
+                    "latency": BucketHistogram(LATENCY_BUCKETS_MS),
+                }
+                self._queries[fingerprint_id] = stats
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["rows"] += rows
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["latency"].observe(duration_ms)
+
+        if duration_ms < SLOW_QUERY_MS:
+            return
+
+        entry = {
+            "fingerprint_id": fingerprint_id,
+            "fingerprint": fingerprint,
+            "duration_ms": round(duration_ms, 1),
+            "rows": rows,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "plan": None,
+        }
+        with self._lock:
+            self._slow_log.append(entry)
+        print(f"SLOW QUERY ({duration_ms:.0f} ms, {rows} rows) [{fingerprint_id}]: {fingerprint[:300]}")
+
+        if self._should_explain(fingerprint_id, query):
+            threading.Thread(
+                target=self._capture_plan, args=(entry, query, params), name="slow-query-explain", daemon=True
+            ).start()
+
+    def _should_explain(self, fingerprint_id: str, query: str) -> bool:
+        # EXPLAIN ANALYZE executa a query: só leituras, por amostragem e com intervalo mínimo
+        if SLOW_QUERY_EXPLAIN_SAMPLE_RATE <= 0 or random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            return False
+        if not _READ_ONLY_PATTERN.match(query) or _WRITE_PATTERN.search(query):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explain.get(fingerprint_id)
+            if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL_S:
+                return False
+            self._last_explain[fingerprint_id] = now
+        return True
+
+    def _get_explain_engine(self):
+        if self._explain_engine is None:
+            # Import tardio: db.engines -> repositories não pode virar um ciclo na carga do módulo
+            from db.engines import ENGINE_REGISTRY
+
+            with self._lock:
+                if self._explain_engine is None:
+                    self._explain_engine = ENGINE_REGISTRY.acquire("directus")
+        return self._explain_engine
+
+    def _capture_plan(self, entry: Dict[str, Any], query: str, params: Optional[Dict[str, Any]]) -> None:
+        try:
+            with self._get_explain_engine().connect() as connection:
+                with connection.begin() as transaction:
+                    result = connection.execute(
+                        text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.strip().rstrip(';')}"), params or {}
+                    )
+                    plan = result.scalar()
+                    # Nada do que o ANALYZE executou deve ficar gravado
+                    transaction.rollback()
+            entry["plan"] = json.loads(plan) if isinstance(plan, str) else plan
+            print(f"SLOW QUERY PLAN captured for [{entry['fingerprint_id']}]")
+        except Exception as e:
+            print(f"SLOW QUERY: falha ao capturar o EXPLAIN de [{entry['fingerprint_id']}]: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna as métricas por fingerprint (ordenadas pelo tempo total) e o log das
+        queries lentas, com os planos capturados.
+        """
+        with self._lock:
+            queries = {key: dict(stats, latency=stats["latency"].copy()) for key, stats in self._queries.items()}
+            slow_log = [dict(entry) for entry in self._slow_log]
+
+        summary: List[Dict[str, Any]] = []
+        for fingerprint_id, stats in queries.items():
+            calls = stats["calls"]
+            summary.append({
+                "fingerprint_id": fingerprint_id,
+                "fingerprint": stats["fingerprint"],
+                "calls": calls,
+                "errors": stats["errors"],
+                "rows": stats["rows"],
+                "total_ms": round(stats["latency"].sum, 1),
+                "mean_ms": round(stats["latency"].sum / calls, 2) if calls else 0.0,
+                "max_ms": round(stats["max_ms"], 1),
+                "p50_ms": stats["latency"].quantile(0.5),
+                "p95_ms": stats["latency"].quantile(0.95),
+                "histogram": stats["latency"].as_dict(),
+            })
+        summary.sort(key=lambda item: item["total_ms"], reverse=True)
+
+        return {
+            "slow_query_ms": SLOW_QUERY_MS,
+            "explain_sample_rate": SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            "queries": summary,
+            "slow_queries": slow_log,
+        }
+
+    def histograms(self) -> Dict[str, BucketHistogram]:
+        """Cópias dos histogramas de latência (ms) por fingerprint (para o /metrics)."""
+        with self._lock:
+            return {key: stats["latency"].copy() for key, stats in self._queries.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._slow_log.clear()
+            self._last_explain.clear()
+
+
+# --- Instância Singleton ---
+QUERY_METRICS = QueryMetrics()
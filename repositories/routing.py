@@ -0,0 +1,110 @@
+# agent-api/repositories/routing.py
+
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+# Leituras desta instância ficam no primário por este tempo após uma escrita dela
+# (read-your-writes dentro do mesmo job, apesar do atraso de replicação)
+REPLICA_STICKY_AFTER_WRITE_S = float(os.getenv("REPLICA_STICKY_AFTER_WRITE_S", "30"))
+# Depois de uma falha de conexão na réplica, as leituras voltam ao primário por este tempo
+REPLICA_RETRY_AFTER_S = float(os.getenv("REPLICA_RETRY_AFTER_S", "30"))
+
+_read_only: ContextVar[bool] = ContextVar("repository_read_only", default=False)
+_pin_primary: ContextVar[bool] = ContextVar("repository_pin_primary", default=False)
+
+
+def read_only(func: Callable) -> Callable:
+    """
+    Marca um método de repositório como somente leitura: as queries executadas
+    durante a chamada podem ir para a réplica (se configurada).
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+def writes(func: Callable) -> Callable:
+    """
+    Marca um método de repositório como escrita: as queries vão sempre para o
+    primário e as leituras seguintes da mesma instância também, por
+    REPLICA_STICKY_AFTER_WRITE_S.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            token = _read_only.set(False)
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                _read_only.reset(token)
+                self._last_write_at = time.monotonic()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        token = _read_only.set(False)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            _read_only.reset(token)
+            self._last_write_at = time.monotonic()
+    return wrapper
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """
+    Força todas as queries do bloco para o primário, inclusive as de métodos
+    `read_only`. Use quando uma leitura precisa ver uma escrita recém-feita por
+    outro repositório, ou para escritas pontuais dentro de um método de leitura.
+    """
+    token = _pin_primary.set(True)
+    try:
+        yield
+    finally:
+        _pin_primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Decide, por query, entre o engine primário e o da réplica de um repositório.
+    Compartilhado pelo BaseRepository e pelo AsyncBaseRepository.
+    """
+
+    def __init__(self):
+        self._replica_down_until = 0.0
+
+    def wants_replica(self, repository: Any) -> bool:
+        if not _read_only.get() or _pin_primary.get():
+            return False
+        if time.monotonic() - getattr(repository, "_last_write_at", float("-inf")) < REPLICA_STICKY_AFTER_WRITE_S:
+            return False
+        return time.monotonic() >= self._replica_down_until
+
+    def mark_replica_down(self, error: Exception) -> None:
+        self._replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER_S
+        print(f"ReplicaRouter: réplica indisponível, usando o primário por {REPLICA_RETRY_AFTER_S:.0f}s: {error}")
+
+
+# --- Instância Singleton ---
+REPLICA_ROUTER = ReplicaRouter()
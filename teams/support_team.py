@@ -1,13 +1,18 @@
 # agent-api/teams/support_team.py
+from typing import Optional
+
 from agno.team import Team
-from agno.models.google import Gemini
+from agno.utils.team import get_member_id
 
-# Importa as instâncias dos agentes que definimos
-from agents.support_triage_coordinator import triage_agent
-from agents.support_n1_agent import n1_agent
-from agents.support_n2_agent import n2_agent
-from agents.support_n3_agent import n3_agent
-from agents.support_user_response_agent import response_agent
+# Importa as fábricas dos agentes que definimos
+from agents.support_triage_coordinator import get_triage_agent
+from agents.support_n1_agent import get_n1_agent
+from agents.support_n2_agent import get_n2_agent
+from agents.support_n3_agent import get_n3_agent
+from agents.support_user_response_agent import get_response_agent
+from core.agent_factory import get_shared_model
+from core.metrics import create_member_metrics_hook
+from knowledge.semantic_cache import N1_ANSWER_CACHE, create_delegation_cache_hook
 
 # Instruções da Equipe (O "CÉREBRO" - Versão "Anti-Vazamento")
 team_instructions = """
@@ -47,17 +52,46 @@ Sua missão é ser um ORQUESTRADOR SILENCIOSO.
 10. **RETORNO FINAL:** A saída do `UserResponseAgent` (`{"user_message": "..."}`) é o que você DEVE retornar como sua resposta final.
 """
 
-# Cria a instância da Equipe
-support_team = Team(
-    name="support_team",
-    members=[
-        triage_agent,
-        n1_agent,
-        n2_agent,
-        n3_agent,
-        response_agent
-    ],
-    # O modelo do "Gerente" da Equipe
-    model=Gemini(id="gemini-2.0-flash"),
-    instructions=team_instructions
-)
+# Tempo de execução de cada membro (GET /metrics)
+_member_metrics_hook = create_member_metrics_hook("support_team")
+
+
+def get_support_team(
+    session_id: Optional[str] = None, user_id: Optional[str] = None, async_tools: bool = False
+) -> Team:
+    """
+    Cria a equipe de suporte de uma sessão, com membros próprios: o Team e os
+    Agents do Agno guardam estado da execução (sessão, flags de stream,
+    ferramentas preparadas), então requisições simultâneas não podem dividir
+    as mesmas instâncias. O modelo, as instruções e as KBs são compartilhados.
+
+    Com `async_tools` (execução via arun(), o caminho da API) os membros recebem
+    as ferramentas assíncronas e a equipe os hooks de cache e métricas, que também
+    são assíncronos; no team.run() síncrono o Agno ignoraria esses hooks.
+    """
+    n1_agent = get_n1_agent(session_id=session_id, user_id=user_id, async_tools=async_tools)
+    return Team(
+        name="support_team",
+        members=[
+            get_triage_agent(session_id=session_id, user_id=user_id, async_tools=async_tools),
+            n1_agent,
+            get_n2_agent(session_id=session_id, user_id=user_id, async_tools=async_tools),
+            get_n3_agent(session_id=session_id, user_id=user_id, async_tools=async_tools),
+            get_response_agent(session_id=session_id, user_id=user_id, async_tools=async_tools),
+        ],
+        # O modelo do "Gerente" da Equipe
+        model=get_shared_model(),
+        instructions=team_instructions,
+        # Cache semântico: problemas equivalentes a um já resolvido pelo N1 reaproveitam a resposta.
+        # O hook de métricas vem por último (mais interno): só mede as delegações que executam o membro.
+        tool_hooks=[
+            create_delegation_cache_hook(N1_ANSWER_CACHE, get_member_id(n1_agent)),
+            _member_metrics_hook,
+        ] if async_tools else None,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+# Instância padrão (workflows e scripts)
+support_team = get_support_team()
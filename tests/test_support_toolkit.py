@@ -0,0 +1,89 @@
+# agent-api/tests/test_support_toolkit.py
+"""
+As ferramentas do support_toolkit precisam funcionar no agent.run() síncrono
+(workflows e scripts), não só no arun() da API: o `FunctionCall.execute` do
+Agno não aguarda corrotinas.
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator, List
+
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+from agno.agent import Agent
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+
+import toolkits.support_toolkit as support_toolkit
+
+DOSSIER = {"ticket_id": 76557, "dossier": "Relatório de sincronização não gera."}
+
+
+@dataclass
+class ToolCallingModel(Model):
+    """Modelo falso: pede `get_ticket_details` uma vez e depois repete o resultado da ferramenta."""
+
+    id: str = "tool-calling"
+    name: str = "ToolCallingModel"
+    provider: str = "test"
+    tool_results: List[Any] = field(default_factory=list)
+
+    def _reply(self, messages: List[Any]) -> ModelResponse:
+        tool_messages = [message for message in messages if message.role == "tool"]
+        if tool_messages:
+            self.tool_results = [message.content for message in tool_messages]
+            return ModelResponse(role="assistant", content=str(tool_messages[-1].content))
+        return ModelResponse(
+            role="assistant",
+            tool_calls=[{
+                "id": "call-1",
+                "type": "function",
+                "function": {"name": "get_ticket_details", "arguments": json.dumps({"ticket_id": 76557})},
+            }],
+        )
+
+    def invoke(self, messages: List[Any], **kwargs) -> ModelResponse:
+        return self._reply(messages)
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> ModelResponse:
+        return self._reply(messages)
+
+    def invoke_stream(self, messages: List[Any], **kwargs) -> Iterator[ModelResponse]:
+        yield self.invoke(messages)
+
+    async def ainvoke_stream(self, messages: List[Any], **kwargs) -> AsyncIterator[ModelResponse]:
+        yield await self.ainvoke(messages)
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
+
+
+def test_get_ticket_details_runs_in_sync_agent_run(monkeypatch):
+    monkeypatch.setattr(support_toolkit.chamados_repo, "generate_dossiers_for_tickets", lambda ticket_ids: [DOSSIER])
+    model = ToolCallingModel()
+    agent = Agent(model=model, tools=[support_toolkit.get_ticket_details])
+
+    output = agent.run("Detalhes do chamado 76557")
+
+    assert model.tool_results == [json.dumps(DOSSIER)]
+    assert json.loads(output.content) == DOSSIER
+
+
+def test_get_ticket_details_async_runs_in_agent_arun(monkeypatch):
+    async def generate_dossiers_for_tickets(ticket_ids):
+        return [DOSSIER]
+
+    monkeypatch.setattr(support_toolkit.async_chamados_repo, "generate_dossiers_for_tickets", generate_dossiers_for_tickets)
+    model = ToolCallingModel()
+    agent = Agent(model=model, tools=[support_toolkit.get_ticket_details_async])
+
+    output = asyncio.run(agent.arun("Detalhes do chamado 76557"))
+
+    assert model.tool_results == [json.dumps(DOSSIER)]
+    assert json.loads(output.content) == DOSSIER
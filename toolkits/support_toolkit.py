@@ -24,11 +24,42 @@ except Exception:
 
 # --- 2. Importação e Instanciação dos Repositórios ---
 # (Instanciamos aqui, como no seu padrão)
-from repositories.chamados_repository import ChamadosRepository
-from repositories.knowledge_repository import KnowledgeRepository
+# Cada ferramenta existe em duas versões com o mesmo nome para o modelo:
+# - síncrona (repositórios síncronos): agent.run()/team.run(), usada pelos
+#   workflows, scripts e instâncias padrão. O `FunctionCall.execute` do Agno
+#   não aguarda corrotinas, então uma ferramenta async ali devolveria a corrotina.
+# - assíncrona (repositórios assíncronos): agent.arun()/team.arun() da API, para
+#   não bloquear o event loop dos outros chats durante as queries.
+# As fábricas dos agentes escolhem a versão pelo parâmetro `async_tools`.
+from repositories.chamados_repository import AsyncChamadosRepository, ChamadosRepository
+from repositories.knowledge_repository import AsyncKnowledgeRepository, KnowledgeRepository
+
+from toolkits.tool_executor import TOOL_EXECUTOR, ToolExecutorBusy
 
 chamados_repo = ChamadosRepository()
 knowledge_repo = KnowledgeRepository()
+async_chamados_repo = AsyncChamadosRepository()
+async_knowledge_repo = AsyncKnowledgeRepository()
+
+
+async def _dump_result(tool_name: str, payload: Any) -> str:
+    """
+    Serializa o resultado de uma ferramenta no TOOL_EXECUTOR: o `json.dumps` de
+    um dossiê inteiro não roda no event loop dos outros chats.
+    """
+    try:
+        return await TOOL_EXECUTOR.run(tool_name, json.dumps, payload, default=str)
+    except ToolExecutorBusy:
+        print(f"--- [TOOL]: {tool_name} recusada, executor das ferramentas cheio ---")
+        return json.dumps({"error": "Serviço sobrecarregado no momento. Tente esta ferramenta novamente em instantes."})
+
+
+def _async_variant(sync_tool):
+    """Registra a versão assíncrona com o nome e a docstring da ferramenta síncrona."""
+    def decorator(func):
+        func.__doc__ = getattr(sync_tool, "entrypoint", sync_tool).__doc__
+        return tool(name=sync_tool.name)(func)
+    return decorator
 
 # --- 3. Definição do Toolkit de Suporte ---
 support_toolkit = Toolkit(
@@ -126,3 +157,43 @@ def get_ticket_details(ticket_id: int) -> str:
         return json.dumps(details_list[0], default=str)
     else:
         return json.dumps({"error": f"Nenhum chamado/dossiê encontrado com o ID {ticket_id}"})
+
+
+# ===================================================================
+# VERSÕES ASSÍNCRONAS (agent.arun()/team.arun() da API)
+# ===================================================================
+
+@_async_variant(get_knowledge_record_by_uuid)
+async def get_knowledge_record_by_uuid_async(knowledge_id: UUID) -> str:
+    print(f"--- [TOOL]: get_knowledge_record_by_uuid (ID: {knowledge_id}) ---")
+    record = await async_knowledge_repo.find_by_id(knowledge_id)
+    if record:
+        return await _dump_result("get_knowledge_record_by_uuid", record)
+    return json.dumps({"error": f"Nenhum registro de conhecimento encontrado com o ID {knowledge_id}"})
+
+
+@_async_variant(get_ticket_dossier)
+async def get_ticket_dossier_async(ticket_id: int) -> str:
+    print(f"--- [TOOL]: get_ticket_dossier (ID: {ticket_id}) ---")
+    dossier_list = await async_chamados_repo.generate_dossiers_for_tickets([ticket_id])
+    if dossier_list:
+        return await _dump_result("get_ticket_dossier", dossier_list[0])
+    return json.dumps({"error": f"Nenhum dossiê encontrado para o chamado ID {ticket_id}"})
+
+
+@_async_variant(search_knowledge_by_keyword)
+async def search_knowledge_by_keyword_async(search_terms: str) -> str:
+    print(f"--- [TOOL]: search_knowledge_by_keyword (Query: '{search_terms}') ---")
+    results = await async_knowledge_repo.search_by_keyword(search_terms, limit=5)
+    if results:
+        return await _dump_result("search_knowledge_by_keyword", results)
+    return json.dumps({"results": [], "message": f"Nenhum resultado encontrado para '{search_terms}'"})
+
+
+@_async_variant(get_ticket_details)
+async def get_ticket_details_async(ticket_id: int) -> str:
+    print(f"--- [TOOL]: get_ticket_details (usando generate_dossiers) (ID: {ticket_id}) ---")
+    details_list = await async_chamados_repo.generate_dossiers_for_tickets([ticket_id])
+    if details_list:
+        return await _dump_result("get_ticket_details", details_list[0])
+    return json.dumps({"error": f"Nenhum chamado/dossiê encontrado com o ID {ticket_id}"})
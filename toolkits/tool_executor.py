@@ -0,0 +1,173 @@
+# agent-api/toolkits/tool_executor.py
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from core.metrics import BucketHistogram
+
+# Threads dedicadas ao trabalho síncrono das ferramentas (serialização de dossiês etc.)
+TOOL_EXECUTOR_MAX_WORKERS = int(os.getenv("TOOL_EXECUTOR_MAX_WORKERS", "8"))
+# Tarefas aguardando uma thread livre; acima disso a chamada é recusada na hora
+TOOL_EXECUTOR_MAX_QUEUE = int(os.getenv("TOOL_EXECUTOR_MAX_QUEUE", "64"))
+
+# Limites superiores (ms) das faixas dos histogramas de espera e execução
+TOOL_LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+
+class ToolExecutorBusy(RuntimeError):
+    """A fila do executor das ferramentas está cheia."""
+
+
+class ToolExecutor:
+    """
+    Pool de threads limitado para a parte síncrona das ferramentas dos agentes.
+
+    As ferramentas rodam dentro do `arun` da API: qualquer trabalho síncrono
+    pesado nelas (ex: `json.dumps` de um dossiê inteiro) trava todos os outros
+    chats do worker. `run` executa a função numa das TOOL_EXECUTOR_MAX_WORKERS
+    threads, com no máximo TOOL_EXECUTOR_MAX_QUEUE tarefas esperando; a partir
+    daí levanta ToolExecutorBusy em vez de acumular trabalho. O tempo de fila e
+    o de execução de cada ferramenta ficam em `stats()`.
+    """
+
+    def __init__(self, max_workers: int = TOOL_EXECUTOR_MAX_WORKERS, max_queue: int = TOOL_EXECUTOR_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # Na fila ou executando
+        self._running = 0
+        self._rejected = 0
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Criado no primeiro uso: importar o toolkit não sobe threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="support-tool"
+                    )
+        return self._executor
+
+    async def run(self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa `func(*args, **kwargs)` no pool sem bloquear o event loop.
+
+        Args:
+            name (str): Nome usado nas métricas (normalmente o da ferramenta).
+
+        Raises:
+            ToolExecutorBusy: Se já houver TOOL_EXECUTOR_MAX_QUEUE tarefas esperando.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                self._tool_stats(name)["rejected"] += 1
+                raise ToolExecutorBusy(f"Executor das ferramentas cheio ({self._pending} tarefas pendentes).")
+            self._pending += 1
+
+        submitted_at = time.perf_counter()
+
+        def task() -> Any:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    stats = self._tool_stats(name)
+                    stats["calls"] += 1
+                    stats["errors"] += int(error)
+                    stats["queue"].observe((started_at - submitted_at) * 1000)
+                    stats["run"].observe((finished_at - started_at) * 1000)
+
+        def release(future) -> None:
+            # No callback, não no task(): uma tarefa cancelada ainda na fila (cliente
+            # desconectou, execução do agente cancelada) nunca chega a executar
+            with self._lock:
+                self._pending -= 1
+
+        try:
+            future = self._get_executor().submit(task)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def _tool_stats(self, name: str) -> Dict[str, Any]:
+        stats = self._tools.get(name)
+        if stats is None:
+            stats = {
+                "calls": 0,
+                "errors": 0,
+                "rejected": 0,
+                "queue": BucketHistogram(TOOL_LATENCY_BUCKETS_MS),  # ms esperando uma thread
+                "run": BucketHistogram(TOOL_LATENCY_BUCKETS_MS),  # ms executando
+            }
+            self._tools[name] = stats
+        return stats
+
+    def histograms(self) -> Dict[str, Dict[str, BucketHistogram]]:
+        """Cópias dos histogramas (ms) de fila e de execução por ferramenta (para o /metrics)."""
+        with self._lock:
+            return {
+                name: {"queue": stats["queue"].copy(), "run": stats["run"].copy()}
+                for name, stats in self._tools.items()
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna a ocupação do pool e, por ferramenta, chamadas, erros, recusas e
+        os tempos de fila e de execução (média e p50/p95 aproximados).
+        """
+        with self._lock:
+            tools = {
+                name: dict(stats, queue=stats["queue"].copy(), run=stats["run"].copy())
+                for name, stats in self._tools.items()
+            }
+            pool = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "rejected": self._rejected,
+            }
+
+        pool["tools"] = {
+            name: {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "rejected": stats["rejected"],
+                "mean_queue_ms": round(stats["queue"].sum / stats["calls"], 2) if stats["calls"] else 0.0,
+                "p95_queue_ms": stats["queue"].quantile(0.95),
+                "mean_run_ms": round(stats["run"].sum / stats["calls"], 2) if stats["calls"] else 0.0,
+                "p50_run_ms": stats["run"].quantile(0.5),
+                "p95_run_ms": stats["run"].quantile(0.95),
+            }
+            for name, stats in tools.items()
+        }
+        return pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Instância Singleton ---
+TOOL_EXECUTOR = ToolExecutor()